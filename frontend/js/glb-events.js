@@ -0,0 +1,51 @@
+/**
+ * GLB Upload Events
+ * Subscribes to the file server's /api/events Server-Sent Events feed so
+ * uploads from Blender show up as soon as they are stored. The Firebase
+ * glb_loader pointer stays the source of truth; callers dedupe by hash.
+ * Event kinds are documented in microservices/file-server/event_log.py
+ */
+
+const EVENT_KINDS = ['upload', 'validated', 'validation_failed', 'variant_ready', 'resync'];
+
+/**
+ * Open an event feed for one user.
+ * handlers maps event kinds to callbacks receiving the parsed event.
+ * EventSource reconnects by itself and resumes from the last event id.
+ */
+export function subscribeGlbEvents(baseUrl, username, secret, handlers = {}) {
+    const params = new URLSearchParams();
+    if (username) params.set('username', username);
+    if (secret) params.set('secret', secret);
+
+    const feed = { source: null, connected: false, close: () => {} };
+    if (typeof EventSource === 'undefined') return feed;
+
+    const source = new EventSource(`${baseUrl || ''}/api/events?${params}`);
+    feed.source = source;
+    feed.close = () => {
+        feed.connected = false;
+        source.close();
+    };
+
+    source.onopen = () => {
+        feed.connected = true;
+    };
+    source.onerror = () => {
+        // Closed for good (e.g. an older server without the feed) or retrying
+        feed.connected = false;
+        if (source.readyState === EventSource.CLOSED && handlers.closed) handlers.closed();
+    };
+
+    EVENT_KINDS.forEach(kind => {
+        source.addEventListener(kind, (message) => {
+            if (!handlers[kind]) return;
+            try {
+                handlers[kind](JSON.parse(message.data));
+            } catch (error) {
+                console.error(`[glb-events] ${kind} handler failed`, error);
+            }
+        });
+    });
+    return feed;
+}
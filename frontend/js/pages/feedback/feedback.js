@@ -14,6 +14,7 @@ export class Feedback {
         this.editingTicket = null;
         this.statementBlockEditor = null;
         this.useBlockMode = true; // Feature flag
+        this.liveBlocks = !!window.liveStatementBlocks; // Turn speech into blocks while recording
         this.blockEditorContainer = null;
         this.isAddingToBlocks = false;
         this.init();
@@ -87,6 +88,11 @@ export class Feedback {
                 if (this.statementBlockEditor) {
                     this.statementBlockEditor.saveDraft();
                 }
+            },
+            onBlocksStreamed: (blocks) => {
+                // Show the editor as soon as the first block arrives
+                this.hideProcessingUI();
+                this.showBlockEditor(blocks);
             }
         });
         
@@ -157,6 +163,7 @@ export class Feedback {
                 this.speechBuffer += newText;
                 this.updateTextarea();
                 this.rlen = recognizingText.length;
+                this.ingestLiveTranscript(false);
                 
                 // Reset timeout for auto-stop
                 clearTimeout(this.timeoutId);
@@ -170,6 +177,7 @@ export class Feedback {
                     log("inspector", "[mic] recognized: ", e.result.text)
                     this.completeRecognition();
                     this.rlen = 0;
+                    this.ingestLiveTranscript(true);
                 }
             };
             
@@ -209,6 +217,11 @@ export class Feedback {
         // Save current textarea content
         this.speechBuffer = textarea.value ? textarea.value + ' ' : '';
         this.rlen = 0;
+        if (this.liveBlocks && this.useBlockMode && this.statementBlockEditor) {
+            // Text from earlier recordings is already in the blocks
+            const hasBlocks = this.statementBlockEditor.getBlocks().length > 0;
+            this.statementBlockEditor.startIngest(hasBlocks ? this.speechBuffer.length : 0);
+        }
         let lastStatus = micStatus.textContent;
         micStatus.textContent = '⏳';
         this.speechRecognizer.startContinuousRecognitionAsync(
@@ -259,6 +272,18 @@ export class Feedback {
                 if (this.useBlockMode && this.statementBlockEditor) {
                     const transcript = document.getElementById('feedbackDetails').value.trim();
                     
+                    if (transcript && this.liveBlocks) {
+                        // Most of it is in the blocks already; send what was said since the last pause
+                        const blocks = await this.statementBlockEditor.ingestTranscript(
+                            document.getElementById('feedbackDetails').value, true
+                        );
+                        if (blocks && blocks.length > 0) {
+                            this.showBlockEditor(blocks);
+                            this.isAddingToBlocks = false;
+                            return;
+                        }
+                    }
+                    
                     if (transcript) {
                         if (this.isAddingToBlocks) {
                             // Adding to existing blocks
@@ -281,6 +306,14 @@ export class Feedback {
         );
     }
     
+    ingestLiveTranscript(final) {
+        if (!this.liveBlocks || !this.useBlockMode || !this.statementBlockEditor || !this.recording) return;
+        const transcript = document.getElementById('feedbackDetails').value;
+        this.statementBlockEditor.ingestTranscript(transcript, final).catch(error => {
+            err("inspector", '[block] live ingest failed:', error);
+        });
+    }
+    
     completeRecognition() {
         this.updateTextarea();
         this.speechBuffer = document.getElementById('feedbackDetails').value+"\n";
@@ -5,7 +5,20 @@ export class StatementBlockEditor {
         this.blocks = [];
         this.originalTranscript = '';
         this.serviceUrl = options.serviceUrl || window.blockServiceUrl;
+        // NDJSON endpoint next to the service URL, e.g. /api/process-text/stream
+        this.streamUrl = options.streamUrl === undefined ? `${this.serviceUrl}/stream` : options.streamUrl;
+        // Live transcript frames go to /ingest next to the service URL
+        this.ingestUrl = options.ingestUrl === undefined ? this.serviceUrl.replace(/process-text$/, 'ingest') : options.ingestUrl;
+        this.ingest = null;
         this.onBlocksChanged = options.onBlocksChanged || (() => {});
+        this.onBlocksStreamed = options.onBlocksStreamed || (() => {});
+        // Server-side block session {id, version, blocks: [{id, text}]}. Once the
+        // server has our blocks only new text is sent; local edits mark it stale.
+        this.session = null;
+        this.sessionStale = true;
+        // Blocks streamed for the request in flight, shown instead of this.blocks
+        // until the final list arrives; this.blocks stays what the server last agreed to
+        this.previewBlocks = null;
         this.container = null;
         this.isProcessing = false;
         this.mergeModalCreated = false;
@@ -19,45 +32,284 @@ export class StatementBlockEditor {
         this.originalTranscript = transcript;
         
         try {
-            const response = await fetch(this.serviceUrl, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    intent:"The speaker is submitting in a feedback ticketing form for a VR creator tool project",
-                    text: transcript,
-                    existing_blocks: this.blocks
-                }),
-                signal: AbortSignal.timeout(10000) // 10 second timeout
-            });
-            
-            if (!response.ok) {
-                throw new Error(`Service error: ${response.status}`);
+            let result = await this._requestBlocks(transcript);
+            if (result === 'conflict') {
+                // The session moved on or expired: send our blocks once to resync it
+                this.previewBlocks = null;
+                this.sessionStale = true;
+                result = await this._requestBlocks(transcript);
+                if (result === 'conflict') {
+                    throw new Error('Service error: 409');
+                }
             }
             
-            const result = await response.json();
             log("inspector", "[block] result: ", result)
-            this.blocks = result.blocks || [];
+            const previewed = this.previewBlocks !== null;
+            this.previewBlocks = null;
+            this._applyResult(result);
             this.onBlocksChanged(this.blocks);
+            if (previewed && this.container) {
+                this.renderBlocks(this.container);
+            }
             
             return this.blocks;
             
         } catch (error) {
             err("inspector", 'Block processing failed:', error);
+            // Put back the blocks from before the request
+            if (this.previewBlocks !== null) {
+                this.previewBlocks = null;
+                if (this.container) {
+                    this.renderBlocks(this.container);
+                }
+            }
             throw error;
         } finally {
             this.isProcessing = false;
         }
     }
     
+    _requestBody(transcript, fields = {}) {
+        const body = {
+            ...fields,
+            intent:"The speaker is submitting in a feedback ticketing form for a VR creator tool project",
+            text: transcript
+        };
+        if (this.session && !this.sessionStale) {
+            body.session_id = this.session.id;
+            body.base_version = this.session.version;
+        } else {
+            body.session_id = this.session ? this.session.id : null;
+            body.existing_blocks = this.blocks;
+        }
+        return JSON.stringify(body);
+    }
+    
+    /**
+     * Start sending a live recording's transcript. The transcript before
+     * offset is already in the blocks.
+     */
+    startIngest(offset = 0) {
+        this.ingest = {
+            streamId: crypto.randomUUID().replace(/-/g, ''),
+            seq: 0,
+            offset,
+            transcript: '',
+            final: false
+        };
+    }
+    
+    /**
+     * Send the part of the live transcript that is not in the blocks yet. The
+     * service holds each frame until the speaker pauses and drops it once a
+     * newer one arrives, so this can be called for every partial transcript.
+     * Resolves with the blocks once they include this frame, otherwise null.
+     */
+    async ingestTranscript(transcript, final = false) {
+        const ingest = this.ingest;
+        if (!ingest || !this.ingestUrl) return null;
+        ingest.transcript = transcript;
+        ingest.final = final;
+        
+        const offset = ingest.offset;
+        const text = transcript.slice(offset);
+        if (!text.trim()) return final ? this.blocks : null;
+        
+        const seq = ++ingest.seq;
+        let response;
+        try {
+            response = await fetch(this.ingestUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: this._requestBody(text, { stream_id: ingest.streamId, seq, final }),
+                signal: AbortSignal.timeout(30000) // held until the speaker pauses
+            });
+        } catch (error) {
+            err("inspector", '[block] ingest failed:', error);
+            return null;
+        }
+        if (this.ingest !== ingest) return null;
+        
+        if (response.status === 404 || response.status === 405) {
+            // Older service: the transcript is processed when recording stops
+            this.ingestUrl = null;
+            return null;
+        }
+        if (response.status === 409) {
+            this.sessionStale = true;
+            return seq === ingest.seq ? this.ingestTranscript(ingest.transcript, ingest.final) : null;
+        }
+        if (!response.ok) {
+            err("inspector", `[block] ingest error: ${response.status}`);
+            return null;
+        }
+        
+        const result = await response.json();
+        if (result.status !== 'processed' || this.ingest !== ingest || ingest.offset !== offset) return null;
+        
+        this._applyResult(result);
+        ingest.offset = offset + text.length;
+        this.originalTranscript = transcript;
+        this.onBlocksChanged(this.blocks);
+        this.onBlocksStreamed(this.blocks);
+        if (this.container) {
+            this.renderBlocks(this.container);
+        }
+        
+        // Frames sent in the meantime repeat this text; replace them with the rest
+        if (seq !== ingest.seq) {
+            return this.ingestTranscript(ingest.transcript, ingest.final);
+        }
+        return this.blocks;
+    }
+    
+    /**
+     * Send the transcript, streamed if possible. Resolves with the result,
+     * or 'conflict' when the session has to be resynced.
+     */
+    async _requestBlocks(transcript) {
+        const body = this._requestBody(transcript);
+        if (this.streamUrl) {
+            const result = await this._processStream(body);
+            if (result) return result;
+        }
+        
+        const response = await fetch(this.serviceUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                // Let the service answer (with fallback blocks if need be) before we give up
+                'X-Request-Timeout-Ms': '9000',
+            },
+            body,
+            signal: AbortSignal.timeout(10000) // 10 second timeout
+        });
+        
+        if (response.status === 409) return 'conflict';
+        if (!response.ok) {
+            throw new Error(`Service error: ${response.status}`);
+        }
+        return await response.json();
+    }
+    
+    /**
+     * Take over the blocks of a response: a patch against our session version,
+     * the session's blocks with their ids, or a plain list from a service
+     * without sessions.
+     */
+    _applyResult(result) {
+        if (!result.session_id) {
+            this.session = null;
+            this.blocks = result.blocks || [];
+            return;
+        }
+        
+        if (result.ops) {
+            const blocks = [...this.session.blocks];
+            result.ops.forEach(op => {
+                const index = blocks.findIndex(block => block.id === op.id);
+                if (op.op === 'delete') {
+                    blocks.splice(index, 1);
+                } else if (op.op === 'update') {
+                    blocks[index] = { id: op.id, text: op.text };
+                } else {
+                    const after = op.after === null ? -1 : blocks.findIndex(block => block.id === op.after);
+                    blocks.splice(after + 1, 0, { id: op.id, text: op.text });
+                }
+            });
+            this.session = { id: result.session_id, version: result.version, blocks };
+        } else {
+            this.session = { id: result.session_id, version: result.version, blocks: result.blocks };
+        }
+        this.sessionStale = false;
+        this.blocks = this.session.blocks.map(block => block.text);
+    }
+    
+    _blocksEdited() {
+        this.sessionStale = true;
+        this.onBlocksChanged(this.blocks);
+    }
+    
+    /**
+     * Read the NDJSON stream, showing each block as soon as the model finishes it.
+     * Resolves with the final {blocks}, or null if streaming is unavailable
+     * (e.g. an older service without the endpoint) so the caller can fall back.
+     */
+    async _processStream(body) {
+        let response;
+        try {
+            response = await fetch(this.streamUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body,
+                signal: AbortSignal.timeout(30000) // blocks keep arriving, so allow longer than a single response
+            });
+        } catch (error) {
+            log("inspector", "[block] stream unavailable, using single response", error);
+            return null;
+        }
+        
+        if (response.status === 404 || response.status === 405 || !response.body) {
+            this.streamUrl = null;
+            return null;
+        }
+        if (response.status === 409) return 'conflict';
+        if (!response.ok) {
+            throw new Error(`Service error: ${response.status}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const streamed = [];
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (value) buffer += decoder.decode(value, { stream: true });
+            
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (!line) continue;
+                
+                const message = JSON.parse(line);
+                if (message.type === 'block') {
+                    streamed[message.index] = message.text;
+                    // Show the blocks received so far; the final list replaces them
+                    this.previewBlocks = streamed.filter(block => block !== undefined);
+                    this.onBlocksStreamed(this.previewBlocks);
+                    if (this.container) {
+                        this.renderBlocks(this.container);
+                    }
+                } else if (message.type === 'done') {
+                    return message;
+                } else if (message.type === 'error') {
+                    if (message.error === 'Session changed') return 'conflict';
+                    throw new Error(message.error);
+                }
+            }
+            
+            if (done) {
+                throw new Error('Block stream ended early');
+            }
+        }
+    }
+    
     renderBlocks(container) {
         if (!container) return;
         
         this.container = container;
         const blocksList = container.querySelector('#blocksList') || container;
+        // Streamed blocks are shown read-only until the final list replaces them
+        const previewing = this.previewBlocks !== null;
+        const blocks = previewing ? this.previewBlocks : this.blocks;
         
-        if (this.blocks.length === 0) {
+        if (blocks.length === 0) {
             blocksList.innerHTML = '<div class="empty-blocks">No blocks to display</div>';
             return;
         }
@@ -65,14 +317,15 @@ export class StatementBlockEditor {
         // Add drop zones between blocks and at the beginning
         let blocksHtml = '<div class="block-drop-zone" data-drop-index="0"></div>';
         
-        this.blocks.forEach((block, index) => {
-            blocksHtml += `
-                <div class="statement-block" data-block-index="${index}">
-                    <div class="block-content" contenteditable="true">${this.escapeHtml(block)}</div>
+        blocks.forEach((block, index) => {
+            const actions = previewing ? '' : `
                     <div class="block-actions">
                         <button class="block-delete" aria-label="Delete block">×</button>
                         <div class="block-drag" aria-label="Reorder block" role="button" tabindex="0">⋮⋮</div>
-                    </div>
+                    </div>`;
+            blocksHtml += `
+                <div class="statement-block" data-block-index="${index}">
+                    <div class="block-content" contenteditable="${!previewing}">${this.escapeHtml(block)}</div>${actions}
                 </div>
                 <div class="block-drop-zone" data-drop-index="${index + 1}"></div>
             `;
@@ -84,14 +337,16 @@ export class StatementBlockEditor {
         this._createMergeModal();
         
         // Attach event listeners
-        this._attachBlockEventListeners(blocksList);
+        if (!previewing) {
+            this._attachBlockEventListeners(blocksList);
+        }
     }
     
     addBlock(content) {
         if (!content || typeof content !== 'string') return;
         
         this.blocks.push(content.trim());
-        this.onBlocksChanged(this.blocks);
+        this._blocksEdited();
         
         if (this.container) {
             this.renderBlocks(this.container);
@@ -102,14 +357,14 @@ export class StatementBlockEditor {
         if (index < 0 || index >= this.blocks.length) return;
         
         this.blocks[index] = content.trim();
-        this.onBlocksChanged(this.blocks);
+        this._blocksEdited();
     }
     
     deleteBlock(index) {
         if (index < 0 || index >= this.blocks.length) return;
         
         this.blocks.splice(index, 1);
-        this.onBlocksChanged(this.blocks);
+        this._blocksEdited();
         
         if (this.container) {
             this.renderBlocks(this.container);
@@ -128,7 +383,7 @@ export class StatementBlockEditor {
         }
         
         this.blocks.splice(toIndex, 0, movedBlock);
-        this.onBlocksChanged(this.blocks);
+        this._blocksEdited();
         
         if (this.container) {
             this.renderBlocks(this.container);
@@ -147,7 +402,7 @@ export class StatementBlockEditor {
         this.blocks[toIndex] = mergedContent;
         this.blocks.splice(fromIndex, 1);
         
-        this.onBlocksChanged(this.blocks);
+        this._blocksEdited();
         
         if (this.container) {
             this.renderBlocks(this.container);
@@ -166,6 +421,10 @@ export class StatementBlockEditor {
         this.blocks = [];
         this.originalTranscript = '';
         this.isProcessing = false;
+        this.session = null;
+        this.sessionStale = true;
+        this.previewBlocks = null;
+        this.ingest = null;
         this.onBlocksChanged(this.blocks);
         
         if (this.container) {
@@ -1,4 +1,6 @@
-
+const { subscribeGlbEvents } = await import(`${window.repoUrl}/glb-events.js`);
+// A re-upload of the same GLB after this long is added again
+const RECENT_GLB_WINDOW_MS = 60000;
 /**
  * InventoryFirebase - Handles all Firebase/remote storage operations for the inventory
  */
@@ -6,6 +8,9 @@ export class InventoryFirebase {
     constructor(inventory) {
         this.inventory = inventory;
         this.firebaseListeners = new Map();
+        this.glbEvents = null;
+        // hash -> time it was added, so an upload seen on both channels is added once
+        this.recentGlbs = new Map();
     }
 
     folderIsMine(folder){
@@ -57,6 +62,18 @@ export class InventoryFirebase {
         //     this.setupRootListener();
         // }
 
+        // The Firebase glb_loader pointer is the source of truth; the file server's
+        // event feed usually delivers the same upload sooner, and whichever arrives
+        // second is dropped by hash
+        this.glbEvents = subscribeGlbEvents(window.ngrokUrl, userName, networking.secret, {
+            upload: (event) => {
+                log("glb_loader", "upload event", event.hash, event.mesh_name);
+                this.addUploadedGlb(event.url, event.mesh_name, event.hash);
+            },
+            variant_ready: (event) => log("glb_loader", "optimized variant ready", event.hash, event.bytes_after),
+            validation_failed: (event) => log("glb_loader", "uploaded GLB is invalid", event.hash, event.error)
+        });
+
         const glbLoaderKey = `glb_loader/${userName}_${networking.secret}`;
         log("glb_loader", "setting up listener for", glbLoaderKey);
         const glbLoaderRef = window.networking.getDatabase().ref(glbLoaderKey);
@@ -67,17 +84,35 @@ export class InventoryFirebase {
                 return;
             }
             let value = snapshot.val();
+            if(!value) return;
             let glb_url = value.url;
             let mesh_name = value.mesh_name;
             log("glb_loader", "change", snapshot.key, glb_url, mesh_name);
-            let entity = await AddEntity("Scene", mesh_name);
-            await AddComponent(entity.id, "BanterGLTF", {
-                componentProperties:{
-                    url: `${window.ngrokUrl}${glb_url}`
-                }
-            })
+            await this.addUploadedGlb(glb_url, mesh_name, value.hash);
+        });
+    }
 
+    /**
+     * Add a freshly uploaded GLB to the scene, unless the other channel already did
+     */
+    async addUploadedGlb(glb_url, mesh_name, hash) {
+        const now = Date.now();
+        this.recentGlbs.forEach((addedAt, key) => {
+            if(now - addedAt > RECENT_GLB_WINDOW_MS) this.recentGlbs.delete(key);
         });
+        if(hash){
+            if(this.recentGlbs.has(hash)){
+                log("glb_loader", "already added", hash);
+                return;
+            }
+            this.recentGlbs.set(hash, now);
+        }
+        let entity = await AddEntity("Scene", mesh_name);
+        await AddComponent(entity.id, "BanterGLTF", {
+            componentProperties:{
+                url: `${window.ngrokUrl}${glb_url}`
+            }
+        })
     }
 
     /**
@@ -385,6 +420,10 @@ export class InventoryFirebase {
             if (listeners.changedListener) ref.off('child_changed');
         });
         this.firebaseListeners.clear();
+        if (this.glbEvents) {
+            this.glbEvents.close();
+            this.glbEvents = null;
+        }
         log('net', 'Firebase listeners cleared');
     }
 
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Admission control for uploads.
+
+Upload bodies are read fully into memory, so the server bounds how many it
+accepts at once and how many bytes they may hold together. Requests over
+capacity wait in a FIFO queue for up to queue_timeout seconds; when the
+queue is full or the wait times out the caller gets Overloaded with a
+Retry-After estimate and should answer 503.
+
+Reads (static files, GLB fetches) are tracked too. While any read is in
+flight or finished within the last read_window seconds, uploads are limited
+to slots_under_read_load concurrent slots, so bulk uploads can't starve
+headsets loading a scene.
+
+Limits are per process; in prefork mode each worker has its own budget.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Raised when an upload can't be admitted."""
+
+    def __init__(self, retry_after, reason):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=4, max_bytes=64 * 1024 * 1024, queue_timeout=10.0, max_queue=16,
+                 slots_under_read_load=1, read_window=0.5):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_bytes = max_bytes
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.slots_under_read_load = max(1, min(slots_under_read_load, self.max_concurrent))
+        self.read_window = read_window
+
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self._active = 0
+        self._active_bytes = 0
+        self._reads = 0
+        self._last_read = 0.0
+        # Smoothed upload duration, used to estimate Retry-After
+        self._avg_duration = 1.0
+        self.stats = {'admitted': 0, 'rejected': 0, 'timed_out': 0}
+
+    def _read_pressure(self):
+        return self._reads > 0 or time.monotonic() - self._last_read < self.read_window
+
+    def _fits(self, nbytes):
+        slots = self.slots_under_read_load if self._read_pressure() else self.max_concurrent
+        if self._active >= slots:
+            return False
+        # A single upload bigger than the budget may run, but only alone
+        return self._active == 0 or self._active_bytes + nbytes <= self.max_bytes
+
+    def _retry_after(self):
+        waves = (len(self._waiting) + self._active) / self.max_concurrent
+        return max(1, min(60, math.ceil(self._avg_duration * max(1.0, waves))))
+
+    def acquire(self, nbytes):
+        """Block until nbytes of upload may be held in memory, or raise Overloaded."""
+        with self._cond:
+            if not self._waiting and self._fits(nbytes):
+                self._admit(nbytes)
+                return
+            if len(self._waiting) >= self.max_queue:
+                self.stats['rejected'] += 1
+                raise Overloaded(self._retry_after(), 'Upload queue full')
+
+            ticket = object()
+            self._waiting.append(ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while not (self._waiting[0] is ticket and self._fits(nbytes)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timed_out'] += 1
+                        raise Overloaded(self._retry_after(), 'Timed out waiting for upload capacity')
+                    # Short waits so read pressure ending is noticed without a notify
+                    self._cond.wait(min(remaining, self.read_window))
+                self._admit(nbytes)
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    def _admit(self, nbytes):
+        self._active += 1
+        self._active_bytes += nbytes
+        self.stats['admitted'] += 1
+
+    def release(self, nbytes, duration=None):
+        with self._cond:
+            self._active -= 1
+            self._active_bytes -= nbytes
+            if duration is not None:
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            self._cond.notify_all()
+
+    @contextmanager
+    def upload(self, nbytes):
+        self.acquire(nbytes)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(nbytes, time.monotonic() - start)
+
+    @contextmanager
+    def reading(self):
+        with self._cond:
+            self._reads += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._reads -= 1
+                self._last_read = time.monotonic()
+                self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return dict(
+                self.stats,
+                active=self._active,
+                active_bytes=self._active_bytes,
+                waiting=len(self._waiting),
+                reads=self._reads,
+                read_pressure=self._read_pressure()
+            )
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Upload and access index for stored GLBs.
+
+One SQLite row per stored hash records who uploaded it, when it was last
+uploaded and when it was last fetched. Garbage collection (glb_gc.py) uses
+it for grace periods, least-recently-fetched ordering and to keep each
+user's latest upload, which is what their Firebase glb_loader pointer shows.
+"""
+import os
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    username TEXT,
+    mesh_name TEXT,
+    created_at REAL NOT NULL,
+    uploaded_at REAL NOT NULL,
+    last_fetched_at REAL,
+    fetch_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS uploads_username ON uploads (username, uploaded_at);
+"""
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class AssetIndex:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = connect(db_path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def record_upload(self, file_hash, size, username=None, mesh_name=None):
+        now = time.time()
+        conn = connect(self.db_path)
+        try:
+            # Re-uploading a hash refreshes it so GC treats it as new again
+            conn.execute(
+                'INSERT INTO uploads (hash, size, username, mesh_name, created_at, uploaded_at) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(hash) DO UPDATE SET uploaded_at = excluded.uploaded_at, '
+                'username = COALESCE(excluded.username, username), mesh_name = COALESCE(excluded.mesh_name, mesh_name)',
+                (file_hash, size, username or None, mesh_name or None, now, now)
+            )
+        finally:
+            conn.close()
+
+    def record_fetch(self, file_hashes):
+        now = time.time()
+        conn = connect(self.db_path)
+        try:
+            conn.executemany(
+                'UPDATE uploads SET last_fetched_at = ?, fetch_count = fetch_count + 1 WHERE hash = ?',
+                [(now, file_hash) for file_hash in file_hashes]
+            )
+        finally:
+            conn.close()
+
+    def get(self, file_hash):
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute('SELECT * FROM uploads WHERE hash = ?', (file_hash,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def all(self):
+        conn = connect(self.db_path)
+        try:
+            return {row['hash']: dict(row) for row in conn.execute('SELECT * FROM uploads')}
+        finally:
+            conn.close()
+
+    def latest_per_user(self):
+        """Hash of each user's most recent upload, i.e. their current glb_loader pointer."""
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute(
+                'SELECT username, hash FROM uploads u WHERE username IS NOT NULL AND uploaded_at = '
+                '(SELECT MAX(uploaded_at) FROM uploads WHERE username = u.username)'
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row['username']: row['hash'] for row in rows}
+
+    def remove(self, file_hash):
+        conn = connect(self.db_path)
+        try:
+            conn.execute('DELETE FROM uploads WHERE hash = ?', (file_hash,))
+        finally:
+            conn.close()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Background asset processing tasks run by the job queue.
+
+Each task is called as task(payload, progress) inside a worker process and
+returns a JSON-serializable result. Payloads carry absolute paths and the
+storage spec because workers do not share the server's working directory.
+"""
+import json
+import os
+import struct
+
+from job_queue import PermanentJobError
+
+TASKS = {}
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def open_payload_store(payload):
+    """The blob store a job's payload refers to; older payloads only carry assets_dir."""
+    import storage
+    return storage.open_store(payload.get('storage'), payload['assets_dir'])
+
+
+def read_original(store, file_hash, chunk_store=None):
+    """Read an uploaded GLB whether it is in the blob store or the chunk store."""
+    try:
+        return store.read(f'{file_hash}.glb')
+    except FileNotFoundError:
+        if chunk_store is None:
+            raise
+    return chunk_store.read(file_hash)
+
+
+def payload_chunk_store(payload):
+    from chunk_store import ChunkStore
+    chunk_dir = os.path.join(os.path.dirname(payload['assets_dir']), 'chunkstore')
+    return ChunkStore(chunk_dir) if os.path.isdir(chunk_dir) else None
+
+
+def read_gltf_json(data):
+    """Check the GLB container and return its JSON chunk. Raises ValueError if malformed."""
+    if len(data) < 20:
+        raise ValueError('File too small to be a GLB')
+    magic, version, length = struct.unpack_from('<III', data, 0)
+    if magic != 0x46546C67:
+        raise ValueError('Not a GLB file (bad magic)')
+    if version != 2:
+        raise ValueError(f'Unsupported GLB version {version}')
+    if length != len(data):
+        raise ValueError(f'GLB header length {length} does not match file size {len(data)}')
+
+    chunk_length, chunk_type = struct.unpack_from('<II', data, 12)
+    if chunk_type != 0x4E4F534A:
+        raise ValueError('First GLB chunk is not JSON')
+    # JSONDecodeError and UnicodeDecodeError are ValueErrors too
+    return json.loads(data[20:20 + chunk_length].decode('utf-8'))
+
+
+@task('validate_glb')
+def validate_glb(payload, progress):
+    """Check the GLB container and JSON chunk of an uploaded file."""
+    progress(0.1, 'Reading GLB')
+    data = read_original(open_payload_store(payload), payload['hash'], payload_chunk_store(payload))
+
+    progress(0.5, 'Validating container')
+    try:
+        gltf = read_gltf_json(data)
+    except ValueError as e:
+        # The same bytes fail the same way on every attempt
+        raise PermanentJobError(str(e)) from e
+
+    return {
+        'valid': True,
+        'generator': gltf.get('asset', {}).get('generator'),
+        'meshes': len(gltf.get('meshes', [])),
+        'materials': len(gltf.get('materials', [])),
+        'images': len(gltf.get('images', [])),
+        'animations': len(gltf.get('animations', [])),
+        'extensions': gltf.get('extensionsUsed', []),
+    }
+
+
+@task('optimize_glb')
+def optimize_glb(payload, progress):
+    """
+    Write an optimized variant and metrics report next to a stored GLB.
+
+    The original <hash>.glb is left untouched so the hash stays valid;
+    the variant is stored as <hash>.optimized.glb and the ACMR/ATVR report
+    as <hash>.report.json.
+    """
+    import mesh_optimizer
+
+    store = open_payload_store(payload)
+    file_hash = payload['hash']
+    progress(0.05, 'Reading GLB')
+    glb_data = read_original(store, file_hash, payload_chunk_store(payload))
+
+    progress(0.1, 'Optimizing meshes')
+    try:
+        optimized, report = mesh_optimizer.optimize_glb(glb_data, cache_size=payload.get('cache_size', 16))
+    except (ValueError, KeyError, IndexError, TypeError, struct.error) as e:
+        # Malformed glTF; validate_glb reports why
+        raise PermanentJobError(f'Cannot optimize GLB: {e!r}') from e
+
+    # Last chance to stop before anything becomes visible to readers
+    progress(0.9, 'Writing variant')
+    if report['optimized']:
+        store.put(f'{file_hash}.optimized.glb', optimized)
+        print(f"[DEBUG] Optimized GLB {file_hash}: {report['bytes_before']} -> {report['bytes_after']} bytes, "
+              f"ACMR {report.get('acmr_before')} -> {report.get('acmr_after')}")
+    else:
+        print(f"[DEBUG] Skipped optimization for {file_hash}: {report.get('skipped')}")
+    store.put(f'{file_hash}.report.json', json.dumps(report, indent=2).encode())
+
+    return {key: report.get(key) for key in ('optimized', 'skipped', 'bytes_before', 'bytes_after', 'acmr_before', 'acmr_after')}
+
+
+@task('collect_garbage')
+def collect_garbage(payload, progress):
+    """Evict unreferenced GLBs, see glb_gc.py."""
+    import glb_gc
+
+    progress(0.1, 'Planning')
+    report = glb_gc.run_gc(
+        payload['assets_root'],
+        storage_spec=payload.get('storage'),
+        quota_mb=payload.get('quota_mb', 0),
+        grace_hours=payload.get('grace_hours', glb_gc.DEFAULT_GRACE_HOURS),
+        reference_dirs=payload.get('reference_dirs'),
+        dry_run=payload.get('dry_run', False)
+    )
+    report['evict'] = [candidate['hash'] for candidate in report['evict']]
+    return report
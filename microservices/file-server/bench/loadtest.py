@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Reproducible load test for the file server endpoints.
+
+Starts fileserver.py in a scratch directory against a generated corpus of
+GLBs, with stub upstreams for the proxied routes, so it needs no network and
+no other services. Each scenario is driven at every concurrency level and
+reports throughput, p50/p95/p99 latency and the peak RSS of the server's
+process tree (including prefork and job workers) as JSON:
+
+    python bench/loadtest.py run --json before.json
+    git checkout my-branch
+    python bench/loadtest.py run --json after.json
+    python bench/loadtest.py compare before.json after.json
+
+Scenarios: static_small, static_large, fetch_glb_hot, fetch_glb_cold,
+store_glb_raw, store_glb_json, store_glb_multipart, proxy_process_text,
+proxy_docs, proxy_setclaims. Pick some with --scenario (repeatable) and pass
+server settings with --env, e.g. --env FILESERVER_WORKERS=4. Asset
+optimization jobs are off unless --env GLB_OPTIMIZE=true, so background CPU
+doesn't blur request timings.
+
+Cold fetches use a distinct GLB per request and drop the corpus from the
+page cache first (posix_fadvise), so they measure the storage path rather
+than memory copies.
+"""
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fileserver.py')
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 * 1024}
+ALL_SCENARIOS = [
+    'static_small', 'static_large', 'fetch_glb_hot', 'fetch_glb_cold',
+    'store_glb_raw', 'store_glb_json', 'store_glb_multipart',
+    'proxy_process_text', 'proxy_docs', 'proxy_setclaims',
+]
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def make_glb(size, rng):
+    """A valid GLB container of exactly size bytes (>= 64) with a random BIN chunk."""
+    gltf = json.dumps({'asset': {'version': '2.0', 'generator': 'loadtest'}}).encode()
+    gltf += b' ' * (-len(gltf) % 4)
+    bin_length = max(0, size - 12 - 8 - len(gltf) - 8)
+    bin_length -= bin_length % 4
+    gltf += b' ' * (size - 12 - 8 - len(gltf) - 8 - bin_length)
+    return (
+        struct.pack('<4sII', b'glTF', 2, size)
+        + struct.pack('<I4s', len(gltf), b'JSON') + gltf
+        + struct.pack('<I4s', bin_length, b'BIN\0') + rng.randbytes(bin_length)
+    )
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class StubUpstream(BaseHTTPRequestHandler):
+    """Answers like the statement-block service, docs server and auth server would, instantly."""
+    delay = 0
+
+    def _reply(self, content_type, body):
+        if self.delay:
+            time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply('text/html', b'<html><body>' + b'docs ' * 2000 + b'</body></html>')
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path == '/setclaims':
+            self._reply('application/json', b'{"success": true}')
+        else:
+            self._reply('application/json', json.dumps({'blocks': [{'type': 'statement', 'text': 'x'}] * 20}).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_upstream(delay_ms):
+    handler = type('Stub', (StubUpstream,), {'delay': delay_ms / 1000})
+    server = ThreadingHTTPServer(('127.0.0.1', free_port()), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def process_tree_rss(pid):
+    """Resident set size of pid and all its descendants, in bytes (Linux /proc)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return total
+
+
+class RssMonitor:
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = process_tree_rss(self.pid)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, process_tree_rss(self.pid))
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def request(port, method, path, body=None, headers=None, timeout=120):
+    """Send one request on a fresh connection and read the whole response."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, len(data)
+    finally:
+        conn.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Workload:
+    """Server process, corpus and stub upstreams for one load test run."""
+
+    def __init__(self, workdir, glb_sizes, store_sizes, cold_count, env, upstream_delay_ms, seed):
+        self.workdir = workdir
+        self.rng = random.Random(seed)
+        self.env = env
+        self.root = os.path.join(workdir, 'frontend')
+        self.assets_root = os.path.join(workdir, 'data')
+        os.makedirs(self.root, exist_ok=True)
+
+        # Static files served by SimpleHTTPRequestHandler
+        with open(os.path.join(self.root, 'index.html'), 'wb') as f:
+            f.write(b'<html><body>' + b'x' * 4096 + b'</body></html>')
+        with open(os.path.join(self.root, 'bundle.js'), 'wb') as f:
+            f.write(self.rng.randbytes(2 * 1024 * 1024))
+
+        self.glbs = {size: make_glb(size, self.rng) for size in glb_sizes}
+        self.store_payloads = {size: [make_glb(size, self.rng) for _ in range(4)] for size in store_sizes}
+        # Cold fetches need many distinct files of one modest size
+        self.cold_glbs = [make_glb(256 * 1024, self.rng) for _ in range(cold_count)]
+        self.hashes = {}
+        self.cold_hashes = []
+
+        self.upstream, upstream_url = start_stub_upstream(upstream_delay_ms)
+        self.port = free_port()
+        server_env = dict(
+            os.environ,
+            GLB_OPTIMIZE='false',
+            PROCESS_TEXT_UPSTREAM=upstream_url,
+            DOCS_UPSTREAM=upstream_url,
+            SETCLAIMS_UPSTREAM=upstream_url,
+            ASSETS_ROOT=self.assets_root,
+        )
+        server_env.update(env)
+        self.log = open(os.path.join(workdir, 'server.log'), 'wb')
+        self.process = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, str(self.port), self.root],
+            env=server_env, stdout=self.log, stderr=subprocess.STDOUT
+        )
+        self._wait_ready()
+        self._seed()
+
+    def _wait_ready(self, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'Server exited early, see {self.log.name}')
+            try:
+                request(self.port, 'GET', '/index.html', timeout=2)
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f'Server did not start within {timeout}s, see {self.log.name}')
+
+    def _upload(self, data):
+        status, _ = request(self.port, 'POST', '/api/store_glb?mesh_name=loadtest', data,
+                            {'Content-Type': 'application/octet-stream'})
+        if status != 200:
+            raise RuntimeError(f'Seeding upload failed with {status}')
+        return hashlib.sha256(data).hexdigest()
+
+    def _seed(self):
+        for size, data in self.glbs.items():
+            self.hashes[size] = self._upload(data)
+        self.cold_hashes = [self._upload(data) for data in self.cold_glbs]
+
+    def drop_page_cache(self):
+        if not hasattr(os, 'posix_fadvise'):
+            return False
+        glb_dir = os.path.join(self.assets_root, 'glbs')
+        for name in os.listdir(glb_dir):
+            fd = os.open(os.path.join(glb_dir, name), os.O_RDONLY)
+            try:
+                os.fdatasync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+        return True
+
+    def scenario_requests(self, name):
+        """Return (label, request factory) pairs; a factory maps a sequence number to request args."""
+        if name == 'static_small':
+            return [('index.html', lambda n: ('GET', '/index.html', None, {}))]
+        if name == 'static_large':
+            return [('bundle.js 2MB', lambda n: ('GET', '/bundle.js', None, {}))]
+        if name == 'fetch_glb_hot':
+            return [
+                (format_size(size), lambda n, h=file_hash: ('GET', f'/api/fetch_glb?file={h}', None, {}))
+                for size, file_hash in self.hashes.items()
+            ]
+        if name == 'fetch_glb_cold':
+            hashes = self.cold_hashes
+            return [('256KB distinct', lambda n: ('GET', f'/api/fetch_glb?file={hashes[n % len(hashes)]}', None, {}))]
+        if name.startswith('store_glb_'):
+            encode = {
+                'store_glb_raw': encode_raw,
+                'store_glb_json': encode_json,
+                'store_glb_multipart': encode_multipart,
+            }[name]
+            cases = []
+            for size, payloads in self.store_payloads.items():
+                # Encode up front so client-side work doesn't count as server latency
+                encoded = [encode(data) for data in payloads]
+                cases.append((format_size(size), lambda n, e=encoded: ('POST',) + e[n % len(e)]))
+            return cases
+        if name == 'proxy_process_text':
+            body = json.dumps({'text': 'When the ball is clicked, play a sound. ' * 10}).encode()
+            return [('process-text', lambda n: ('POST', '/api/process-text', body, {'Content-Type': 'application/json'}))]
+        if name == 'proxy_docs':
+            return [('docs page', lambda n: ('GET', '/docs/index.html', None, {}))]
+        if name == 'proxy_setclaims':
+            body = json.dumps({'uid': 'loadtest', 'claims': {'role': 'artist'}}).encode()
+            return [('setclaims', lambda n: ('POST', '/setclaims', body, {'Content-Type': 'application/json'}))]
+        raise ValueError(f'Unknown scenario {name}')
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.upstream.shutdown()
+        self.log.close()
+
+
+def encode_raw(data):
+    return '/api/store_glb?mesh_name=loadtest', data, {'Content-Type': 'application/octet-stream'}
+
+
+def encode_json(data):
+    body = json.dumps({'mesh_name': 'loadtest', 'glb_data': base64.b64encode(data).decode()}).encode()
+    return '/api/store_glb', body, {'Content-Type': 'application/json'}
+
+
+def encode_multipart(data):
+    boundary = 'loadtest' + hashlib.md5(data[:64]).hexdigest()
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="mesh_name"\r\n\r\nloadtest\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="mesh.glb"\r\n'
+        f'Content-Type: model/gltf-binary\r\n\r\n'
+    ).encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return '/api/store_glb', body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def format_size(size):
+    if size >= SIZE_UNITS['MB']:
+        return f'{size / SIZE_UNITS["MB"]:g}MB'
+    return f'{size / SIZE_UNITS["KB"]:g}KB'
+
+
+def drive(workload, make_request, concurrency, seconds, warmup):
+    """Run make_request from concurrency threads for seconds after a warmup."""
+    latencies = []
+    statuses = {}
+    counts = {'bytes_in': 0, 'bytes_out': 0, 'errors': 0}
+    lock = threading.Lock()
+    sequence = iter(range(10 ** 12))
+    start_at = time.perf_counter() + warmup
+    deadline = start_at + seconds
+
+    def client():
+        while True:
+            with lock:
+                n = next(sequence)
+            method, path, body, headers = make_request(n)
+            begin = time.perf_counter()
+            if begin >= deadline:
+                return
+            try:
+                status, received = request(workload.port, method, path, body, headers)
+            except (OSError, http.client.HTTPException):
+                status, received = 'error', 0
+            elapsed = time.perf_counter() - begin
+            if begin < start_at:
+                continue
+            with lock:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+                    counts['bytes_in'] += received
+                    counts['bytes_out'] += len(body or b'')
+                else:
+                    counts['errors'] += 1
+
+    with RssMonitor(workload.process.pid) as rss:
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = max(time.perf_counter() - start_at, 1e-9)
+
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': counts['errors'],
+        'statuses': statuses,
+        'rps': round(len(latencies) / elapsed, 2),
+        'mb_s': round((counts['bytes_in'] + counts['bytes_out']) / elapsed / SIZE_UNITS['MB'], 2),
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'peak_rss_mb': round(rss.peak / SIZE_UNITS['MB'], 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(SERVER_SCRIPT),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    env = dict(item.split('=', 1) for item in args.env or [])
+    workdir = tempfile.mkdtemp(prefix='fileserver-loadtest-')
+    scenarios = args.scenario or ALL_SCENARIOS
+    results = []
+    workload = None
+    try:
+        workload = Workload(
+            workdir,
+            [parse_size(s) for s in args.glb_sizes.split(',')],
+            [parse_size(s) for s in args.store_sizes.split(',')],
+            args.cold_files, env, args.upstream_delay_ms, args.seed
+        )
+        for name in scenarios:
+            for label, make_request in workload.scenario_requests(name):
+                for concurrency in args.concurrency:
+                    if name == 'fetch_glb_cold':
+                        workload.drop_page_cache()
+                    row = dict(scenario=name, case=label, **drive(workload, make_request, concurrency, args.seconds, args.warmup))
+                    results.append(row)
+                    print(f"{name:<20} {label:<15} c={concurrency:<3} {row['rps']:>9.1f} req/s {row['mb_s']:>8.1f} MB/s "
+                          f"p50 {row['p50_ms']} p95 {row['p95_ms']} p99 {row['p99_ms']} ms, "
+                          f"peak RSS {row['peak_rss_mb']}MB, {row['errors']} errors")
+    finally:
+        if workload:
+            workload.close()
+        if args.keep:
+            print(f"Kept scratch directory {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'seconds': args.seconds, 'warmup': args.warmup, 'concurrency': args.concurrency,
+            'glb_sizes': args.glb_sizes, 'store_sizes': args.store_sizes, 'env': env, 'seed': args.seed,
+        },
+        'peak_rss_mb': max((row['peak_rss_mb'] for row in results), default=None),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def compare(before_path, after_path):
+    """Print throughput and latency changes for every case present in both reports."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    key = lambda row: (row['scenario'], row['case'], row['concurrency'])
+    old_rows = {key(row): row for row in before['results']}
+
+    def change(old, new):
+        if not old or new is None:
+            return '   n/a'
+        return f'{(new - old) / old * 100:+6.1f}%'
+
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    for row in after['results']:
+        old = old_rows.get(key(row))
+        if old is None:
+            continue
+        print(f"{row['scenario']:<20} {row['case']:<15} c={row['concurrency']:<3} "
+              f"req/s {change(old['rps'], row['rps'])}  p50 {change(old['p50_ms'], row['p50_ms'])}  "
+              f"p99 {change(old['p99_ms'], row['p99_ms'])}  RSS {change(old['peak_rss_mb'], row['peak_rss_mb'])}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='Start a server and run the scenarios')
+    run_parser.add_argument('--scenario', action='append', choices=ALL_SCENARIOS)
+    run_parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    run_parser.add_argument('--seconds', type=float, default=5)
+    run_parser.add_argument('--warmup', type=float, default=1)
+    run_parser.add_argument('--glb-sizes', default='1KB,64KB,1MB,5MB,20MB', help='Sizes for fetch_glb_hot')
+    run_parser.add_argument('--store-sizes', default='64KB,1MB', help='Sizes for the store_glb scenarios')
+    run_parser.add_argument('--cold-files', type=int, default=200, help='Distinct GLBs for fetch_glb_cold')
+    run_parser.add_argument('--upstream-delay-ms', type=float, default=0, help='Latency of the stub upstreams')
+    run_parser.add_argument('--env', action='append', help='KEY=VALUE passed to the server (repeatable)')
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--keep', action='store_true', help='Keep the scratch directory and server log')
+    run_parser.add_argument('--json', help='Write the report to this file')
+    compare_parser = commands.add_parser('compare', help='Compare two reports')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args.before, args.after)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Blob storage backend benchmark.
+
+Measures put, streamed get, exists and delete for each GLB_STORAGE spec,
+with GLB-sized blobs, so backends can be compared on the same machine:
+    python bench/storage_bench.py --backend memory --backend local:/tmp/glb-bench
+    python bench/storage_bench.py --backend local      # a temporary directory
+    GLB_S3_ENDPOINT_URL=http://localhost:9000 python bench/storage_bench.py --backend s3://glbs/bench
+
+Blobs above the S3 part size (8MB) exercise multipart uploads.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_backend(spec, size_mb, count, default_root=None):
+    store = storage.open_store(spec, default_root)
+    size = int(size_mb * 1024 * 1024)
+    keys = [f'bench-{os.getpid()}-{i}.glb' for i in range(count)]
+    blobs = [os.urandom(size) for _ in range(count)]
+
+    put_time = sum(_timed(store.put, key, blob)[0] for key, blob in zip(keys, blobs))
+
+    get_time = 0
+    for key, blob in zip(keys, blobs):
+        elapsed, received = _timed(lambda k: sum(len(block) for block in store.stream(k)), key)
+        get_time += elapsed
+        if received != len(blob):
+            raise IOError(f'{spec}: read {received} of {len(blob)} bytes for {key}')
+
+    exists_time = sum(_timed(store.exists, key)[0] for key in keys)
+    delete_time = sum(_timed(store.delete, key)[0] for key in keys)
+
+    total_mb = size * count / (1024 * 1024)
+    row = {
+        'backend': store.spec,
+        'size_mb': size_mb,
+        'count': count,
+        'put_mb_s': round(total_mb / put_time, 1) if put_time else None,
+        'get_mb_s': round(total_mb / get_time, 1) if get_time else None,
+        'exists_ms': round(exists_time / count * 1000, 2),
+        'delete_ms': round(delete_time / count * 1000, 2),
+    }
+    print(f"{row['backend']:<30} put {row['put_mb_s']:>8} MB/s, get {row['get_mb_s']:>8} MB/s, "
+          f"exists {row['exists_ms']} ms, delete {row['delete_ms']} ms")
+    return row
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', help='Storage spec (repeatable), as GLB_STORAGE')
+    parser.add_argument('--size-mb', type=float, default=4)
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    # Plain 'local' benchmarks a throwaway directory
+    scratch = tempfile.mkdtemp(prefix='glb-storage-bench-')
+    try:
+        results = [bench_backend(spec, args.size_mb, args.count, scratch) for spec in args.backend or ['memory']]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
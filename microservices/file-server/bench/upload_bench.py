@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Upload hashing throughput benchmark.
+
+hash mode measures how SHA-256 over GLB-sized buffers scales with processes
+versus threads on this machine, i.e. the ceiling prefork mode can reach:
+    python bench/upload_bench.py hash [--size-mb 8] [--seconds 3]
+
+http mode posts raw GLB uploads to a running file server at increasing
+client concurrency, to compare FILESERVER_WORKERS settings end to end:
+    FILESERVER_WORKERS=4 python fileserver.py 9909 &
+    python bench/upload_bench.py http --url http://localhost:9909 [--size-mb 4] [--seconds 10]
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def _levels(maximum):
+    levels = [1]
+    while levels[-1] * 2 <= maximum:
+        levels.append(levels[-1] * 2)
+    if levels[-1] != maximum:
+        levels.append(maximum)
+    return levels
+
+
+def _hash_for(seconds, size):
+    data = os.urandom(size)
+    hashed = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        hashlib.sha256(data).hexdigest()
+        hashed += size
+    return hashed
+
+
+def bench_hash(size_mb, seconds, max_workers):
+    size = int(size_mb * 1024 * 1024)
+    results = []
+    for workers in _levels(max_workers):
+        row = {'workers': workers}
+        for label, executor_class in (('processes', ProcessPoolExecutor), ('threads', ThreadPoolExecutor)):
+            with executor_class(max_workers=workers) as executor:
+                start = time.perf_counter()
+                hashed = sum(executor.map(_hash_for, [seconds] * workers, [size] * workers))
+                elapsed = time.perf_counter() - start
+            row[f'{label}_mb_s'] = round(hashed / elapsed / (1024 * 1024), 1)
+        results.append(row)
+        print(f"{workers:>3} workers: {row['processes_mb_s']:>9.1f} MB/s processes, {row['threads_mb_s']:>9.1f} MB/s threads")
+
+    base = results[0]['processes_mb_s']
+    for row in results:
+        row['process_speedup'] = round(row['processes_mb_s'] / base, 2) if base else None
+    return results
+
+
+def bench_http(url, size_mb, seconds, max_clients):
+    size = int(size_mb * 1024 * 1024)
+    results = []
+    for clients in _levels(max_clients):
+        counts = {'ok': 0, 'errors': 0, 'bytes': 0}
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def client():
+            # Unique payloads so every upload is hashed and written
+            payload = bytearray(os.urandom(size))
+            n = 0
+            while time.perf_counter() < deadline:
+                n += 1
+                payload[:8] = n.to_bytes(8, 'little')
+                request = urllib.request.Request(
+                    f'{url}/api/store_glb?mesh_name=bench',
+                    data=bytes(payload),
+                    headers={'Content-Type': 'application/octet-stream'},
+                    method='POST'
+                )
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=60) as response:
+                        response.read()
+                    ok = True
+                except Exception:
+                    ok = False
+                with lock:
+                    if ok:
+                        counts['ok'] += 1
+                        counts['bytes'] += size
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        counts['errors'] += 1
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        row = {
+            'clients': clients,
+            'uploads_s': round(counts['ok'] / elapsed, 2),
+            'mb_s': round(counts['bytes'] / elapsed / (1024 * 1024), 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+            'errors': counts['errors'],
+        }
+        results.append(row)
+        print(f"{clients:>3} clients: {row['uploads_s']:>7.2f} uploads/s, {row['mb_s']:>7.1f} MB/s, "
+              f"p50 {row['p50_ms']} ms, p99 {row['p99_ms']} ms, {row['errors']} errors")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['hash', 'http'])
+    parser.add_argument('--url', default='http://localhost:9909')
+    parser.add_argument('--size-mb', type=float, default=None)
+    parser.add_argument('--seconds', type=float, default=None)
+    parser.add_argument('--max', type=int, default=os.cpu_count() or 1, help='Highest worker/client count')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    if args.mode == 'hash':
+        results = bench_hash(args.size_mb or 8, args.seconds or 3, args.max)
+    else:
+        results = bench_http(args.url, args.size_mb or 4, args.seconds or 10, args.max)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'mode': args.mode, 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
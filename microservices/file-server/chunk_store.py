@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Content-defined chunk storage for GLB revisions.
+
+Files are split with FastCDC-style gear hashing (normalized chunking with a
+strict mask before the average size and a loose mask after it), so an edit
+in one part of a GLB only changes the chunks around it. Unique chunks are
+stored once under chunks/<aa>/<sha256>, and every file gets a recipe under
+recipes/<file_hash>.json listing its chunks in order.
+
+Usage:
+    python chunk_store.py analyze <glb_dir>    # dedupe ratio if <glb_dir> were chunked
+    python chunk_store.py stats <store_root>   # dedupe ratio of an existing store
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+
+from fsutil import write_file_atomic
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_MIN_SIZE = 16 * 1024
+DEFAULT_AVG_SIZE = 64 * 1024
+DEFAULT_MAX_SIZE = 256 * 1024
+
+# Normalization level: the strict mask has avg_bits + 2 bits, the loose one avg_bits - 2
+NORMALIZATION = 2
+
+# Bytes hashed at once by the NumPy path; its temporaries are a few times this,
+# whatever the file size
+HASH_WINDOW = 1024 * 1024
+
+
+def _gear_table():
+    """256 deterministic pseudo-random 32-bit values; must never change once chunks exist."""
+    return [int.from_bytes(hashlib.sha256(b'banter-gear-%d' % i).digest()[:4], 'little') for i in range(256)]
+
+
+GEAR = _gear_table()
+
+
+def _top_mask(bits):
+    # The high bits of a 32-bit gear hash depend on the whole 32-byte window
+    return ((1 << bits) - 1) << (32 - bits)
+
+
+def _gear_hashes_numpy(data):
+    """Gear hash after every byte: h[i] = sum(GEAR[data[i-j]] << j for j < 32) mod 2^32."""
+    gear = np.array(GEAR, dtype=np.uint32)[np.frombuffer(data, dtype=np.uint8)]
+    hashes = gear.copy()
+    for shift in range(1, 32):
+        hashes[shift:] += gear[:-shift] << np.uint32(shift)
+    return hashes
+
+
+def _cut_candidates_numpy(data, mask_strict, mask_loose, window=HASH_WINDOW):
+    """
+    Offsets whose gear hash matches the strict and the loose mask, as two sorted
+    arrays. Hashed window by window: each window starts 31 bytes early so the
+    hashes of its own bytes still see their full 32-byte history.
+    """
+    strict, loose = [], []
+    view = memoryview(data)
+    for offset in range(0, len(data), window):
+        history = min(offset, 31)
+        hashes = _gear_hashes_numpy(view[offset - history:offset + window])[history:]
+        strict.append(np.flatnonzero((hashes & np.uint32(mask_strict)) == 0) + offset)
+        loose.append(np.flatnonzero((hashes & np.uint32(mask_loose)) == 0) + offset)
+    return np.concatenate(strict), np.concatenate(loose)
+
+
+def chunk_boundaries(data, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE):
+    """Return the end offset of every chunk in data."""
+    n = len(data)
+    if n <= min_size:
+        return [n] if n else []
+
+    avg_bits = max(1, avg_size.bit_length() - 1)
+    mask_strict = _top_mask(avg_bits + NORMALIZATION)
+    mask_loose = _top_mask(max(1, avg_bits - NORMALIZATION))
+
+    if not NUMPY_AVAILABLE:
+        return _chunk_boundaries_python(data, min_size, avg_size, max_size, mask_strict, mask_loose)
+
+    strict, loose = _cut_candidates_numpy(data, mask_strict, mask_loose)
+
+    def first_in(candidates, lo, hi):
+        i = np.searchsorted(candidates, lo)
+        if i < len(candidates) and candidates[i] < hi:
+            return int(candidates[i])
+        return None
+
+    boundaries = []
+    start = 0
+    while start < n:
+        if n - start <= min_size:
+            boundaries.append(n)
+            break
+        normal = min(start + avg_size, n)
+        end = min(start + max_size, n)
+        cut = first_in(strict, start + min_size, normal)
+        if cut is None:
+            cut = first_in(loose, normal, end)
+        cut = end if cut is None else cut + 1
+        boundaries.append(cut)
+        start = cut
+    return boundaries
+
+
+def _chunk_boundaries_python(data, min_size, avg_size, max_size, mask_strict, mask_loose):
+    n = len(data)
+    boundaries = []
+    start = 0
+    while start < n:
+        if n - start <= min_size:
+            boundaries.append(n)
+            break
+        normal = min(start + avg_size, n)
+        end = min(start + max_size, n)
+        h = 0
+        # Warm the hash over the window preceding the first eligible cut point
+        i = start + min_size - 32
+        cut = end
+        while i < end:
+            h = ((h << 1) + GEAR[data[i]]) & 0xFFFFFFFF
+            if i >= start + min_size:
+                mask = mask_strict if i < normal else mask_loose
+                if not h & mask:
+                    cut = i + 1
+                    break
+            i += 1
+        boundaries.append(cut)
+        start = cut
+    return boundaries
+
+
+def split_chunks(data, **sizes):
+    start = 0
+    for end in chunk_boundaries(data, **sizes):
+        yield data[start:end]
+        start = end
+
+
+class ChunkStore:
+    def __init__(self, root, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE):
+        self.root = root
+        self.chunk_dir = os.path.join(root, 'chunks')
+        self.recipe_dir = os.path.join(root, 'recipes')
+        self.sizes = {'min_size': min_size, 'avg_size': avg_size, 'max_size': max_size}
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.recipe_dir, exist_ok=True)
+
+    def _chunk_path(self, chunk_hash):
+        return os.path.join(self.chunk_dir, chunk_hash[:2], chunk_hash)
+
+    def _recipe_path(self, file_hash):
+        return os.path.join(self.recipe_dir, f'{file_hash}.json')
+
+    def has(self, file_hash):
+        return os.path.exists(self._recipe_path(file_hash))
+
+    def recipe(self, file_hash):
+        try:
+            with open(self._recipe_path(file_hash)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def size(self, file_hash):
+        recipe = self.recipe(file_hash)
+        return recipe['size'] if recipe else None
+
+    def put(self, file_hash, data):
+        """
+        Store data under file_hash, writing only chunks the store doesn't have.
+
+        Returns:
+            dict: {'chunks': total chunk count, 'new_chunks': chunks written, 'new_bytes': bytes written}
+        """
+        chunks = []
+        new_chunks = 0
+        new_bytes = 0
+        touched_dirs = set()
+
+        for chunk in split_chunks(data, **self.sizes):
+            chunk_hash = hashlib.sha256(chunk).hexdigest()
+            chunks.append([chunk_hash, len(chunk)])
+            path = self._chunk_path(chunk_hash)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.tmp.{uuid.uuid4().hex}'
+            with open(tmp_path, 'wb') as f:
+                f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            touched_dirs.add(os.path.dirname(path))
+            new_chunks += 1
+            new_bytes += len(chunk)
+
+        # Chunks must be durable before the recipe that points at them
+        for directory in touched_dirs:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        recipe = {'size': len(data), 'chunks': chunks}
+        write_file_atomic(self._recipe_path(file_hash), json.dumps(recipe).encode())
+        return {'chunks': len(chunks), 'new_chunks': new_chunks, 'new_bytes': new_bytes}
+
+    def iter_chunks(self, file_hash):
+        """Yield a stored file's chunks in order without loading it all into memory."""
+        recipe = self.recipe(file_hash)
+        if recipe is None:
+            raise FileNotFoundError(file_hash)
+        for chunk_hash, _ in recipe['chunks']:
+            with open(self._chunk_path(chunk_hash), 'rb') as f:
+                yield f.read()
+
+    def read(self, file_hash):
+        return b''.join(self.iter_chunks(file_hash))
+
+    def delete(self, file_hash):
+        """Remove a file's recipe; its chunks are reclaimed by sweep()."""
+        try:
+            os.remove(self._recipe_path(file_hash))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _recipes(self):
+        for name in os.listdir(self.recipe_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(self.recipe_dir, name)) as f:
+                    yield name[:-len('.json')], json.load(f)
+
+    def _stored_chunks(self):
+        for prefix in os.listdir(self.chunk_dir):
+            prefix_dir = os.path.join(self.chunk_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if '.tmp.' not in name:
+                    yield name, os.path.join(prefix_dir, name)
+
+    def sweep(self, dry_run=False, min_age=0):
+        """
+        Delete chunks no recipe references. Returns (chunks, bytes) reclaimed.
+
+        Chunks modified less than min_age seconds ago are kept, so a concurrent
+        put() that hasn't written its recipe yet doesn't lose them.
+        """
+        cutoff = time.time() - min_age
+        referenced = set()
+        for _, recipe in self._recipes():
+            referenced.update(chunk_hash for chunk_hash, _ in recipe['chunks'])
+
+        removed = 0
+        removed_bytes = 0
+        for chunk_hash, path in list(self._stored_chunks()):
+            if chunk_hash not in referenced and os.path.getmtime(path) <= cutoff:
+                removed += 1
+                removed_bytes += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+        return removed, removed_bytes
+
+    def stats(self):
+        files = 0
+        logical_bytes = 0
+        for _, recipe in self._recipes():
+            files += 1
+            logical_bytes += recipe['size']
+
+        chunk_count = 0
+        stored_bytes = 0
+        for _, path in self._stored_chunks():
+            chunk_count += 1
+            stored_bytes += os.path.getsize(path)
+
+        return {
+            'files': files,
+            'logical_bytes': logical_bytes,
+            'chunks': chunk_count,
+            'stored_bytes': stored_bytes,
+            'dedupe_ratio': round(logical_bytes / stored_bytes, 3) if stored_bytes else 1.0,
+            'saved_bytes': logical_bytes - stored_bytes,
+        }
+
+
+def analyze_directory(glb_dir, **sizes):
+    """Report how well the original GLBs in glb_dir would dedupe if chunked."""
+    seen = {}
+    files = 0
+    logical_bytes = 0
+    for name in sorted(os.listdir(glb_dir)):
+        # Only originals: <hash>.glb, not <hash>.optimized.glb
+        if not name.endswith('.glb') or name.count('.') != 1:
+            continue
+        with open(os.path.join(glb_dir, name), 'rb') as f:
+            data = f.read()
+        files += 1
+        logical_bytes += len(data)
+        for chunk in split_chunks(data, **sizes):
+            seen.setdefault(hashlib.sha256(chunk).digest(), len(chunk))
+
+    stored_bytes = sum(seen.values())
+    return {
+        'files': files,
+        'logical_bytes': logical_bytes,
+        'chunks': len(seen),
+        'stored_bytes': stored_bytes,
+        'dedupe_ratio': round(logical_bytes / stored_bytes, 3) if stored_bytes else 1.0,
+        'saved_bytes': logical_bytes - stored_bytes,
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] not in ('analyze', 'stats'):
+        print(__doc__.strip().split('Usage:')[1])
+        sys.exit(1)
+    if sys.argv[1] == 'analyze':
+        print(json.dumps(analyze_directory(sys.argv[2]), indent=2))
+    else:
+        print(json.dumps(ChunkStore(sys.argv[2]).stats(), indent=2))
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Cluster mode for the file server.
+
+Every node gets the same membership list (CLUSTER_NODES, base URLs) and its
+own URL (CLUSTER_SELF). Each GLB hash is placed on CLUSTER_REPLICAS nodes
+chosen by consistent hashing, so adding a node only moves ~1/N of the hashes.
+
+- After an upload the receiving node keeps its copy and pushes the GLB to the
+  other owners in the background (POST /api/cluster/replica).
+- On a local miss a node fetches the GLB from its owners (then any other
+  peer) with local=1 so peers never recurse, verifies the SHA-256 and keeps
+  a copy. Concurrent misses for the same hash share one peer fetch.
+
+Membership can also come from a file (CLUSTER_NODES_FILE, one URL per line)
+that is re-read when it changes.
+
+Usage (several local nodes on different ports, each with its own ASSETS_ROOT):
+    python cluster.py local 3 [--base-port 9931] [--workdir /tmp/glb-cluster]
+"""
+import bisect
+import hashlib
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+VIRTUAL_NODES = 64
+PEER_TIMEOUT = 30
+
+
+class HashRing:
+    def __init__(self, nodes, vnodes=VIRTUAL_NODES):
+        self.nodes = sorted(set(nodes))
+        self._ring = sorted(
+            (self._position(f'{node}#{i}'), node)
+            for node in self.nodes
+            for i in range(vnodes)
+        )
+        self._keys = [position for position, _ in self._ring]
+
+    @staticmethod
+    def _position(key):
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def owners(self, key, count):
+        """The first count distinct nodes clockwise from key's position."""
+        if not self._ring:
+            return []
+        count = min(count, len(self.nodes))
+        owners = []
+        i = bisect.bisect(self._keys, self._position(key))
+        while len(owners) < count:
+            node = self._ring[i % len(self._ring)][1]
+            if node not in owners:
+                owners.append(node)
+            i += 1
+        return owners
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers wait for and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = func()
+            except Exception as e:
+                call['error'] = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call['done'].set()
+
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+
+class Cluster:
+    def __init__(self, self_url, nodes=None, replicas=2, nodes_file=None, timeout=PEER_TIMEOUT):
+        self.self_url = self_url.rstrip('/')
+        self.replicas = max(1, replicas)
+        self.nodes_file = nodes_file
+        self.timeout = timeout
+        self._nodes_mtime = None
+        self._flight = SingleFlight()
+        self.stats = {'peer_hits': 0, 'peer_misses': 0, 'coalesced': 0, 'replicated': 0, 'replica_errors': 0}
+        self._set_nodes(nodes or [])
+
+    def _set_nodes(self, nodes):
+        nodes = [node.rstrip('/') for node in nodes if node.strip()]
+        if self.self_url not in nodes:
+            nodes.append(self.self_url)
+        self.ring = HashRing(nodes)
+
+    def _refresh(self):
+        if not self.nodes_file:
+            return
+        try:
+            mtime = os.path.getmtime(self.nodes_file)
+        except OSError:
+            return
+        if mtime != self._nodes_mtime:
+            with open(self.nodes_file) as f:
+                self._set_nodes([line.strip() for line in f if line.strip() and not line.startswith('#')])
+            self._nodes_mtime = mtime
+            print(f"[INFO] Cluster membership: {', '.join(self.ring.nodes)}")
+
+    @property
+    def nodes(self):
+        self._refresh()
+        return self.ring.nodes
+
+    def owners(self, file_hash):
+        self._refresh()
+        return self.ring.owners(file_hash, self.replicas)
+
+    def is_owner(self, file_hash):
+        return self.self_url in self.owners(file_hash)
+
+    def _peer_order(self, file_hash):
+        owners = [node for node in self.owners(file_hash) if node != self.self_url]
+        others = [node for node in self.nodes if node != self.self_url and node not in owners]
+        return owners + others
+
+    def _fetch_from(self, peer, file_hash):
+        url = f'{peer}/api/fetch_glb?file={file_hash}&variant=original&local=1'
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                data = response.read()
+        except (urllib.error.URLError, OSError) as e:
+            if not isinstance(e, urllib.error.HTTPError) or e.code != 404:
+                print(f"[WARNING] Peer fetch of {file_hash} from {peer} failed: {e}")
+            return None
+        if hashlib.sha256(data).hexdigest() != file_hash:
+            print(f"[WARNING] Peer {peer} returned corrupt data for {file_hash}")
+            return None
+        return data
+
+    def fetch(self, file_hash):
+        """Fetch a GLB from peers, coalescing concurrent misses. Returns bytes or None."""
+        def fetch_any():
+            for peer in self._peer_order(file_hash):
+                data = self._fetch_from(peer, file_hash)
+                if data is not None:
+                    self.stats['peer_hits'] += 1
+                    print(f"[DEBUG] Fetched {file_hash} from peer {peer} ({len(data)} bytes)")
+                    return data
+            self.stats['peer_misses'] += 1
+            return None
+
+        leader = []
+
+        def run():
+            leader.append(True)
+            return fetch_any()
+
+        data = self._flight.do(file_hash, run)
+        if not leader:
+            self.stats['coalesced'] += 1
+        return data
+
+    def _push(self, peer, file_hash, data):
+        request = urllib.request.Request(
+            f'{peer}/api/cluster/replica?hash={file_hash}',
+            data=data,
+            headers={'Content-Type': 'application/octet-stream'},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def replicate_async(self, file_hash, data):
+        """Push a freshly uploaded GLB to its other owners without blocking the upload."""
+        peers = [node for node in self.owners(file_hash) if node != self.self_url]
+        if not peers:
+            return []
+
+        def push_all():
+            for peer in peers:
+                for attempt in range(3):
+                    try:
+                        self._push(peer, file_hash, data)
+                        self.stats['replicated'] += 1
+                        print(f"[DEBUG] Replicated {file_hash} to {peer}")
+                        break
+                    except (urllib.error.URLError, OSError) as e:
+                        if attempt == 2:
+                            # The owner will fetch it on its first miss instead
+                            self.stats['replica_errors'] += 1
+                            print(f"[WARNING] Replicating {file_hash} to {peer} failed: {e}")
+                        else:
+                            time.sleep(2 ** attempt)
+
+        threading.Thread(target=push_all, name=f'replicate-{file_hash[:8]}', daemon=True).start()
+        return peers
+
+    def describe(self, file_hash=None):
+        info = {'self': self.self_url, 'nodes': self.nodes, 'replicas': self.replicas, 'stats': dict(self.stats)}
+        if file_hash:
+            info['owners'] = self.owners(file_hash)
+        return info
+
+
+def run_local_cluster(count, base_port, workdir):
+    """Start count file-server nodes on consecutive ports, each with its own directory."""
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, interrupt)
+
+    nodes = [f'http://localhost:{base_port + i}' for i in range(count)]
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fileserver.py')
+    processes = []
+    for i, node in enumerate(nodes):
+        node_dir = os.path.join(workdir, f'node{i}')
+        os.makedirs(node_dir, exist_ok=True)
+        env = dict(os.environ, CLUSTER_NODES=','.join(nodes), CLUSTER_SELF=node, ASSETS_ROOT=os.path.join(node_dir, 'data'))
+        processes.append(subprocess.Popen([sys.executable, server, str(base_port + i), node_dir], env=env))
+        print(f"[INFO] Node {i}: {node} serving {node_dir}")
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['local'])
+    parser.add_argument('count', type=int)
+    parser.add_argument('--base-port', type=int, default=9931)
+    parser.add_argument('--workdir', default=os.path.join('/tmp', 'glb-cluster'))
+    args = parser.parse_args()
+    run_local_cluster(args.count, args.base_port, args.workdir)
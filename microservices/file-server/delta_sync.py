@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+rsync-style delta uploads for GLB revisions.
+
+The client downloads block signatures for a base file it uploaded before,
+finds which blocks of the new revision already exist on the server with a
+rolling weak checksum confirmed by a strong hash, and uploads only a recipe
+plus the bytes that didn't match.
+
+Signature format (little endian):
+    b'BSIG' | u32 block_size | u64 file_size | u32 block_count
+    then per full-size block: u32 weak checksum | 8-byte BLAKE2b digest
+
+Delta body format:
+    u32 recipe_length | recipe JSON | literal bytes
+    recipe = {"block_size": n, "ops": [["c", first_block, block_count], ["d", literal_offset, length], ...]}
+
+The client-side counterpart lives in the Blender addon (utils/delta_sync.py)
+and must compute identical checksums.
+"""
+import hashlib
+import json
+import struct
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SIGNATURE_MAGIC = b'BSIG'
+STRONG_DIGEST_SIZE = 8
+DEFAULT_BLOCK_SIZE = 8192
+MIN_BLOCK_SIZE = 512
+MAX_BLOCK_SIZE = 1024 * 1024
+
+
+class DeltaError(ValueError):
+    """Raised for malformed delta bodies or recipes."""
+
+
+def strong_checksum(block):
+    return hashlib.blake2b(block, digest_size=STRONG_DIGEST_SIZE).digest()
+
+
+def weak_checksum(block):
+    """rsync weak checksum: a = sum(x), b = sum((L - i) * x_i), both mod 2^16."""
+    length = len(block)
+    a = sum(block)
+    b = sum((length - i) * x for i, x in enumerate(block))
+    return (a & 0xFFFF) | ((b & 0xFFFF) << 16)
+
+
+def _block_weak_checksums(data, block_size, block_count):
+    if not NUMPY_AVAILABLE:
+        return [weak_checksum(data[i * block_size:(i + 1) * block_size]) for i in range(block_count)]
+    blocks = np.frombuffer(data, dtype=np.uint8, count=block_count * block_size).reshape(block_count, block_size)
+    blocks = blocks.astype(np.int64)
+    a = blocks.sum(axis=1)
+    b = (blocks * np.arange(block_size, 0, -1, dtype=np.int64)).sum(axis=1)
+    return ((a & 0xFFFF) | ((b & 0xFFFF) << 16)).tolist()
+
+
+def block_signatures(data, block_size=DEFAULT_BLOCK_SIZE):
+    """Build the binary signature of every full-size block in data."""
+    block_count = len(data) // block_size
+    weak = _block_weak_checksums(data, block_size, block_count)
+    out = bytearray(SIGNATURE_MAGIC)
+    out += struct.pack('<IQI', block_size, len(data), block_count)
+    for i in range(block_count):
+        out += struct.pack('<I', weak[i])
+        out += strong_checksum(data[i * block_size:(i + 1) * block_size])
+    return bytes(out)
+
+
+def parse_delta_body(body):
+    """Split a delta upload body into (recipe dict, literal bytes)."""
+    if len(body) < 4:
+        raise DeltaError('Delta body too short')
+    (recipe_length,) = struct.unpack_from('<I', body, 0)
+    if 4 + recipe_length > len(body):
+        raise DeltaError('Recipe length exceeds body size')
+    try:
+        recipe = json.loads(body[4:4 + recipe_length].decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise DeltaError(f'Invalid recipe JSON: {e}')
+    return recipe, body[4 + recipe_length:]
+
+
+def apply_delta(base, recipe, literal, max_size=None):
+    """Rebuild a file from base blocks and literal ranges described by recipe."""
+    block_size = recipe.get('block_size')
+    if not isinstance(block_size, int) or not MIN_BLOCK_SIZE <= block_size <= MAX_BLOCK_SIZE:
+        raise DeltaError('Invalid block_size')
+    base_blocks = len(base) // block_size
+
+    out = bytearray()
+    for op in recipe.get('ops', []):
+        if not isinstance(op, list) or len(op) != 3 or not all(isinstance(v, int) and v >= 0 for v in op[1:]):
+            raise DeltaError(f'Malformed op: {op!r}')
+        kind, start, count = op
+        if kind == 'c':
+            if start + count > base_blocks:
+                raise DeltaError('Copy op references blocks beyond the base file')
+            out += base[start * block_size:(start + count) * block_size]
+        elif kind == 'd':
+            if start + count > len(literal):
+                raise DeltaError('Data op references bytes beyond the literal section')
+            out += literal[start:start + count]
+        else:
+            raise DeltaError(f'Unknown op kind: {kind!r}')
+        if max_size is not None and len(out) > max_size:
+            raise DeltaError('Reconstructed file exceeds the size limit')
+    return bytes(out)
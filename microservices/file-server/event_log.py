@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Upload event log behind the /api/events Server-Sent Events feed.
+
+Every upload and every finished asset job appends a row to a SQLite table
+next to the other asset databases, so all prefork workers and the job
+dispatcher share one ordered log. Row ids are the SSE event ids: a client
+that reconnects with Last-Event-ID gets everything it missed, as long as it
+is still retained.
+
+Subscribers in the publishing process are woken immediately; events written
+by other processes are picked up by one watcher thread per process that
+polls the newest id while anyone is subscribed.
+
+Events are filtered per user the same way the Firebase glb_loader pointer
+is keyed: an upload made with a username and secret is only delivered to
+subscribers presenting both, one made with just a username to subscribers
+for that username, and an anonymous one to everyone without a username.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_RETAIN = 10000
+DEFAULT_POLL_INTERVAL = 0.05
+PRUNE_EVERY = 100
+SCAN_LIMIT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    file_hash TEXT,
+    username TEXT,
+    channel TEXT,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_file_hash ON events (file_hash);
+"""
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def channel_for(username, secret):
+    """Opaque per-user channel; the secret itself is never stored."""
+    if not username or not secret:
+        return None
+    return hashlib.sha256(f'{username}\0{secret}'.encode()).hexdigest()
+
+
+def _row_to_event(row):
+    event = json.loads(row['data'])
+    event.update({'id': row['id'], 'kind': row['kind'], 'hash': row['file_hash'], 'time': row['created_at']})
+    return event
+
+
+class EventLog:
+    def __init__(self, db_path, retain=DEFAULT_RETAIN, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.db_path = db_path
+        self.retain = retain
+        self.poll_interval = poll_interval
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = connect(db_path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._cond = threading.Condition()
+        self._head = self.latest_id()
+        self._subscribers = 0
+        self._watcher = None
+        self._stopping = threading.Event()
+
+    def latest_id(self):
+        conn = connect(self.db_path)
+        try:
+            return conn.execute('SELECT MAX(id) FROM events').fetchone()[0] or 0
+        finally:
+            conn.close()
+
+    def oldest_id(self):
+        conn = connect(self.db_path)
+        try:
+            return conn.execute('SELECT MIN(id) FROM events').fetchone()[0] or 0
+        finally:
+            conn.close()
+
+    def close(self):
+        """End every subscription so a draining worker isn't held open by event streams."""
+        with self._cond:
+            self._stopping.set()
+            self._cond.notify_all()
+
+    def publish(self, kind, file_hash=None, username=None, channel=None, data=None):
+        """Append an event and wake local subscribers. Returns its id."""
+        conn = connect(self.db_path)
+        try:
+            event_id = conn.execute(
+                'INSERT INTO events (kind, file_hash, username, channel, data, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, file_hash, username or None, channel, json.dumps(data or {}), time.time())
+            ).lastrowid
+            if self.retain and event_id % PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM events WHERE id <= ?', (event_id - self.retain,))
+        finally:
+            conn.close()
+
+        with self._cond:
+            self._head = max(self._head, event_id)
+            self._cond.notify_all()
+        return event_id
+
+    def publish_for_hash(self, kind, file_hash, data=None):
+        """Publish to every user who uploaded file_hash, e.g. when a derived variant is ready."""
+        conn = connect(self.db_path)
+        try:
+            audiences = conn.execute(
+                "SELECT DISTINCT username, channel FROM events WHERE file_hash = ? AND kind = 'upload'",
+                (file_hash,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self.publish(kind, file_hash, row['username'], row['channel'], data) for row in audiences]
+
+    @staticmethod
+    def visible(row, username=None, channel=None):
+        if row['username'] is None:
+            return username is None
+        if row['username'] != username:
+            return False
+        return row['channel'] is None or row['channel'] == channel
+
+    def since(self, last_id, username=None, channel=None, limit=SCAN_LIMIT):
+        """
+        Events after last_id visible to this subscriber.
+
+        Returns:
+            tuple: (events, cursor) where cursor is the highest id scanned,
+            including events filtered out for this subscriber
+        """
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute('SELECT * FROM events WHERE id > ? ORDER BY id LIMIT ?', (last_id, limit)).fetchall()
+        finally:
+            conn.close()
+        events = [_row_to_event(row) for row in rows if self.visible(row, username, channel)]
+        return events, (rows[-1]['id'] if rows else last_id)
+
+    def _watch(self):
+        """Notice events written by other processes while anyone is subscribed."""
+        conn = connect(self.db_path)
+        try:
+            while True:
+                with self._cond:
+                    if not self._subscribers:
+                        self._watcher = None
+                        return
+                head = conn.execute('SELECT MAX(id) FROM events').fetchone()[0] or 0
+                with self._cond:
+                    if head > self._head:
+                        self._head = head
+                        self._cond.notify_all()
+                time.sleep(self.poll_interval)
+        finally:
+            conn.close()
+
+    def subscribe(self, last_id=None, username=None, channel=None, heartbeat=15.0):
+        """
+        Yield events after last_id (default: only new ones) as they are published.
+
+        Yields None every heartbeat seconds without events so the caller can keep
+        the connection alive, and a 'resync' event first when last_id is older than
+        the retained log. Close the generator to unsubscribe; it also returns
+        once the log is closed.
+        """
+        with self._cond:
+            self._subscribers += 1
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name='event-watcher', daemon=True)
+                self._watcher.start()
+        try:
+            if last_id is None:
+                cursor = self.latest_id()
+            else:
+                cursor = last_id
+                oldest = self.oldest_id()
+                if oldest and cursor < oldest - 1:
+                    yield {'id': oldest - 1, 'kind': 'resync', 'hash': None, 'time': time.time()}
+                    cursor = oldest - 1
+
+            while not self._stopping.is_set():
+                events, cursor = self.since(cursor, username, channel)
+                for event in events:
+                    yield event
+                if events or cursor < self._head:
+                    continue
+                with self._cond:
+                    woken = self._cond.wait_for(lambda: self._head > cursor or self._stopping.is_set(), timeout=heartbeat)
+                if not woken:
+                    yield None
+        finally:
+            with self._cond:
+                self._subscribers -= 1
@@ -1,11 +1,29 @@
 #!/usr/bin/env python3
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 import os, sys
 import urllib.request
 import json
 import hashlib
 import time
 import random
+import threading
+import hmac
+from contextlib import nullcontext
+from job_queue import JobQueue
+from asset_tasks import read_original
+import delta_sync
+from chunk_store import ChunkStore
+import glb_files
+from upload_sessions import UploadSessionStore, UploadError, ChecksumMismatch
+from prefork import PreforkServer
+from admission import AdmissionController, Overloaded
+from asset_index import AssetIndex
+import glb_gc
+from cluster import Cluster
+from storage import open_store
+from event_log import EventLog, channel_for
+from request_profiler import RequestProfiler
+import tracing
 try:
     import firebase_admin
     from firebase_admin import credentials, db
@@ -35,9 +53,254 @@ if FIREBASE_AVAILABLE:
         print(f"[WARNING] Failed to initialize Firebase: {e}")
         FIREBASE_AVAILABLE = False
 
+try:
+    import mesh_optimizer
+    MESH_OPTIMIZER_AVAILABLE = True
+except ImportError:
+    MESH_OPTIMIZER_AVAILABLE = False
+    print("[WARNING] NumPy not installed, GLB mesh optimization disabled. Run: pip install numpy")
+
+# Writable server state: GLBs, upload sessions, the job/index/event databases and
+# profiles. Kept out of the served frontend tree, which may be read-only (Docker)
+ASSETS_ROOT = os.path.abspath(os.getenv('ASSETS_ROOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')))
+
+# Mesh optimization of uploaded GLBs (vertex cache / overdraw / fetch order)
+GLB_OPTIMIZE = os.getenv('GLB_OPTIMIZE', 'true').lower() == 'true'
+GLB_OPTIMIZE_CACHE_SIZE = int(os.getenv('GLB_OPTIMIZE_CACHE_SIZE', '16'))
+
+# Background processing of derived assets, see job_queue.py
+GLB_JOB_WORKERS = int(os.getenv('GLB_JOB_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+GLB_JOB_MAX_ATTEMPTS = int(os.getenv('GLB_JOB_MAX_ATTEMPTS', '3'))
+JOB_QUEUE = None
+# Set when this process is draining, so scheduled work stops
+PROCESS_STOPPING = threading.Event()
+
+# Blob storage for GLBs and derived files: local, local:<dir>, memory or s3://bucket/prefix, see storage.py
+GLB_STORAGE = os.getenv('GLB_STORAGE', 'local')
+STORE = None
+
+# Optional content-defined chunk storage for originals, see chunk_store.py
+GLB_CHUNK_STORE = os.getenv('GLB_CHUNK_STORE', 'false').lower() == 'true'
+CHUNK_STORE = None
+
+MAX_GLB_SIZE = 20 * 1024 * 1024
+
+# Upstreams of the proxied routes; overridable so benchmarks can point them at stubs
+PROCESS_TEXT_UPSTREAM = os.getenv('PROCESS_TEXT_UPSTREAM', 'http://localhost:5000').rstrip('/')
+DOCS_UPSTREAM = os.getenv('DOCS_UPSTREAM', 'http://localhost:4004').rstrip('/')
+SETCLAIMS_UPSTREAM = os.getenv('SETCLAIMS_UPSTREAM', 'http://localhost:3303').rstrip('/')
+
+# Resumable chunked uploads, see upload_sessions.py
+DEFAULT_UPLOAD_CHUNK_SIZE = int(os.getenv('GLB_UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+UPLOAD_SESSIONS = None
+
+
+# Garbage collection of unreferenced GLBs, see glb_gc.py
+GLB_GC_QUOTA_MB = float(os.getenv('GLB_GC_QUOTA_MB', '0'))
+GLB_GC_GRACE_HOURS = float(os.getenv('GLB_GC_GRACE_HOURS', str(glb_gc.DEFAULT_GRACE_HOURS)))
+GLB_GC_INTERVAL_HOURS = float(os.getenv('GLB_GC_INTERVAL_HOURS', '0'))
+GLB_GC_INVENTORY_DIRS = [d for d in os.getenv('GLB_GC_INVENTORY_DIRS', '').split(os.pathsep) if d] or glb_gc.default_reference_dirs()
+# /api/gc_report scans the whole store, so a report is reused for this long
+GLB_GC_REPORT_TTL = float(os.getenv('GLB_GC_REPORT_TTL', '300'))
+GC_REPORT = {'report': None, 'at': 0.0}
+GC_REPORT_LOCK = threading.Lock()
+ASSET_INDEX = None
+
+# Cluster mode: consistent-hash placement and peer fetch-on-miss, see cluster.py
+CLUSTER_SELF = os.getenv('CLUSTER_SELF', '')
+CLUSTER_NODES = [n for n in os.getenv('CLUSTER_NODES', '').split(',') if n]
+CLUSTER_NODES_FILE = os.getenv('CLUSTER_NODES_FILE', '')
+CLUSTER_REPLICAS = int(os.getenv('CLUSTER_REPLICAS', '2'))
+CLUSTER = None
+
+# Server-Sent Events feed of uploads and finished asset jobs, see event_log.py
+EVENTS_RETAIN = int(os.getenv('EVENTS_RETAIN', '10000'))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS = None
+
+# Opt-in request profiling served at /debug/profiles, see request_profiler.py
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0.01'))
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '1000'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '200'))
+PROFILER = None
+
+# Tracing of the /api/process-text hop into the statement-block service, see tracing.py
+TRACE_LOG_FILE = os.getenv('TRACE_LOG_FILE', '')
+TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', '')
+TRACE_SAMPLE_RATIO = float(os.getenv('TRACE_SAMPLE_RATIO', '1.0'))
+
+# Prefork mode: N worker processes on one port, see prefork.py
+FILESERVER_WORKERS = int(os.getenv('FILESERVER_WORKERS', '1'))
+FILESERVER_REUSE_PORT = os.getenv('FILESERVER_REUSE_PORT', 'false').lower() == 'true'
+
+
+# Upload admission control and read priority, see admission.py
+UPLOAD_MAX_CONCURRENT = int(os.getenv('UPLOAD_MAX_CONCURRENT', '4'))
+UPLOAD_MAX_INFLIGHT_MB = int(os.getenv('UPLOAD_MAX_INFLIGHT_MB', '64'))
+UPLOAD_QUEUE_TIMEOUT = float(os.getenv('UPLOAD_QUEUE_TIMEOUT', '10'))
+UPLOAD_MAX_QUEUE = int(os.getenv('UPLOAD_MAX_QUEUE', '16'))
+UPLOAD_SLOTS_UNDER_READ_LOAD = int(os.getenv('UPLOAD_SLOTS_UNDER_READ_LOAD', '1'))
+ADMISSION = None
+
+# Rejected uploads up to this size are drained so the client can read the 503
+REJECT_DRAIN_LIMIT = 1024 * 1024
+
+
+def is_sha256_hex(value):
+    return len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+def sanitize_firebase_key(s):
+    return s.replace('.', '_').replace('$', '_').replace('#', '_').replace('[', '_').replace(']', '_').replace('/', '_')
+
+
+def init_process_state(worker_index=0):
+    """Build per-process state. In prefork mode every worker calls this after fork."""
+    global STORE, CHUNK_STORE, UPLOAD_SESSIONS, JOB_QUEUE, ADMISSION, ASSET_INDEX, CLUSTER, EVENTS, PROFILER
+    assets_root = ASSETS_ROOT
+    STORE = open_store(GLB_STORAGE, glb_assets_dir())
+    if GLB_STORAGE.startswith('memory'):
+        print("[WARNING] GLB_STORAGE=memory: uploads are lost on restart, asset jobs and GC are skipped")
+    if GLB_CHUNK_STORE:
+        CHUNK_STORE = ChunkStore(os.path.join(assets_root, 'chunkstore'))
+    UPLOAD_SESSIONS = UploadSessionStore(os.path.join(assets_root, 'uploads'), MAX_GLB_SIZE)
+    ASSET_INDEX = AssetIndex(os.path.join(assets_root, 'index.db'))
+    EVENTS = EventLog(os.path.join(assets_root, 'events.db'), retain=EVENTS_RETAIN)
+    # The OTLP exporter thread doesn't survive a fork, so every worker configures its own
+    tracing.configure('file-server', TRACE_LOG_FILE or None, TRACE_OTLP_ENDPOINT or None, TRACE_SAMPLE_RATIO)
+    # Profiles can reveal internals, so they only exist when a token protects them
+    if PROFILE_TOKEN:
+        PROFILER = RequestProfiler(
+            os.path.join(assets_root, 'profiles'),
+            sample_rate=PROFILE_SAMPLE_RATE,
+            slow_ms=PROFILE_SLOW_MS,
+            interval=PROFILE_INTERVAL_MS / 1000,
+            keep=PROFILE_KEEP
+        )
+    if CLUSTER_SELF:
+        CLUSTER = Cluster(CLUSTER_SELF, CLUSTER_NODES, CLUSTER_REPLICAS, CLUSTER_NODES_FILE or None)
+    ADMISSION = AdmissionController(
+        max_concurrent=UPLOAD_MAX_CONCURRENT,
+        max_bytes=UPLOAD_MAX_INFLIGHT_MB * 1024 * 1024,
+        queue_timeout=UPLOAD_QUEUE_TIMEOUT,
+        max_queue=UPLOAD_MAX_QUEUE,
+        slots_under_read_load=UPLOAD_SLOTS_UNDER_READ_LOAD
+    )
+    JOB_QUEUE = JobQueue(os.path.join(assets_root, 'jobs.db'), workers=GLB_JOB_WORKERS, on_finish=publish_job_event)
+    # Every worker can enqueue, but one dispatcher is enough; claims are atomic
+    # so two overlapping during a rolling reload is harmless
+    if worker_index == 0:
+        JOB_QUEUE.start()
+        if GLB_GC_INTERVAL_HOURS > 0 and not STORE.spec.startswith('memory'):
+            threading.Thread(target=schedule_gc, args=(assets_root,), name='glb-gc', daemon=True).start()
+
+
+def stop_process_state():
+    """End event streams and background work so a stopping prefork worker can drain."""
+    PROCESS_STOPPING.set()
+    EVENTS.close()
+    JOB_QUEUE.stop()
+
+
+def gc_payload(assets_root, dry_run):
+    return {
+        'assets_root': assets_root,
+        'quota_mb': GLB_GC_QUOTA_MB,
+        'grace_hours': GLB_GC_GRACE_HOURS,
+        'reference_dirs': GLB_GC_INVENTORY_DIRS,
+        'storage': STORE.spec,
+        'dry_run': dry_run
+    }
+
+
+def gc_report():
+    """Dry-run GC report, shared by requests for GLB_GC_REPORT_TTL seconds."""
+    # Concurrent requests wait for one scan instead of each running their own
+    with GC_REPORT_LOCK:
+        if GC_REPORT['report'] is None or time.time() - GC_REPORT['at'] > GLB_GC_REPORT_TTL:
+            GC_REPORT['report'] = glb_gc.run_gc(ASSETS_ROOT, GLB_GC_QUOTA_MB, GLB_GC_GRACE_HOURS,
+                                                GLB_GC_INVENTORY_DIRS, dry_run=True, storage_spec=STORE.spec)
+            GC_REPORT['at'] = time.time()
+        return GC_REPORT['report']
+
+
+def publish_job_event(kind, file_hash, status, result):
+    """Tell the uploaders' event feeds that a GLB was validated or its optimized variant is ready."""
+    if not file_hash:
+        return
+    if kind == 'validate_glb':
+        if status == 'succeeded':
+            EVENTS.publish_for_hash('validated', file_hash, result)
+        else:
+            EVENTS.publish_for_hash('validation_failed', file_hash, {'error': result})
+    elif kind == 'optimize_glb' and status == 'succeeded' and result.get('optimized'):
+        EVENTS.publish_for_hash('variant_ready', file_hash, dict(
+            result, variant='optimized', url=f'/api/fetch_glb?file={file_hash}'
+        ))
+
+
+def schedule_gc(assets_root):
+    """Queue a GC job every GLB_GC_INTERVAL_HOURS; it runs in the job pool, not the server."""
+    while not PROCESS_STOPPING.wait(GLB_GC_INTERVAL_HOURS * 3600):
+        job_id = JOB_QUEUE.enqueue('collect_garbage', gc_payload(assets_root, dry_run=False), max_attempts=1)
+        print(f"[INFO] Queued GLB garbage collection job {job_id}")
+
+
+def glb_assets_dir():
+    return os.path.join(ASSETS_ROOT, 'glbs')
+
+
+def is_stored(file_hash):
+    if STORE.exists(f'{file_hash}.glb'):
+        return True
+    return bool(CHUNK_STORE and CHUNK_STORE.has(file_hash))
+
+
+def store_copy(file_hash, glb_data):
+    """Keep a GLB that was uploaded elsewhere in the cluster (replica push or peer fetch)."""
+    if CHUNK_STORE:
+        CHUNK_STORE.put(file_hash, glb_data)
+    else:
+        STORE.put(f'{file_hash}.glb', glb_data)
+    ASSET_INDEX.record_upload(file_hash, len(glb_data))
+    # Derived variants are per node
+    enqueue_asset_jobs(file_hash)
+
+
+def ensure_local(file_hash):
+    """In cluster mode, fetch a GLB missing on this node from its peers. Returns True if stored locally."""
+    if is_stored(file_hash):
+        return True
+    if CLUSTER is None or not is_sha256_hex(file_hash):
+        return False
+    glb_data = CLUSTER.fetch(file_hash)
+    if glb_data is None:
+        return False
+    # Concurrent misses share one fetch, so only the first caller stores it
+    if not is_stored(file_hash):
+        store_copy(file_hash, glb_data)
+    return True
+
+
+def enqueue_asset_jobs(file_hash):
+    """Queue derived-asset processing for a stored GLB and return {kind: job_id}."""
+    # Job workers are separate processes and can't see an in-memory store
+    if JOB_QUEUE is None or STORE.spec.startswith('memory'):
+        return {}
+    payload = {'assets_dir': glb_assets_dir(), 'storage': STORE.spec, 'hash': file_hash}
+    jobs = {'validate_glb': JOB_QUEUE.enqueue('validate_glb', payload, file_hash, GLB_JOB_MAX_ATTEMPTS)}
+    if GLB_OPTIMIZE and MESH_OPTIMIZER_AVAILABLE:
+        optimize_payload = dict(payload, cache_size=GLB_OPTIMIZE_CACHE_SIZE)
+        jobs['optimize_glb'] = JOB_QUEUE.enqueue('optimize_glb', optimize_payload, file_hash, GLB_JOB_MAX_ATTEMPTS)
+    return jobs
+
+
 class CORSRequestHandler(SimpleHTTPRequestHandler):
     def send_response(self, code, message=None):
         print(f"[DEBUG] send_response({code}) for {self.path}")
+        self.status_code = code
         super().send_response(code, message)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET,HEAD,PUT,POST,OPTIONS')
@@ -49,8 +312,80 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
         self.send_response(200)
         self.end_headers()
     
+    def is_priority_read(self):
+        """GLB fetches and static files, which headsets wait on while loading a scene."""
+        if self.path.startswith('/api/fetch_glb'):
+            return True
+        return not self.path.startswith(('/api/', '/docs', '/debug/'))
+    
+    def is_upload(self):
+        return self.path.startswith(('/api/store_glb', '/api/uploads/', '/api/cluster/replica'))
+    
+    def reject_upload(self, overloaded):
+        content_length = int(self.headers.get('Content-Length') or 0)
+        if content_length <= REJECT_DRAIN_LIMIT:
+            self.rfile.read(content_length)
+        else:
+            # Not worth receiving megabytes to throw away; the client sees a reset and retries
+            self.close_connection = True
+        print(f"[WARNING] Rejected upload {self.path}: {overloaded.reason}, retry after {overloaded.retry_after}s")
+        self.send_response(503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Retry-After', str(overloaded.retry_after))
+        self.end_headers()
+        self.wfile.write(json.dumps({'error': f'Server busy: {overloaded.reason}', 'retry_after': overloaded.retry_after}).encode())
+    
+    def admit_upload(self, route, nbytes=None):
+        try:
+            if nbytes is None:
+                nbytes = int(self.headers.get('Content-Length') or 0)
+            with ADMISSION.upload(nbytes):
+                route()
+        except Overloaded as e:
+            self.reject_upload(e)
+    
+    def profiled(self):
+        """Sample this request's stacks when profiling is on; event streams are long-lived by design."""
+        if PROFILER is None or self.path.startswith(('/debug/', '/api/events')):
+            return nullcontext()
+        return PROFILER.request(self.command, self.path, self)
+    
     def do_GET(self):
         print(f"[DEBUG] GET request for {self.path}")
+        with self.profiled():
+            if self.is_priority_read():
+                with ADMISSION.reading():
+                    self.route_get()
+            else:
+                self.route_get()
+    
+    def do_POST(self):
+        print(f"[DEBUG] POST request for {self.path}")
+        with self.profiled():
+            if self.path.startswith('/api/uploads/') and self.path.endswith('/finalize'):
+                # Finalizing assembles the whole file in memory
+                try:
+                    nbytes = UPLOAD_SESSIONS.status(self.path[len('/api/uploads/'):-len('/finalize')].strip('/'))['size']
+                except FileNotFoundError:
+                    nbytes = 0
+                self.admit_upload(self.route_post, nbytes)
+            elif self.is_upload():
+                self.admit_upload(self.route_post)
+            elif self.is_priority_read():
+                with ADMISSION.reading():
+                    self.route_post()
+            else:
+                self.route_post()
+    
+    def do_PUT(self):
+        print(f"[DEBUG] PUT request for {self.path}")
+        with self.profiled():
+            if self.is_upload():
+                self.admit_upload(self.route_put)
+            else:
+                self.route_put()
+    
+    def route_get(self):
         if self.path.startswith('/api/fetch_glb'):
             try:
                 # Parse query parameters
@@ -69,12 +404,17 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                     self.wfile.write(error_response.encode())
                     return
                 
-                # Build file path
-                assets_dir = os.path.join(os.getcwd(), 'assets', 'glbs')
-                file_path = os.path.join(assets_dir, f'{file_hash}.glb')
+                # Peers fetching from us pass local=1 so a miss never fans out further
+                if query_params.get('local', [''])[0] != '1':
+                    ensure_local(file_hash)
+                
+                # Serve the optimized variant when one exists unless the original is requested;
+                # originals may live in the blob store or the chunk store
+                prefer_optimized = query_params.get('variant', [''])[0] != 'original'
+                found = glb_files.open_glb(STORE, file_hash, CHUNK_STORE, prefer_optimized) if is_sha256_hex(file_hash) else None
                 
                 # Check if file exists
-                if not os.path.exists(file_path):
+                if found is None:
                     self.send_response(404)
                     self.send_header('Content-Type', 'application/json')
                     self.end_headers()
@@ -82,17 +422,19 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                     self.wfile.write(error_response.encode())
                     return
                 
-                # Read and serve the GLB file
-                with open(file_path, 'rb') as f:
-                    glb_data = f.read()
-                
-                print(f"[DEBUG] Serving GLB file: {file_hash}.glb ({len(glb_data)} bytes)")
+                # Stream the GLB file without holding it in memory
+                variant_id, size, blocks = found
+                variant = 'optimized' if variant_id == glb_files.VARIANT_OPTIMIZED else 'original'
+                print(f"[DEBUG] Serving GLB file: {file_hash}.glb ({variant}, {size} bytes)")
+                ASSET_INDEX.record_fetch([file_hash])
                 
                 self.send_response(200)
                 self.send_header('Content-Type', 'model/gltf-binary')
-                self.send_header('Content-Length', str(len(glb_data)))
+                self.send_header('Content-Length', str(size))
+                self.send_header('X-GLB-Variant', variant)
                 self.end_headers()
-                self.wfile.write(glb_data)
+                for block in blocks:
+                    self.wfile.write(block)
                 
             except Exception as e:
                 self.send_response(500)
@@ -100,18 +442,122 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                 self.end_headers()
                 error_response = json.dumps({'error': str(e)})
                 self.wfile.write(error_response.encode())
+        elif self.path.startswith('/api/events'):
+            self.send_event_stream()
+        elif self.path.startswith('/debug/profiles'):
+            self.send_profiles()
+        elif self.path.startswith('/api/glb_report'):
+            from urllib.parse import urlparse, parse_qs
+            query_params = parse_qs(urlparse(self.path).query)
+            file_hash = query_params.get('file', [''])[0]
+            
+            try:
+                if not is_sha256_hex(file_hash):
+                    raise FileNotFoundError(file_hash)
+                report_data = STORE.read(f'{file_hash}.report.json')
+            except FileNotFoundError:
+                self.send_response(404)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': 'Report not found'}).encode())
+                return
+            
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(report_data)
+        elif self.path.startswith('/api/glb_signature'):
+            from urllib.parse import urlparse, parse_qs
+            query_params = parse_qs(urlparse(self.path).query)
+            file_hash = query_params.get('file', [''])[0]
+            try:
+                block_size = int(query_params.get('block_size', [delta_sync.DEFAULT_BLOCK_SIZE])[0])
+            except ValueError:
+                block_size = 0
+            
+            if not is_sha256_hex(file_hash) or not delta_sync.MIN_BLOCK_SIZE <= block_size <= delta_sync.MAX_BLOCK_SIZE:
+                self.send_json(400, {'error': 'Invalid file or block_size parameter'})
+                return
+            
+            try:
+                ensure_local(file_hash)
+                base_data = read_original(STORE, file_hash, CHUNK_STORE)
+            except FileNotFoundError:
+                self.send_json(404, {'error': 'File not found'})
+                return
+            
+            signature = delta_sync.block_signatures(base_data, block_size)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(signature)))
+            self.end_headers()
+            self.wfile.write(signature)
+        elif self.path.startswith('/api/uploads/'):
+            session_id = self.path[len('/api/uploads/'):].strip('/')
+            try:
+                self.send_json(200, UPLOAD_SESSIONS.status(session_id))
+            except FileNotFoundError:
+                self.send_json(404, {'error': 'Upload session not found'})
+        elif self.path == '/api/gc_report':
+            # Dry run only; eviction runs as a collect_garbage job
+            if STORE.spec.startswith('memory'):
+                self.send_json(409, {'error': 'GC is not available with GLB_STORAGE=memory'})
+                return
+            try:
+                self.send_json(200, gc_report())
+            except FileNotFoundError as e:
+                self.send_json(503, {'error': str(e)})
+        elif self.path.startswith('/api/cluster'):
+            from urllib.parse import urlparse, parse_qs
+            if CLUSTER is None:
+                self.send_json(404, {'error': 'Cluster mode not enabled (set CLUSTER_SELF and CLUSTER_NODES)'})
+                return
+            file_hash = parse_qs(urlparse(self.path).query).get('file', [''])[0]
+            self.send_json(200, CLUSTER.describe(file_hash or None))
+        elif self.path == '/api/admission':
+            self.send_json(200, ADMISSION.snapshot())
+        elif self.path == '/api/chunk_stats':
+            if CHUNK_STORE:
+                result, status = CHUNK_STORE.stats(), 200
+            else:
+                result, status = {'error': 'Chunk store not enabled (set GLB_CHUNK_STORE=true)'}, 404
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(result).encode())
+        elif self.path.startswith('/api/jobs'):
+            from urllib.parse import urlparse, parse_qs
+            parsed_url = urlparse(self.path)
+            job_id = parsed_url.path[len('/api/jobs'):].strip('/')
+            
+            if JOB_QUEUE is None:
+                result, status = {'error': 'Job queue not running'}, 503
+            elif job_id:
+                job = JOB_QUEUE.get(job_id)
+                result, status = (job, 200) if job else ({'error': 'Job not found'}, 404)
+            else:
+                file_hash = parse_qs(parsed_url.query).get('file', [''])[0]
+                if file_hash:
+                    result, status = {'jobs': JOB_QUEUE.list_for_file(file_hash)}, 200
+                else:
+                    result, status = {'error': 'Missing job id or file parameter'}, 400
+            
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(result).encode())
         elif self.path == '/something-for-the-time':
             self.send_response(200)
             self.send_header('Content-Type', 'text/plain')
             self.end_headers()
             self.wfile.write(b'10a5233475ee42a7a87f5e15ce23b688')
         elif self.path.startswith('/docs'):
-            # Proxy /docs requests to localhost:4004
+            # Proxy /docs requests to the docs server
             try:
                 # Ensure trailing slash for /docs root
                 proxy_path = self.path if self.path != '/docs' else '/docs/'
-                print(f"[DEBUG] Proxying {self.path} to http://localhost:4004{proxy_path}")
-                req = urllib.request.Request(f'http://localhost:4004{proxy_path}')
+                print(f"[DEBUG] Proxying {self.path} to {DOCS_UPSTREAM}{proxy_path}")
+                req = urllib.request.Request(f'{DOCS_UPSTREAM}{proxy_path}')
                 with urllib.request.urlopen(req) as response:
                     content = response.read()
                     content_type = response.headers.get('Content-Type', 'text/html')
@@ -128,9 +574,419 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
         else:
             super().do_GET()
     
-    def do_POST(self):
-        print(f"[DEBUG] POST request for {self.path}")
-        if self.path.startswith('/api/store_glb'):
+    def send_json(self, status, data):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode())
+    
+    def send_profiles(self):
+        """
+        GET /debug/profiles[?path=&limit=]     newest captured profiles (JSON)
+        GET /debug/profiles/<id>               one profile as folded stacks
+        GET /debug/profiles/folded?path=...    profiles for a path merged into folded stacks
+        """
+        from urllib.parse import urlparse, parse_qs
+        parsed_url = urlparse(self.path)
+        query_params = parse_qs(parsed_url.query)
+        if PROFILER is None:
+            self.send_json(404, {'error': 'Profiling not enabled (set PROFILE_TOKEN)'})
+            return
+        token = self.headers.get('X-Debug-Token') or query_params.get('token', [''])[0]
+        if not hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+            self.send_json(403, {'error': 'Invalid debug token'})
+            return
+        
+        path_filter = query_params.get('path', [''])[0] or None
+        try:
+            limit = int(query_params.get('limit', ['0'])[0]) or None
+        except ValueError:
+            limit = None
+        name = parsed_url.path[len('/debug/profiles'):].strip('/')
+        if not name:
+            self.send_json(200, {'profiles': PROFILER.list(path_filter, limit)})
+            return
+        
+        try:
+            if name == 'folded':
+                folded = PROFILER.folded([p['id'] for p in PROFILER.list(path_filter, limit)])
+            else:
+                folded = PROFILER.folded([name])
+        except FileNotFoundError:
+            self.send_json(404, {'error': 'Profile not found'})
+            return
+        body = folded.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_event_stream(self):
+        """Stream upload events as Server-Sent Events until the client disconnects."""
+        from urllib.parse import urlparse, parse_qs
+        query_params = parse_qs(urlparse(self.path).query)
+        username = sanitize_firebase_key(query_params.get('username', [''])[0]) or None
+        secret = sanitize_firebase_key(query_params.get('secret', [''])[0])
+        
+        # EventSource resends the last id it saw when it reconnects
+        last_id = self.headers.get('Last-Event-ID') or query_params.get('since', [''])[0]
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            self.send_json(400, {'error': 'Invalid Last-Event-ID'})
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        events = EVENTS.subscribe(last_id, username, channel_for(username, secret), EVENTS_HEARTBEAT_SECONDS)
+        try:
+            self.wfile.write(b'retry: 2000\n\n')
+            self.wfile.flush()
+            for event in events:
+                if event is None:
+                    self.wfile.write(b': ping\n\n')
+                else:
+                    self.wfile.write(f"id: {event['id']}\nevent: {event['kind']}\ndata: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            events.close()
+    
+    def proxy_process_text_stream(self):
+        """Relay the statement-block service's NDJSON stream line by line as blocks are produced."""
+        server_span, token = tracing.begin_span(
+            'POST /api/process-text/stream',
+            self.headers.get('traceparent'),
+            kind=tracing.KIND_SERVER,
+            **{'http.method': 'POST', 'http.route': '/api/process-text/stream'}
+        )
+        streaming = False
+        try:
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            
+            with tracing.start_span('proxy process-text stream', kind=tracing.KIND_CLIENT,
+                                    **{'http.url': f'{PROCESS_TEXT_UPSTREAM}/process-text/stream',
+                                       'request.bytes': len(post_data)}) as span:
+                req = urllib.request.Request(
+                    f'{PROCESS_TEXT_UPSTREAM}/process-text/stream',
+                    data=post_data,
+                    headers={
+                        'Content-Type': self.headers.get('Content-Type', 'application/json'),
+                        'Cache-Control': self.headers.get('Cache-Control', ''),
+                        'X-Request-Timeout-Ms': self.headers.get('X-Request-Timeout-Ms', ''),
+                        'traceparent': span.traceparent
+                    }
+                )
+                try:
+                    response = urllib.request.urlopen(req)
+                except urllib.error.HTTPError as e:
+                    # Validation and rate limit errors arrive before the stream starts
+                    self.send_response(e.code)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('X-Trace-Id', server_span.trace_id)
+                    self.end_headers()
+                    self.wfile.write(e.read())
+                    server_span.set_attribute('http.status_code', e.code)
+                    return
+                
+                with response:
+                    span.set_attribute('http.status_code', response.status)
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/x-ndjson')
+                    self.send_header('Cache-Control', 'no-cache')
+                    self.send_header('X-Accel-Buffering', 'no')
+                    self.send_header('X-Trace-Id', server_span.trace_id)
+                    if response.headers.get('X-Cache'):
+                        self.send_header('X-Cache', response.headers['X-Cache'])
+                    self.send_header('Connection', 'close')
+                    self.end_headers()
+                    self.close_connection = True
+                    server_span.set_attribute('http.status_code', 200)
+                    streaming = True
+                    try:
+                        for line in response:
+                            self.wfile.write(line)
+                            self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The browser went away; closing the upstream stops the model call
+                        span.set_attribute('client.disconnected', True)
+        except Exception as e:
+            server_span.record_exception(e)
+            if not streaming:
+                self.send_json(500, {'error': str(e)})
+        finally:
+            tracing.finish_span(server_span, token)
+    
+    def proxy_ingest(self):
+        """Relay a live transcript frame to the statement-block service, which holds it until the speaker pauses."""
+        server_span, token = tracing.begin_span(
+            'POST /api/ingest',
+            self.headers.get('traceparent'),
+            kind=tracing.KIND_SERVER,
+            **{'http.method': 'POST', 'http.route': '/api/ingest'}
+        )
+        try:
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            
+            with tracing.start_span('proxy ingest', kind=tracing.KIND_CLIENT,
+                                    **{'http.url': f'{PROCESS_TEXT_UPSTREAM}/ingest',
+                                       'request.bytes': len(post_data)}) as span:
+                req = urllib.request.Request(
+                    f'{PROCESS_TEXT_UPSTREAM}/ingest',
+                    data=post_data,
+                    headers={
+                        'Content-Type': self.headers.get('Content-Type', 'application/json'),
+                        'traceparent': span.traceparent
+                    }
+                )
+                # Session conflicts (409) and rate limits reach the editor unchanged
+                try:
+                    with urllib.request.urlopen(req) as response:
+                        status, body = response.status, response.read()
+                except urllib.error.HTTPError as e:
+                    status, body = e.code, e.read()
+                span.set_attribute('http.status_code', status)
+            
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('X-Trace-Id', server_span.trace_id)
+            self.end_headers()
+            self.wfile.write(body)
+            server_span.set_attribute('http.status_code', status)
+        except Exception as e:
+            server_span.record_exception(e)
+            self.send_json(500, {'error': str(e)})
+        finally:
+            tracing.finish_span(server_span, token)
+    
+    def store_glb_data(self, glb_data, username, secret, mesh_name, extra=None):
+        """Store an uploaded GLB, queue its derived assets and write the JSON response."""
+        # Check file size (20MB limit)
+        if len(glb_data) > MAX_GLB_SIZE:
+            self.send_response(413)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            error_response = json.dumps({'error': 'File size exceeds 20MB limit'})
+            self.wfile.write(error_response.encode())
+            return
+        
+        # Generate hash for the file
+        file_hash = hashlib.sha256(glb_data).hexdigest()
+        
+        # Save the GLB file durably before anything refers to it
+        storage = None
+        if CHUNK_STORE:
+            storage = CHUNK_STORE.put(file_hash, glb_data)
+            print(f"[DEBUG] Chunked GLB {file_hash}: {storage['new_chunks']}/{storage['chunks']} new chunks, {storage['new_bytes']} new bytes")
+        else:
+            STORE.put(f'{file_hash}.glb', glb_data)
+        
+        # Validation and derived variants are built in the background
+        jobs = enqueue_asset_jobs(file_hash)
+        
+        # Generate default mesh name if not provided
+        if not mesh_name:
+            mesh_name = f'mesh_{random.randint(0, 9999)}'
+
+        ASSET_INDEX.record_upload(file_hash, len(glb_data), username, mesh_name)
+        
+        # Open inspectors learn about the upload over /api/events without a Firebase round trip
+        sanitized_username = sanitize_firebase_key(username) if username else None
+        EVENTS.publish('upload', file_hash, sanitized_username, channel_for(sanitized_username, sanitize_firebase_key(secret or '')), {
+            'mesh_name': mesh_name,
+            'size': len(glb_data),
+            'url': f'/api/fetch_glb?file={file_hash}'
+        })
+        
+        # Push to the other nodes that own this hash
+        replicas = CLUSTER.replicate_async(file_hash, glb_data) if CLUSTER else []
+
+        print(f"[DEBUG] Stored GLB file: {file_hash}.glb ({len(glb_data)} bytes)")
+        print(f"[DEBUG] Username: {username if username else 'None'}, Secret: {'***' if secret else 'None'}, Mesh: {mesh_name}")
+        
+        # Store reference in Firebase if credentials provided
+        firebase_path = None
+        if username and secret and FIREBASE_AVAILABLE:
+            try:
+                # Sanitize username and secret for Firebase path
+                sanitized_username = sanitize_firebase_key(username)
+                sanitized_secret = sanitize_firebase_key(secret)
+                
+                # Create Firebase reference path
+                firebase_path = f'glb_loader/{sanitized_username}_{sanitized_secret}'
+                
+                # Store the hash with metadata in Firebase
+                ref = db.reference(firebase_path)
+                ref.set({
+                    'hash': file_hash,
+                    'username': username,
+                    'mesh_name': mesh_name,
+                    'timestamp': int(time.time() * 1000),
+                    'size': len(glb_data),
+                    'url': f'/api/fetch_glb?file={file_hash}'
+                })
+                
+                print(f"[DEBUG] Stored reference in Firebase at: {firebase_path}")
+                
+            except Exception as fb_error:
+                print(f"[WARNING] Failed to store in Firebase: {fb_error}")
+                # Continue even if Firebase fails - file is still saved locally
+        
+        # Return the hash and metadata
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        response = {
+            'hash': file_hash,
+            'message': 'GLB stored successfully',
+            'mesh_name': mesh_name,
+            'size': len(glb_data),
+            'firebase_path': firebase_path,
+            'jobs': jobs,
+            'storage': storage,
+            'replicas': replicas
+        }
+        response.update(extra or {})
+        self.wfile.write(json.dumps(response).encode())
+
+    def route_put(self):
+        # PUT /api/uploads/<id>/chunks/<index> with X-Chunk-SHA256
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 5 or parts[:2] != ['api', 'uploads'] or parts[3] != 'chunks' or not parts[4].isdigit():
+            self.send_json(404, {'error': 'Not found'})
+            return
+        
+        session_id, index = parts[2], int(parts[4])
+        try:
+            content_length = int(self.headers['Content-Length'])
+            if content_length > MAX_GLB_SIZE:
+                self.send_json(413, {'error': 'Chunk too large'})
+                return
+            data = self.rfile.read(content_length)
+            status = UPLOAD_SESSIONS.put_chunk(session_id, index, data, self.headers.get('X-Chunk-SHA256'))
+            self.send_json(200, status)
+        except FileNotFoundError:
+            self.send_json(404, {'error': 'Upload session not found'})
+        except ChecksumMismatch as e:
+            self.send_json(422, {'error': str(e)})
+        except UploadError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
+    def route_post(self):
+        if self.path == '/api/uploads':
+            try:
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+                status = UPLOAD_SESSIONS.create(
+                    body.get('size'),
+                    body.get('sha256'),
+                    body.get('chunk_size', DEFAULT_UPLOAD_CHUNK_SIZE),
+                    metadata={
+                        'username': body.get('username', ''),
+                        'secret': body.get('secret', ''),
+                        'mesh_name': body.get('mesh_name', '')
+                    }
+                )
+                print(f"[DEBUG] Created upload session {status['id']} ({status['size']} bytes in {status['chunk_count']} chunks)")
+                self.send_json(201, status)
+            except (UploadError, json.JSONDecodeError) as e:
+                self.send_json(400, {'error': str(e)})
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+        elif self.path.startswith('/api/uploads/') and self.path.endswith('/finalize'):
+            session_id = self.path[len('/api/uploads/'):-len('/finalize')].strip('/')
+            try:
+                glb_data, metadata = UPLOAD_SESSIONS.assemble(session_id)
+            except FileNotFoundError:
+                self.send_json(404, {'error': 'Upload session not found'})
+                return
+            except ChecksumMismatch as e:
+                # Chunks were individually verified, so start over rather than retrying
+                UPLOAD_SESSIONS.delete(session_id)
+                self.send_json(422, {'error': str(e)})
+                return
+            except UploadError as e:
+                self.send_json(409, {'error': str(e)})
+                return
+            
+            try:
+                self.store_glb_data(
+                    glb_data,
+                    metadata.get('username', ''),
+                    metadata.get('secret', ''),
+                    metadata.get('mesh_name', ''),
+                    extra={'upload_id': session_id}
+                )
+                UPLOAD_SESSIONS.delete(session_id)
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+        elif self.path.startswith('/api/cluster/replica'):
+            from urllib.parse import urlparse, parse_qs
+            file_hash = parse_qs(urlparse(self.path).query).get('hash', [''])[0]
+            glb_data = self.rfile.read(int(self.headers['Content-Length']))
+            if not is_sha256_hex(file_hash) or hashlib.sha256(glb_data).hexdigest() != file_hash:
+                self.send_json(422, {'error': 'Replica SHA-256 mismatch'})
+                return
+            if not is_stored(file_hash):
+                store_copy(file_hash, glb_data)
+                print(f"[DEBUG] Stored replica {file_hash} ({len(glb_data)} bytes)")
+            self.send_json(200, {'hash': file_hash, 'stored': True})
+        elif self.path.startswith('/api/store_glb_delta'):
+            try:
+                from urllib.parse import urlparse, parse_qs
+                query_params = parse_qs(urlparse(self.path).query)
+                base_hash = query_params.get('base', [''])[0]
+                expected_hash = query_params.get('hash', [''])[0]
+                
+                if not is_sha256_hex(base_hash) or not is_sha256_hex(expected_hash):
+                    self.send_json(400, {'error': 'Missing or invalid base or hash parameter'})
+                    return
+                
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                
+                try:
+                    ensure_local(base_hash)
+                    base_data = read_original(STORE, base_hash, CHUNK_STORE)
+                except FileNotFoundError:
+                    self.send_json(404, {'error': 'Base file not found'})
+                    return
+                
+                try:
+                    recipe, literal = delta_sync.parse_delta_body(body)
+                    glb_data = delta_sync.apply_delta(base_data, recipe, literal, max_size=MAX_GLB_SIZE)
+                except delta_sync.DeltaError as e:
+                    self.send_json(400, {'error': f'Invalid delta: {e}'})
+                    return
+                
+                # The rebuilt file must be exactly what the client hashed
+                if hashlib.sha256(glb_data).hexdigest() != expected_hash:
+                    self.send_json(422, {'error': 'Delta verification failed: SHA-256 mismatch'})
+                    return
+                
+                print(f"[DEBUG] Rebuilt GLB from delta: {len(body)} bytes sent for {len(glb_data)} byte file (base {base_hash})")
+                self.store_glb_data(
+                    glb_data,
+                    query_params.get('username', [''])[0],
+                    query_params.get('secret', [''])[0],
+                    query_params.get('mesh_name', [''])[0],
+                    extra={'delta': {'base': base_hash, 'transferred_bytes': len(body), 'literal_bytes': len(literal)}}
+                )
+                
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+        elif self.path.startswith('/api/store_glb'):
             try:
                 content_length = int(self.headers['Content-Length'])
                 content_type = self.headers.get('Content-Type', '')
@@ -211,77 +1067,7 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                     self.wfile.write(error_response.encode())
                     return
                 
-                # Check file size (20MB limit)
-                if len(glb_data) > 20 * 1024 * 1024:
-                    self.send_response(413)
-                    self.send_header('Content-Type', 'application/json')
-                    self.end_headers()
-                    error_response = json.dumps({'error': 'File size exceeds 20MB limit'})
-                    self.wfile.write(error_response.encode())
-                    return
-                
-                # Generate hash for the file
-                file_hash = hashlib.sha256(glb_data).hexdigest()
-                
-                # Create assets/glbs directory if it doesn't exist
-                assets_dir = os.path.join(os.getcwd(), 'assets', 'glbs')
-                os.makedirs(assets_dir, exist_ok=True)
-                
-                # Save the GLB file
-                file_path = os.path.join(assets_dir, f'{file_hash}.glb')
-                with open(file_path, 'wb') as f:
-                    f.write(glb_data)
-                
-                # Generate default mesh name if not provided
-                if not mesh_name:
-                    mesh_name = f'mesh_{random.randint(0, 9999)}'
-
-                print(f"[DEBUG] Stored GLB file: {file_hash}.glb ({len(glb_data)} bytes)")
-                print(f"[DEBUG] Username: {username if username else 'None'}, Secret: {'***' if secret else 'None'}, Mesh: {mesh_name}")
-                
-                # Store reference in Firebase if credentials provided
-                firebase_path = None
-                if username and secret and FIREBASE_AVAILABLE:
-                    try:
-                        # Sanitize username and secret for Firebase path
-                        def sanitize_firebase_key(s):
-                            return s.replace('.', '_').replace('$', '_').replace('#', '_').replace('[', '_').replace(']', '_').replace('/', '_')
-                        
-                        sanitized_username = sanitize_firebase_key(username)
-                        sanitized_secret = sanitize_firebase_key(secret)
-                        
-                        # Create Firebase reference path
-                        firebase_path = f'glb_loader/{sanitized_username}_{sanitized_secret}'
-                        
-                        # Store the hash with metadata in Firebase
-                        ref = db.reference(firebase_path)
-                        ref.set({
-                            'hash': file_hash,
-                            'username': username,
-                            'mesh_name': mesh_name,
-                            'timestamp': int(time.time() * 1000),
-                            'size': len(glb_data),
-                            'url': f'/api/fetch_glb?file={file_hash}'
-                        })
-                        
-                        print(f"[DEBUG] Stored reference in Firebase at: {firebase_path}")
-                        
-                    except Exception as fb_error:
-                        print(f"[WARNING] Failed to store in Firebase: {fb_error}")
-                        # Continue even if Firebase fails - file is still saved locally
-                
-                # Return the hash and metadata
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                response = json.dumps({
-                    'hash': file_hash,
-                    'message': 'GLB stored successfully',
-                    'mesh_name': mesh_name,
-                    'size': len(glb_data),
-                    'firebase_path': firebase_path
-                })
-                self.wfile.write(response.encode())
+                self.store_glb_data(glb_data, username, secret, mesh_name)
                 
             except Exception as e:
                 self.send_response(500)
@@ -289,42 +1075,82 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
                 self.end_headers()
                 error_response = json.dumps({'error': str(e)})
                 self.wfile.write(error_response.encode())
+        elif self.path.startswith('/api/jobs/') and self.path.endswith('/cancel'):
+            job_id = self.path[len('/api/jobs/'):-len('/cancel')].strip('/')
+            job = JOB_QUEUE.get(job_id) if JOB_QUEUE else None
+            
+            if job is None:
+                self.send_response(404)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': 'Job not found'}).encode())
+                return
+            
+            job = JOB_QUEUE.cancel(job_id)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(job).encode())
         elif self.path == '/api/process-text':
+            # Join the browser's trace (or start one) and hand it on to the statement-block service
+            server_span, token = tracing.begin_span(
+                'POST /api/process-text',
+                self.headers.get('traceparent'),
+                kind=tracing.KIND_SERVER,
+                **{'http.method': 'POST', 'http.route': '/api/process-text'}
+            )
             try:
                 content_length = int(self.headers['Content-Length'])
                 post_data = self.rfile.read(content_length)
                 
-                req = urllib.request.Request(
-                    'http://localhost:5000/process-text',
-                    data=post_data,
-                    headers={
-                        'Content-Type': self.headers.get('Content-Type', 'application/json')
-                    }
-                )
-                
-                with urllib.request.urlopen(req) as response:
-                    proxy_response = response.read()
+                with tracing.start_span('proxy process-text', kind=tracing.KIND_CLIENT,
+                                        **{'http.url': f'{PROCESS_TEXT_UPSTREAM}/process-text',
+                                           'request.bytes': len(post_data)}) as span:
+                    req = urllib.request.Request(
+                        f'{PROCESS_TEXT_UPSTREAM}/process-text',
+                        data=post_data,
+                        headers={
+                            'Content-Type': self.headers.get('Content-Type', 'application/json'),
+                            'X-Request-Timeout-Ms': self.headers.get('X-Request-Timeout-Ms', ''),
+                            'traceparent': span.traceparent
+                        }
+                    )
+                    
+                    with urllib.request.urlopen(req) as response:
+                        proxy_response = response.read()
+                        span.set_attribute('http.status_code', response.status)
                     
                 self.send_response(200)
                 self.send_header('Content-Type', 'application/json')
+                self.send_header('X-Trace-Id', server_span.trace_id)
                 self.end_headers()
                 self.wfile.write(proxy_response)
+                server_span.set_attribute('http.status_code', 200)
                 
             except Exception as e:
+                server_span.record_exception(e)
+                server_span.set_attribute('http.status_code', 500)
                 self.send_response(500)
                 self.send_header('Content-Type', 'application/json')
+                self.send_header('X-Trace-Id', server_span.trace_id)
                 self.end_headers()
                 error_response = json.dumps({'error': str(e)})
                 self.wfile.write(error_response.encode())
+            finally:
+                tracing.finish_span(server_span, token)
+        elif self.path == '/api/process-text/stream':
+            self.proxy_process_text_stream()
+        elif self.path == '/api/ingest':
+            self.proxy_ingest()
         elif self.path == '/setclaims':
-            # Proxy /setclaims requests to auth server on port 3303
-            print(f"[DEBUG] Proxying {self.path} to http://localhost:3303")
+            # Proxy /setclaims requests to the auth server
+            print(f"[DEBUG] Proxying {self.path} to {SETCLAIMS_UPSTREAM}")
             try:
                 content_length = int(self.headers['Content-Length'])
                 post_data = self.rfile.read(content_length)
                 
                 req = urllib.request.Request(
-                    'http://localhost:3303/setclaims',
+                    f'{SETCLAIMS_UPSTREAM}/setclaims',
                     data=post_data,
                     headers={
                         'Content-Type': self.headers.get('Content-Type', 'application/json')
@@ -367,12 +1193,42 @@ if __name__ == '__main__':
         directory = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'frontend')
     os.chdir(directory)
     print(f"Serving {directory!r} on http://0.0.0.0:{port} with CORS enabled")
+    print(f"Server data: {ASSETS_ROOT} (ASSETS_ROOT)")
+    legacy_glbs = os.path.join(directory, 'assets', 'glbs')
+    if os.path.isdir(legacy_glbs) and os.listdir(legacy_glbs) and os.path.realpath(legacy_glbs) != os.path.realpath(glb_assets_dir()):
+        print(f"[WARNING] GLBs in {legacy_glbs} are not used any more; move them to {glb_assets_dir()} or set ASSETS_ROOT={os.path.dirname(legacy_glbs)}")
     print(f"GLB Storage: POST /api/store_glb?username=<user>&secret=<secret>&mesh_name=<name> (max 20MB) → returns hash")
     print(f"  - Accepts: raw binary, JSON with base64, or multipart/form-data")
     print(f"  - Stores reference in Firebase at: glb_loader/<username>_<secret>")
     print(f"  - mesh_name defaults to 'mesh_<random>' if not provided")
-    print(f"GLB Retrieval: GET /api/fetch_glb?file=<hash>")
-    print(f"Proxying /api/process-text to http://localhost:5000/process-text")
-    print(f"Proxying /docs/* to http://localhost:4004/docs/*")
-    print(f"Proxying /setclaims to http://localhost:3303/setclaims")
-    HTTPServer(('0.0.0.0', port), CORSRequestHandler).serve_forever()
+    print(f"GLB Retrieval: GET /api/fetch_glb?file=<hash> (serves optimized variant, add &variant=original for the upload)")
+    print(f"GLB Optimization: {'enabled' if GLB_OPTIMIZE and MESH_OPTIMIZER_AVAILABLE else 'disabled'} (report: GET /api/glb_report?file=<hash>)")
+    print(f"Delta Uploads: GET /api/glb_signature?file=<base>&block_size=<n>, POST /api/store_glb_delta?base=<base>&hash=<new>")
+    print(f"Resumable Uploads: POST /api/uploads, PUT /api/uploads/<id>/chunks/<n>, GET /api/uploads/<id>, POST /api/uploads/<id>/finalize")
+    print(f"Upload Admission: {UPLOAD_MAX_CONCURRENT} concurrent, {UPLOAD_MAX_INFLIGHT_MB}MB in flight, "
+          f"{UPLOAD_SLOTS_UNDER_READ_LOAD} while GLB/static reads are active, 503 + Retry-After when full (GET /api/admission)")
+    print(f"GLB GC: quota {str(GLB_GC_QUOTA_MB) + 'MB' if GLB_GC_QUOTA_MB else 'none (nothing is evicted)'}, grace {GLB_GC_GRACE_HOURS}h, "
+          f"{'every ' + str(GLB_GC_INTERVAL_HOURS) + 'h' if GLB_GC_INTERVAL_HOURS > 0 else 'manual'} (dry run: GET /api/gc_report, refreshed every {GLB_GC_REPORT_TTL:g}s)")
+    print(f"Cluster: {'node ' + CLUSTER_SELF + ' of ' + str(len(CLUSTER_NODES)) + ', ' + str(CLUSTER_REPLICAS) + ' replicas' if CLUSTER_SELF else 'disabled'} (GET /api/cluster?file=<hash>)")
+    print(f"Blob Storage: {GLB_STORAGE} (local = <ASSETS_ROOT>/glbs, memory, local:<dir> or s3://<bucket>/<prefix>)")
+    print(f"Upload Events: GET /api/events?username=<user>&secret=<secret> (Server-Sent Events, resumes from Last-Event-ID)")
+    print(f"Profiling: {'sampling ' + str(PROFILE_SAMPLE_RATE * 100) + '% of requests and all over ' + str(PROFILE_SLOW_MS) + 'ms' if PROFILE_TOKEN else 'disabled'} (GET /debug/profiles with X-Debug-Token)")
+    print(f"Tracing: traceparent propagated to /api/process-text, spans to {TRACE_LOG_FILE or TRACE_OTLP_ENDPOINT or 'nowhere (set TRACE_LOG_FILE or TRACE_OTLP_ENDPOINT)'}")
+    print(f"Chunk Store: {'enabled' if GLB_CHUNK_STORE else 'disabled'} (stats: GET /api/chunk_stats)")
+    print(f"Asset Jobs: GET /api/jobs/<id>, GET /api/jobs?file=<hash>, POST /api/jobs/<id>/cancel")
+    print(f"Proxying /api/process-text[/stream] to {PROCESS_TEXT_UPSTREAM}/process-text[/stream], /api/ingest to {PROCESS_TEXT_UPSTREAM}/ingest")
+    print(f"Proxying /docs/* to {DOCS_UPSTREAM}/docs/*")
+    print(f"Proxying /setclaims to {SETCLAIMS_UPSTREAM}/setclaims")
+    if FILESERVER_WORKERS > 1:
+        print(f"Prefork: {FILESERVER_WORKERS} workers (SIGHUP reloads workers, SIGTERM drains and stops)")
+        PreforkServer(
+            ('0.0.0.0', port),
+            CORSRequestHandler,
+            workers=FILESERVER_WORKERS,
+            reuse_port=FILESERVER_REUSE_PORT,
+            on_worker_start=init_process_state,
+            on_worker_stop=stop_process_state
+        ).run()
+    else:
+        init_process_state()
+        ThreadingHTTPServer(('0.0.0.0', port), CORSRequestHandler).serve_forever()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Durable file writes shared by the stores, upload sessions and the profiler.
+"""
+import os
+import uuid
+
+
+def write_file_atomic(path, data):
+    """Write data so that readers only ever see the old or the complete new file."""
+    tmp_path = f'{path}.tmp.{uuid.uuid4().hex}'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Persist the rename itself
+    dir_fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Locating stored GLBs and the GLBs a scene refers to.
+
+open_glb finds the bytes behind a hash, preferring the optimized variant and
+falling back to the chunk store, without reading them into memory.
+collect_glb_hashes walks entity, scene or inventory JSON for BanterGLTF urls
+so the GC can tell which GLBs are still referenced.
+"""
+import os
+from urllib.parse import urlparse, parse_qs
+
+READ_SIZE = 1024 * 1024
+
+VARIANT_ORIGINAL = 0
+VARIANT_OPTIMIZED = 1
+
+
+def _is_hash(value):
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+def hash_from_url(url):
+    """Extract the GLB hash from a fetch_glb URL, a <hash>.glb path, or a bare hash."""
+    if not isinstance(url, str):
+        return None
+    if _is_hash(url):
+        return url
+    parsed = urlparse(url)
+    file_hash = parse_qs(parsed.query).get('file', [''])[0]
+    if _is_hash(file_hash):
+        return file_hash
+    name = os.path.basename(parsed.path)
+    if name.endswith('.glb') and _is_hash(name[:-len('.glb')]):
+        return name[:-len('.glb')]
+    return None
+
+
+def collect_glb_hashes(node, found=None):
+    """Return the hashes of every BanterGLTF url in an entity, scene or inventory item, in order."""
+    if found is None:
+        found = []
+    if isinstance(node, dict):
+        if node.get('type') == 'BanterGLTF' and isinstance(node.get('properties'), dict):
+            file_hash = hash_from_url(node['properties'].get('url'))
+            if file_hash and file_hash not in found:
+                found.append(file_hash)
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                collect_glb_hashes(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            collect_glb_hashes(value, found)
+    return found
+
+
+def open_glb(store, file_hash, chunk_store=None, prefer_optimized=True):
+    """
+    Locate a stored GLB without reading it into memory.
+
+    Returns:
+        tuple: (variant, size, iterator of byte blocks), or None if not stored
+    """
+    candidates = [(VARIANT_ORIGINAL, f'{file_hash}.glb')]
+    if prefer_optimized:
+        candidates.insert(0, (VARIANT_OPTIMIZED, f'{file_hash}.optimized.glb'))
+    for variant, key in candidates:
+        try:
+            return variant, store.size(key), store.stream(key, READ_SIZE)
+        except FileNotFoundError:
+            continue
+
+    if chunk_store and chunk_store.has(file_hash):
+        return VARIANT_ORIGINAL, chunk_store.size(file_hash), chunk_store.iter_chunks(file_hash)
+    return None
+
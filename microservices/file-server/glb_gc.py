@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Garbage collection of unreferenced GLBs under a disk quota.
+
+A stored hash is kept when it is
+- referenced: a BanterGLTF url or fetch_glb link to it appears in the
+  inventory JSON/scripts under the reference directories
+- pinned: it is some user's latest upload, i.e. what their Firebase
+  glb_loader pointer shows (from the upload index)
+- in its grace period: uploaded less than grace_hours ago
+
+Everything else is a candidate. Candidates are evicted least-recently-fetched
+first until usage is under the quota; without a quota nothing is evicted and
+the report only lists them. Referenced and pinned GLBs are never evicted,
+even if that leaves the store over quota (the report says so).
+
+A reference directory that doesn't exist aborts the run: with the inventory
+missing every GLB would look unreferenced.
+
+Usage:
+    python glb_gc.py <assets_root> [--quota-mb N] [--grace-hours H] [--inventory DIR ...] [--apply]
+
+Without --apply only the report is printed.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import glb_files
+import storage
+from asset_index import AssetIndex
+from chunk_store import ChunkStore
+
+DEFAULT_GRACE_HOURS = 72
+REFERENCE_EXTENSIONS = ('.json', '.js', '.html')
+FETCH_URL_PATTERN = re.compile(r'fetch_glb\?(?:[^"\'\s]*&)?file=([0-9a-f]{64})')
+STORED_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})\.(glb|optimized\.glb|report\.json)$')
+
+
+def default_reference_dirs():
+    """The linker inventory: beside this service in the repo, under microservices/ in the container."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    candidates = [
+        os.path.normpath(os.path.join(here, '..', 'linker', 'inventory')),
+        os.path.join(here, 'microservices', 'linker', 'inventory'),
+    ]
+    return [next((path for path in candidates if os.path.isdir(path)), candidates[0])]
+
+
+def scan_references(reference_dirs):
+    """Return {hash: first file referencing it} for every GLB linked from the reference directories."""
+    missing = [root_dir for root_dir in reference_dirs if not os.path.isdir(root_dir)]
+    if missing:
+        raise FileNotFoundError(f"GC reference directory not found: {', '.join(missing)}")
+    references = {}
+    for root_dir in reference_dirs:
+        for dirpath, _, filenames in os.walk(root_dir):
+            for name in filenames:
+                if not name.endswith(REFERENCE_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        text = f.read()
+                except (OSError, UnicodeDecodeError):
+                    continue
+
+                found = FETCH_URL_PATTERN.findall(text)
+                if name.endswith('.json'):
+                    try:
+                        found += glb_files.collect_glb_hashes(json.loads(text))
+                    except ValueError:
+                        pass
+                for file_hash in found:
+                    references.setdefault(file_hash, path)
+    return references
+
+
+def stored_assets(store, chunk_store=None):
+    """Return {hash: {'bytes', 'mtime', 'keys'}} for everything stored per hash."""
+    stored = {}
+    for key, size, mtime in store.list():
+        match = STORED_NAME_PATTERN.match(key)
+        if not match:
+            continue
+        entry = stored.setdefault(match.group(1), {'bytes': 0, 'mtime': 0, 'keys': []})
+        entry['bytes'] += size
+        entry['mtime'] = max(entry['mtime'], mtime)
+        entry['keys'].append(key)
+
+    if chunk_store:
+        for name in os.listdir(chunk_store.recipe_dir):
+            if not name.endswith('.json'):
+                continue
+            file_hash = name[:-len('.json')]
+            entry = stored.setdefault(file_hash, {'bytes': 0, 'mtime': 0, 'keys': []})
+            # Logical size; shared chunks make the real saving smaller
+            entry['bytes'] += chunk_store.size(file_hash) or 0
+            entry['mtime'] = max(entry['mtime'], os.path.getmtime(os.path.join(chunk_store.recipe_dir, name)))
+    return stored
+
+
+def disk_usage(store, chunk_store=None):
+    usage = sum(size for _, size, _ in store.list())
+    if chunk_store:
+        usage += chunk_store.stats()['stored_bytes']
+    return usage
+
+
+def plan(store, index, chunk_store=None, reference_dirs=None, quota_bytes=0,
+         grace_seconds=DEFAULT_GRACE_HOURS * 3600, now=None):
+    """Decide what to evict without touching anything."""
+    now = now or time.time()
+    stored = stored_assets(store, chunk_store)
+    references = scan_references(reference_dirs if reference_dirs is not None else default_reference_dirs())
+    pinned = set(index.latest_per_user().values())
+    rows = index.all()
+    usage = disk_usage(store, chunk_store)
+
+    kept = {'referenced': 0, 'pinned': 0, 'grace': 0}
+    candidates = []
+    for file_hash, info in stored.items():
+        row = rows.get(file_hash) or {}
+        uploaded_at = max(row.get('uploaded_at') or 0, info['mtime'])
+        if file_hash in references:
+            kept['referenced'] += 1
+        elif file_hash in pinned:
+            kept['pinned'] += 1
+        elif now - uploaded_at < grace_seconds:
+            kept['grace'] += 1
+        else:
+            candidates.append({
+                'hash': file_hash,
+                'bytes': info['bytes'],
+                'last_used': max(row.get('last_fetched_at') or 0, uploaded_at),
+                'fetch_count': row.get('fetch_count', 0),
+                'mesh_name': row.get('mesh_name'),
+            })
+
+    # Least recently fetched first
+    candidates.sort(key=lambda c: c['last_used'])
+    evict = []
+    freed = 0
+    for candidate in candidates if quota_bytes else []:
+        if usage - freed <= quota_bytes:
+            break
+        evict.append(candidate)
+        freed += candidate['bytes']
+
+    return {
+        'planned_at': now,
+        'usage_bytes': usage,
+        'quota_bytes': quota_bytes,
+        'stored': len(stored),
+        'kept': kept,
+        'unreferenced': len(candidates),
+        'unreferenced_bytes': sum(c['bytes'] for c in candidates),
+        'evict': evict,
+        'evict_bytes': freed,
+        'over_quota_after': bool(quota_bytes) and usage - freed > quota_bytes,
+    }
+
+
+def collect(report, store, index, chunk_store=None):
+    """Evict what plan() selected, skipping anything re-uploaded since."""
+    evicted = []
+    skipped = []
+    current = stored_assets(store, chunk_store)
+    for candidate in report['evict']:
+        file_hash = candidate['hash']
+        info = current.get(file_hash)
+        if info is None:
+            continue
+        # A re-upload since planning makes the hash new again
+        row = index.get(file_hash) or {}
+        if info['mtime'] > report['planned_at'] or (row.get('uploaded_at') or 0) > report['planned_at']:
+            skipped.append(file_hash)
+            continue
+
+        for key in info['keys']:
+            store.delete(key)
+        if chunk_store:
+            chunk_store.delete(file_hash)
+        index.remove(file_hash)
+        evicted.append(file_hash)
+        print(f"[INFO] GC evicted {file_hash} ({candidate['bytes']} bytes, last used {time.ctime(candidate['last_used'])})")
+
+    # Chunks younger than an hour may belong to an upload that hasn't written its recipe yet
+    swept = chunk_store.sweep(min_age=3600) if chunk_store else (0, 0)
+    return {
+        'evicted': len(evicted),
+        'skipped': skipped,
+        'chunks_swept': swept[0],
+        'usage_bytes': disk_usage(store, chunk_store),
+    }
+
+
+def run_gc(assets_root, quota_mb=0, grace_hours=DEFAULT_GRACE_HOURS, reference_dirs=None, dry_run=True,
+           storage_spec=None):
+    """Plan and, unless dry_run, collect. assets_root is the server's ASSETS_ROOT."""
+    # A fresh in-memory store is always empty; the server's copy lives in another process
+    if storage_spec and storage_spec.startswith('memory'):
+        raise ValueError('GC needs persistent storage, not GLB_STORAGE=memory')
+    store = storage.open_store(storage_spec, os.path.join(assets_root, 'glbs'))
+    index = AssetIndex(os.path.join(assets_root, 'index.db'))
+    chunk_dir = os.path.join(assets_root, 'chunkstore')
+    chunk_store = ChunkStore(chunk_dir) if os.path.isdir(chunk_dir) else None
+
+    report = plan(store, index, chunk_store, reference_dirs,
+                  quota_bytes=int(quota_mb * 1024 * 1024), grace_seconds=grace_hours * 3600)
+    report['dry_run'] = dry_run
+    if not dry_run:
+        report['result'] = collect(report, store, index, chunk_store)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('assets_root', help="The server's ASSETS_ROOT directory")
+    parser.add_argument('--quota-mb', type=float, default=0, help='Evict down to this usage (default: evict nothing)')
+    parser.add_argument('--grace-hours', type=float, default=DEFAULT_GRACE_HOURS)
+    parser.add_argument('--inventory', action='append', help='Directory scanned for references (repeatable)')
+    parser.add_argument('--apply', action='store_true', help='Actually delete; default is a dry run')
+    parser.add_argument('--storage', default=os.getenv('GLB_STORAGE'), help='Storage spec, as GLB_STORAGE (default: local)')
+    args = parser.parse_args()
+    print(json.dumps(run_gc(args.assets_root, args.quota_mb, args.grace_hours, args.inventory,
+                            dry_run=not args.apply, storage_spec=args.storage), indent=2))
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Persistent background job queue for asset processing.
+
+Jobs live in a local SQLite database so they survive restarts. A dispatcher
+thread claims queued jobs and runs them in a process pool, because the
+heavy work (mesh optimization, validation) is CPU-bound and would otherwise
+hold the GIL inside the request handler.
+
+Task functions are registered in asset_tasks.TASKS and are called as
+task(payload, progress). progress(fraction, message) records progress and
+raises JobCancelled when the job has been cancelled, so long tasks stop at
+their next checkpoint. Failed jobs are retried up to max_attempts times with
+backoff, except for PermanentJobError, which tasks raise for failures that
+would only repeat (e.g. a malformed GLB).
+
+on_finish(kind, file_hash, status, result) is called in the dispatcher's
+process when a job succeeds or fails for good; result is the task's return
+value or the error message.
+"""
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    file_hash TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    error TEXT,
+    result TEXT,
+    owner TEXT,
+    run_after REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, run_after);
+CREATE INDEX IF NOT EXISTS jobs_file_hash ON jobs (file_hash);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled."""
+
+
+class PermanentJobError(Exception):
+    """Raised by a task for a failure retrying can't fix; the job fails at once."""
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _owner_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _owner_alive(owner):
+    """True if the owner process of a running job still exists on this host."""
+    if not owner or ':' not in owner:
+        return False
+    host, pid = owner.rsplit(':', 1)
+    if host != socket.gethostname():
+        # Can't check other hosts, assume the job is still being worked on
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job.pop('owner', None)
+    job.pop('run_after', None)
+    return job
+
+
+def run_job(db_path, job_id, kind, payload):
+    """Entry point executed inside a pool worker process."""
+    import asset_tasks
+
+    conn = connect(db_path)
+
+    def progress(fraction, message=None):
+        row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None or row['status'] == STATUS_CANCELLED:
+            raise JobCancelled(job_id)
+        conn.execute(
+            'UPDATE jobs SET progress = ?, message = ?, updated_at = ? WHERE id = ? AND status = ?',
+            (max(0.0, min(1.0, fraction)), message, time.time(), job_id, STATUS_RUNNING)
+        )
+
+    try:
+        task = asset_tasks.TASKS[kind]
+        return task(payload, progress)
+    finally:
+        conn.close()
+
+
+class JobQueue:
+    def __init__(self, db_path, workers=2, poll_interval=0.5, retry_backoff=2.0, on_finish=None):
+        self.db_path = db_path
+        self.on_finish = on_finish
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.owner = _owner_id()
+        self._pool = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = connect(db_path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def start(self):
+        """Recover orphaned jobs and start the dispatcher thread."""
+        self.owner = _owner_id()
+        self._recover_orphans()
+        self._pool = self._new_pool()
+        self._thread = threading.Thread(target=self._dispatch_loop, name='job-dispatcher', daemon=True)
+        self._thread.start()
+        print(f"[INFO] Job queue started with {self.workers} worker process(es) at {self.db_path}")
+
+    def stop(self, wait=True):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._pool:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def enqueue(self, kind, payload, file_hash=None, max_attempts=3):
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn = connect(self.db_path)
+        try:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, file_hash, payload, status, max_attempts, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, file_hash, json.dumps(payload), STATUS_QUEUED, max_attempts, now, now)
+            )
+        finally:
+            conn.close()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return _row_to_job(row) if row else None
+
+    def list_for_file(self, file_hash):
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute('SELECT * FROM jobs WHERE file_hash = ? ORDER BY created_at', (file_hash,)).fetchall()
+        finally:
+            conn.close()
+        return [_row_to_job(row) for row in rows]
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
+
+        Queued jobs never start. Running jobs stop at their next progress
+        checkpoint and any result they produce afterwards is discarded.
+        """
+        conn = connect(self.db_path)
+        try:
+            conn.execute(
+                'UPDATE jobs SET status = ?, message = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)',
+                (STATUS_CANCELLED, 'Cancelled by request', time.time(), job_id, STATUS_QUEUED, STATUS_RUNNING)
+            )
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def _new_pool(self):
+        # spawn keeps worker processes independent of the threaded server
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _replace_pool(self, broken):
+        """
+        Replace a broken pool and return the current one. The dispatcher and the
+        callbacks of every job that ran in it all notice the breakage, so only
+        the first caller replaces it.
+        """
+        with self._lock:
+            if self._pool is broken:
+                self._pool = self._new_pool()
+                broken.shutdown(wait=False)
+            return self._pool
+
+    def _recover_orphans(self):
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute('SELECT id, owner FROM jobs WHERE status = ?', (STATUS_RUNNING,)).fetchall()
+            for row in rows:
+                if row['owner'] == self.owner or not _owner_alive(row['owner']):
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, owner = NULL, message = ?, updated_at = ? WHERE id = ? AND status = ?',
+                        (STATUS_QUEUED, 'Requeued after restart', time.time(), row['id'], STATUS_RUNNING)
+                    )
+                    print(f"[INFO] Requeued orphaned job {row['id']}")
+        finally:
+            conn.close()
+
+    def _claim(self, conn):
+        """Atomically move the next runnable job to running and return it."""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? AND run_after <= ? ORDER BY created_at LIMIT 1',
+                (STATUS_QUEUED, time.time())
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                'UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, progress = 0, '
+                'message = ?, updated_at = ? WHERE id = ?',
+                (STATUS_RUNNING, self.owner, 'Running', time.time(), row['id'])
+            )
+            conn.execute('COMMIT')
+            return row
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _dispatch_loop(self):
+        conn = connect(self.db_path)
+        while not self._stopping.is_set():
+            try:
+                with self._lock:
+                    free = self.workers - len(self._in_flight)
+                claimed = 0
+                while free > 0:
+                    row = self._claim(conn)
+                    if row is None:
+                        break
+                    self._submit(row)
+                    free -= 1
+                    claimed += 1
+                if claimed == 0:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+            except Exception as e:
+                print(f"[WARNING] Job dispatcher error: {e}")
+                time.sleep(self.poll_interval)
+        conn.close()
+
+    def _submit(self, row):
+        job_id = row['id']
+        payload = json.loads(row['payload'])
+        pool = self._pool
+        try:
+            future = pool.submit(run_job, self.db_path, job_id, row['kind'], payload)
+        except BrokenProcessPool:
+            pool = self._replace_pool(pool)
+            future = pool.submit(run_job, self.db_path, job_id, row['kind'], payload)
+        with self._lock:
+            self._in_flight[job_id] = future
+        future.add_done_callback(lambda f: self._finish(row, f, pool))
+
+    def _finish(self, row, future, pool=None):
+        job_id, attempts, max_attempts = row['id'], row['attempts'] + 1, row['max_attempts']
+        with self._lock:
+            self._in_flight.pop(job_id, None)
+
+        if future.cancelled():
+            # Pool shut down before the job started; it is requeued on next start
+            return
+
+        now = time.time()
+        finished = None
+        conn = connect(self.db_path)
+        try:
+            error = future.exception()
+            if error is None:
+                # Only running jobs can succeed; a job cancelled mid-flight stays cancelled
+                updated = conn.execute(
+                    'UPDATE jobs SET status = ?, progress = 1, message = ?, result = ?, error = NULL, '
+                    'updated_at = ? WHERE id = ? AND status = ?',
+                    (STATUS_SUCCEEDED, 'Done', json.dumps(future.result()), now, job_id, STATUS_RUNNING)
+                ).rowcount
+                if updated:
+                    finished = (STATUS_SUCCEEDED, future.result())
+            elif isinstance(error, JobCancelled):
+                pass
+            elif attempts < max_attempts and not isinstance(error, PermanentJobError):
+                if isinstance(error, BrokenProcessPool) and pool is not None:
+                    self._replace_pool(pool)
+                delay = self.retry_backoff ** attempts
+                conn.execute(
+                    'UPDATE jobs SET status = ?, owner = NULL, error = ?, message = ?, run_after = ?, '
+                    'updated_at = ? WHERE id = ? AND status = ?',
+                    (STATUS_QUEUED, str(error), f'Retrying in {delay:.0f}s', now + delay, now, job_id, STATUS_RUNNING)
+                )
+                print(f"[WARNING] Job {job_id} failed (attempt {attempts}/{max_attempts}), retrying: {error}")
+            else:
+                updated = conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, message = ?, updated_at = ? WHERE id = ? AND status = ?',
+                    (STATUS_FAILED, str(error), 'Failed', now, job_id, STATUS_RUNNING)
+                ).rowcount
+                if updated:
+                    finished = (STATUS_FAILED, str(error))
+                print(f"[WARNING] Job {job_id} failed permanently: {error}")
+        finally:
+            conn.close()
+        self._wakeup.set()
+
+        if finished and self.on_finish:
+            try:
+                self.on_finish(row['kind'], row['file_hash'], *finished)
+            except Exception as e:
+                print(f"[WARNING] Job finish hook failed for {job_id}: {e}")
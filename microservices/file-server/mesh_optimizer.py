@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+GPU-friendly mesh optimization for uploaded GLB files.
+
+For every indexed triangle primitive this pass:
+  - drops vertex attributes the material can never read
+  - merges bit-identical vertices
+  - reorders triangles for the post-transform vertex cache (Tipsify)
+  - sorts Tipsify clusters front-to-back to reduce overdraw
+  - reorders vertices by first use so vertex fetch is linear
+
+The GLB is then rewritten with compacted buffer views, and a report with
+ACMR/ATVR figures before and after is returned alongside the bytes.
+
+Usage: python mesh_optimizer.py <in.glb> [out.glb]
+"""
+import json
+import struct
+import sys
+import time
+
+import numpy as np
+
+GLB_MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+MODE_TRIANGLES = 4
+
+COMPONENT_DTYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+
+TYPE_COMPONENTS = {
+    'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4,
+    'MAT2': 4, 'MAT3': 9, 'MAT4': 16,
+}
+
+TARGET_ARRAY_BUFFER = 34962
+TARGET_ELEMENT_ARRAY_BUFFER = 34963
+
+# Extensions whose data never references accessors or buffer views, so
+# rewriting the binary chunk cannot invalidate them.
+SAFE_EXTENSION_PREFIXES = (
+    'KHR_materials_',
+    'KHR_texture_transform',
+    'KHR_texture_basisu',
+    'KHR_mesh_quantization',
+    'KHR_lights_punctual',
+    'EXT_texture_webp',
+)
+
+# A typical post-transform cache size for mobile GPUs (Adreno on Quest).
+DEFAULT_CACHE_SIZE = 16
+
+
+class GLBFormatError(ValueError):
+    """Raised when the input is not a GLB we can parse."""
+
+
+def parse_glb(data):
+    """Split a GLB into its JSON document and binary chunk."""
+    if len(data) < 20:
+        raise GLBFormatError('File too small to be a GLB')
+    magic, version, length = struct.unpack_from('<III', data, 0)
+    if magic != GLB_MAGIC:
+        raise GLBFormatError('Not a GLB file (bad magic)')
+    if version != 2:
+        raise GLBFormatError(f'Unsupported GLB version {version}')
+    if length > len(data):
+        raise GLBFormatError('GLB header length exceeds file size')
+
+    gltf = None
+    bin_chunk = b''
+    offset = 12
+    while offset + 8 <= length:
+        chunk_length, chunk_type = struct.unpack_from('<II', data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(bytes(chunk).decode('utf-8'))
+        elif chunk_type == CHUNK_BIN and not bin_chunk:
+            bin_chunk = bytes(chunk)
+        offset += 8 + chunk_length
+
+    if gltf is None:
+        raise GLBFormatError('GLB has no JSON chunk')
+    return gltf, bin_chunk
+
+
+def build_glb(gltf, bin_chunk):
+    """Serialize a glTF document and binary chunk back into GLB bytes."""
+    json_bytes = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_bytes += b' ' * (-len(json_bytes) % 4)
+    bin_bytes = bytes(bin_chunk) + b'\x00' * (-len(bin_chunk) % 4)
+
+    total = 12 + 8 + len(json_bytes)
+    if bin_bytes:
+        total += 8 + len(bin_bytes)
+
+    out = bytearray(struct.pack('<III', GLB_MAGIC, 2, total))
+    out += struct.pack('<II', len(json_bytes), CHUNK_JSON) + json_bytes
+    if bin_bytes:
+        out += struct.pack('<II', len(bin_bytes), CHUNK_BIN) + bin_bytes
+    return bytes(out)
+
+
+def _element_size(accessor):
+    dtype = np.dtype(COMPONENT_DTYPES[accessor['componentType']])
+    return dtype.itemsize * TYPE_COMPONENTS[accessor['type']]
+
+
+def _read_accessor_bytes(gltf, bin_chunk, accessor_index):
+    """Return an accessor's elements as a (count, element_size) uint8 matrix."""
+    accessor = gltf['accessors'][accessor_index]
+    view = gltf['bufferViews'][accessor['bufferView']]
+    element_size = _element_size(accessor)
+    stride = view.get('byteStride') or element_size
+    count = accessor['count']
+    start = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+
+    if count == 0:
+        return np.zeros((0, element_size), dtype=np.uint8)
+
+    needed = (count - 1) * stride + element_size
+    raw = np.frombuffer(bin_chunk, dtype=np.uint8, count=needed, offset=start)
+    rows = np.arange(count)[:, None] * stride + np.arange(element_size)[None, :]
+    return raw[rows]
+
+
+def _read_indices(gltf, bin_chunk, accessor_index):
+    accessor = gltf['accessors'][accessor_index]
+    dtype = COMPONENT_DTYPES[accessor['componentType']]
+    rows = _read_accessor_bytes(gltf, bin_chunk, accessor_index)
+    return np.ascontiguousarray(rows).view(dtype).ravel().astype(np.int64)
+
+
+def _typed(rows, accessor):
+    """View an element byte matrix as (count, components) typed values."""
+    dtype = COMPONENT_DTYPES[accessor['componentType']]
+    components = TYPE_COMPONENTS[accessor['type']]
+    return np.ascontiguousarray(rows).view(dtype).reshape(-1, components)
+
+
+def simulate_fifo_cache(indices, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Count post-transform cache misses for an index buffer using a FIFO cache.
+
+    Returns:
+        tuple: (misses, unique_vertices)
+    """
+    if len(indices) == 0:
+        return 0, 0
+    stamps = {}
+    misses = 0
+    for v in indices.tolist():
+        stamp = stamps.get(v)
+        if stamp is None or misses - stamp > cache_size - 1:
+            stamps[v] = misses
+            misses += 1
+    return misses, len(stamps)
+
+
+def cache_metrics(indices, cache_size=DEFAULT_CACHE_SIZE):
+    """ACMR (misses per triangle) and ATVR (misses per unique vertex)."""
+    triangles = len(indices) // 3
+    misses, unique = simulate_fifo_cache(indices, cache_size)
+    return {
+        'acmr': round(misses / triangles, 4) if triangles else 0.0,
+        'atvr': round(misses / unique, 4) if unique else 0.0,
+    }
+
+
+def tipsify(indices, vertex_count, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Reorder triangles for vertex cache locality (Sander et al. 2007).
+
+    Returns:
+        tuple: (reordered index array, list of cluster start offsets in triangles)
+    """
+    triangle_count = len(indices) // 3
+    if triangle_count == 0:
+        return indices.copy(), [0]
+
+    # Vertex -> triangle adjacency in CSR form
+    flat = indices.reshape(-1)
+    order = np.argsort(flat, kind='stable')
+    adjacency = (order // 3).tolist()
+    counts = np.bincount(flat, minlength=vertex_count)
+    starts = np.concatenate(([0], np.cumsum(counts))).tolist()
+
+    tris = indices.reshape(-1, 3).tolist()
+    live = counts.tolist()
+    stamps = [0] * vertex_count
+    emitted = [False] * triangle_count
+    dead_end = []
+    output = []
+    clusters = [0]
+
+    timestamp = cache_size + 1
+    cursor = 0
+    fan = int(flat[0])
+
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[starts[fan]:starts[fan + 1]]:
+            if emitted[t]:
+                continue
+            for v in tris[t]:
+                output.append(v)
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if timestamp - stamps[v] > cache_size:
+                    stamps[v] = timestamp
+                    timestamp += 1
+            emitted[t] = True
+
+        # Pick the candidate that will still be in cache with the most
+        # remaining triangles, otherwise fall back to a dead-end vertex.
+        best = -1
+        best_priority = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if timestamp - stamps[v] + 2 * live[v] <= cache_size:
+                    priority = timestamp - stamps[v]
+                if priority > best_priority:
+                    best_priority = priority
+                    best = v
+
+        if best == -1:
+            if len(output) // 3 < triangle_count:
+                clusters.append(len(output) // 3)
+            while dead_end:
+                d = dead_end.pop()
+                if live[d] > 0:
+                    best = d
+                    break
+            if best == -1:
+                while cursor < vertex_count:
+                    if live[cursor] > 0:
+                        best = cursor
+                        break
+                    cursor += 1
+        fan = best
+
+    return np.array(output, dtype=np.int64), clusters
+
+
+def sort_clusters_for_overdraw(indices, clusters, positions):
+    """
+    Order Tipsify clusters so outward-facing geometry is drawn first.
+
+    This is the linear-time overdraw pass from the Tipsify paper: each
+    cluster is scored by how far its centroid sits along its own average
+    normal relative to the mesh centroid.
+    """
+    if len(clusters) < 2 or positions is None:
+        return indices
+
+    tris = indices.reshape(-1, 3)
+    bounds = clusters + [len(tris)]
+    corners = positions[tris].astype(np.float64)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    centroids = corners.mean(axis=1)
+    mesh_centroid = centroids.mean(axis=0)
+
+    scores = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        normal = normals[start:end].sum(axis=0)
+        length = np.linalg.norm(normal)
+        if length > 0:
+            normal = normal / length
+        center = centroids[start:end].mean(axis=0)
+        scores.append(float(np.dot(center - mesh_centroid, normal)))
+
+    ranked = sorted(range(len(scores)), key=lambda i: -scores[i])
+    return np.concatenate([tris[bounds[i]:bounds[i + 1]] for i in ranked]).reshape(-1)
+
+
+def _texcoords_used(material):
+    """Collect every texCoord set referenced by a material's textureInfo objects."""
+    used = set()
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                # Core and KHR_materials_* texture slots all end in 'Texture'
+                if key.endswith('Texture') and isinstance(value, dict) and 'index' in value:
+                    used.add(value.get('texCoord', 0))
+                    transform = value.get('extensions', {}).get('KHR_texture_transform', {})
+                    if 'texCoord' in transform:
+                        used.add(transform['texCoord'])
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(material)
+    return used
+
+
+def _unused_attributes(gltf, primitive, skinned):
+    """Names of attributes the primitive's material or skin can never read."""
+    material = None
+    if 'material' in primitive:
+        material = gltf.get('materials', [])[primitive['material']]
+    texcoords = _texcoords_used(material) if material else set()
+    has_normal_map = bool(material and 'normalTexture' in material)
+
+    # Sets must stay numbered from 0 without gaps, so only sets above the highest
+    # used one can go; an unused TEXCOORD_0 below a used TEXCOORD_1 is kept
+    last_texcoord = max(texcoords, default=-1)
+
+    unused = []
+    for name in primitive['attributes']:
+        if name.startswith('TEXCOORD_'):
+            if int(name.split('_')[1]) > last_texcoord:
+                unused.append(name)
+        elif name == 'TANGENT' and not has_normal_map:
+            unused.append(name)
+        elif (name.startswith('JOINTS_') or name.startswith('WEIGHTS_')) and not skinned:
+            unused.append(name)
+    return unused
+
+
+def _skip_reason(gltf, primitive):
+    if primitive.get('mode', MODE_TRIANGLES) != MODE_TRIANGLES:
+        return 'not a triangle list'
+    if primitive.get('targets'):
+        return 'has morph targets'
+    if primitive.get('extensions'):
+        return 'has primitive extensions'
+    if 'POSITION' not in primitive.get('attributes', {}):
+        return 'no POSITION attribute'
+    accessor_ids = list(primitive['attributes'].values())
+    if 'indices' in primitive:
+        accessor_ids.append(primitive['indices'])
+    for accessor_id in accessor_ids:
+        accessor = gltf['accessors'][accessor_id]
+        if 'bufferView' not in accessor or 'sparse' in accessor:
+            return 'sparse or bufferless accessor'
+        if accessor['componentType'] not in COMPONENT_DTYPES:
+            return 'unknown component type'
+    return None
+
+
+def _asset_skip_reason(gltf):
+    buffers = gltf.get('buffers', [])
+    if len(buffers) != 1 or 'uri' in buffers[0]:
+        return 'external or multiple buffers'
+    for name in gltf.get('extensionsUsed', []):
+        if not name.startswith(SAFE_EXTENSION_PREFIXES):
+            return f'unsupported extension {name}'
+    if not gltf.get('meshes'):
+        return 'no meshes'
+    return None
+
+
+class _BinaryBuilder:
+    """Collects new buffer views before the binary chunk is rebuilt."""
+
+    def __init__(self, gltf):
+        self.gltf = gltf
+        self.pending = {}
+
+    def add_view(self, data, target, byte_stride=None):
+        view = {'buffer': 0, 'byteLength': len(data), 'target': target}
+        if byte_stride:
+            view['byteStride'] = byte_stride
+        self.gltf['bufferViews'].append(view)
+        index = len(self.gltf['bufferViews']) - 1
+        self.pending[index] = data
+        return index
+
+    def add_accessor(self, accessor):
+        self.gltf['accessors'].append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+
+def _write_vertex_attribute(builder, accessor, rows):
+    element_size = rows.shape[1]
+    stride = element_size + (-element_size % 4)
+    if stride != element_size:
+        rows = np.hstack([rows, np.zeros((rows.shape[0], stride - element_size), dtype=np.uint8)])
+    view = builder.add_view(np.ascontiguousarray(rows).tobytes(), TARGET_ARRAY_BUFFER,
+                            stride if stride != element_size else None)
+    new_accessor = {k: v for k, v in accessor.items() if k not in ('bufferView', 'byteOffset', 'count', 'min', 'max')}
+    new_accessor['bufferView'] = view
+    new_accessor['count'] = int(rows.shape[0])
+    if 'min' in accessor or 'max' in accessor:
+        values = _typed(rows[:, :element_size], accessor)
+        new_accessor['min'] = values.min(axis=0).tolist()
+        new_accessor['max'] = values.max(axis=0).tolist()
+    return builder.add_accessor(new_accessor)
+
+
+def _write_indices(builder, indices, vertex_count):
+    if vertex_count <= 0xFFFF:
+        component_type, dtype = 5123, np.uint16
+    else:
+        component_type, dtype = 5125, np.uint32
+    data = indices.astype(dtype).tobytes()
+    view = builder.add_view(data, TARGET_ELEMENT_ARRAY_BUFFER)
+    return builder.add_accessor({
+        'bufferView': view,
+        'componentType': component_type,
+        'count': int(len(indices)),
+        'type': 'SCALAR',
+    })
+
+
+def optimize_primitive(gltf, bin_chunk, primitive, builder, skinned, cache_size=DEFAULT_CACHE_SIZE, overdraw=True):
+    """Optimize one primitive in place and return its report entry."""
+    attributes = primitive['attributes']
+    vertex_count = gltf['accessors'][attributes['POSITION']]['count']
+
+    if 'indices' in primitive:
+        indices = _read_indices(gltf, bin_chunk, primitive['indices'])
+    else:
+        indices = np.arange(vertex_count, dtype=np.int64)
+    indices = indices[:len(indices) - len(indices) % 3]
+
+    before = cache_metrics(indices, cache_size)
+    report = {
+        'triangles': len(indices) // 3,
+        'vertices_before': vertex_count,
+        'acmr_before': before['acmr'],
+        'atvr_before': before['atvr'],
+    }
+
+    dropped = _unused_attributes(gltf, primitive, skinned)
+    kept = [name for name in attributes if name not in dropped]
+    rows = {name: _read_accessor_bytes(gltf, bin_chunk, attributes[name]) for name in kept}
+
+    # Merge vertices whose kept attributes are byte-identical
+    key = np.ascontiguousarray(np.hstack([rows[name] for name in kept]))
+    key_view = key.view(np.dtype((np.void, key.shape[1]))).ravel()
+    _, first, inverse = np.unique(key_view, return_index=True, return_inverse=True)
+    indices = inverse.ravel()[indices]
+    unique_rows = {name: rows[name][first] for name in kept}
+    merged_count = len(first)
+
+    indices, clusters = tipsify(indices, merged_count, cache_size)
+
+    if overdraw:
+        position_accessor = gltf['accessors'][attributes['POSITION']]
+        positions = None
+        if position_accessor['componentType'] == 5126 and position_accessor['type'] == 'VEC3':
+            positions = _typed(unique_rows['POSITION'], position_accessor)
+        indices = sort_clusters_for_overdraw(indices, clusters, positions)
+
+    # Vertex fetch order: number vertices by first use in the index buffer
+    used, first_use = np.unique(indices, return_index=True)
+    fetch_order = used[np.argsort(first_use, kind='stable')]
+    remap = np.full(merged_count, -1, dtype=np.int64)
+    remap[fetch_order] = np.arange(len(fetch_order))
+    indices = remap[indices]
+
+    new_attributes = {}
+    for name in kept:
+        accessor = gltf['accessors'][attributes[name]]
+        new_attributes[name] = _write_vertex_attribute(builder, accessor, unique_rows[name][fetch_order])
+    primitive['attributes'] = new_attributes
+    primitive['indices'] = _write_indices(builder, indices, len(fetch_order))
+
+    after = cache_metrics(indices, cache_size)
+    report.update({
+        'vertices_after': int(len(fetch_order)),
+        'acmr_after': after['acmr'],
+        'atvr_after': after['atvr'],
+        'clusters': len(clusters),
+        'dropped_attributes': dropped,
+    })
+    return report
+
+
+def _accessor_refs(gltf):
+    """Yield (container, key) pairs for every accessor reference we know of."""
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            for name in primitive.get('attributes', {}):
+                yield primitive['attributes'], name
+            if 'indices' in primitive:
+                yield primitive, 'indices'
+            for target in primitive.get('targets', []):
+                for name in target:
+                    yield target, name
+    for skin in gltf.get('skins', []):
+        if 'inverseBindMatrices' in skin:
+            yield skin, 'inverseBindMatrices'
+    for animation in gltf.get('animations', []):
+        for sampler in animation.get('samplers', []):
+            yield sampler, 'input'
+            yield sampler, 'output'
+
+
+def _buffer_view_refs(gltf):
+    for accessor in gltf.get('accessors', []):
+        if 'bufferView' in accessor:
+            yield accessor, 'bufferView'
+        sparse = accessor.get('sparse')
+        if sparse:
+            yield sparse['indices'], 'bufferView'
+            yield sparse['values'], 'bufferView'
+    for image in gltf.get('images', []):
+        if 'bufferView' in image:
+            yield image, 'bufferView'
+
+
+def _compact(gltf, bin_chunk, pending):
+    """Drop unreferenced accessors and buffer views and rebuild the binary chunk."""
+    refs = list(_accessor_refs(gltf))
+    used_accessors = sorted({container[key] for container, key in refs})
+    accessor_map = {old: new for new, old in enumerate(used_accessors)}
+    gltf['accessors'] = [gltf['accessors'][i] for i in used_accessors]
+    for container, key in refs:
+        container[key] = accessor_map[container[key]]
+
+    refs = list(_buffer_view_refs(gltf))
+    used_views = sorted({container[key] for container, key in refs})
+    view_map = {old: new for new, old in enumerate(used_views)}
+
+    new_bin = bytearray()
+    new_views = []
+    for old in used_views:
+        view = dict(gltf['bufferViews'][old])
+        if old in pending:
+            data = pending[old]
+        else:
+            start = view.get('byteOffset', 0)
+            data = bin_chunk[start:start + view['byteLength']]
+        new_bin += b'\x00' * (-len(new_bin) % 4)
+        view['byteOffset'] = len(new_bin)
+        view['byteLength'] = len(data)
+        new_bin += data
+        new_views.append(view)
+
+    gltf['bufferViews'] = new_views
+    for container, key in refs:
+        container[key] = view_map[container[key]]
+    gltf['buffers'][0]['byteLength'] = len(new_bin)
+    return bytes(new_bin)
+
+
+def optimize_glb(data, cache_size=DEFAULT_CACHE_SIZE, overdraw=True):
+    """
+    Optimize all eligible mesh primitives in a GLB.
+
+    Args:
+        data: GLB file bytes
+        cache_size: Simulated post-transform cache size used for Tipsify and metrics
+        overdraw: Sort Tipsify clusters front-to-back after cache optimization
+
+    Returns:
+        tuple: (optimized GLB bytes, report dict). When nothing could be
+        optimized the original bytes are returned and report['optimized'] is False.
+    """
+    start_time = time.time()
+    gltf, bin_chunk = parse_glb(data)
+
+    report = {
+        'optimized': False,
+        'cache_size': cache_size,
+        'bytes_before': len(data),
+        'bytes_after': len(data),
+        'primitives': [],
+    }
+
+    reason = _asset_skip_reason(gltf)
+    if reason:
+        report['skipped'] = reason
+        return data, report
+
+    skinned_meshes = {node['mesh'] for node in gltf.get('nodes', []) if 'mesh' in node and 'skin' in node}
+    builder = _BinaryBuilder(gltf)
+
+    for mesh_index, mesh in enumerate(gltf['meshes']):
+        for primitive_index, primitive in enumerate(mesh.get('primitives', [])):
+            entry = {'mesh': mesh.get('name', mesh_index), 'primitive': primitive_index}
+            reason = _skip_reason(gltf, primitive)
+            if reason:
+                entry['skipped'] = reason
+            else:
+                entry.update(optimize_primitive(
+                    gltf, bin_chunk, primitive, builder,
+                    skinned=mesh_index in skinned_meshes,
+                    cache_size=cache_size,
+                    overdraw=overdraw
+                ))
+            report['primitives'].append(entry)
+
+    if not builder.pending:
+        report['skipped'] = 'no eligible primitives'
+        return data, report
+
+    new_bin = _compact(gltf, bin_chunk, builder.pending)
+    optimized = build_glb(gltf, new_bin)
+
+    done = [p for p in report['primitives'] if 'skipped' not in p]
+    triangles = sum(p['triangles'] for p in done)
+    if triangles:
+        report['acmr_before'] = round(sum(p['acmr_before'] * p['triangles'] for p in done) / triangles, 4)
+        report['acmr_after'] = round(sum(p['acmr_after'] * p['triangles'] for p in done) / triangles, 4)
+    report['vertices_before'] = sum(p['vertices_before'] for p in done)
+    report['vertices_after'] = sum(p['vertices_after'] for p in done)
+    report['optimized'] = True
+    report['bytes_after'] = len(optimized)
+    report['duration_ms'] = int((time.time() - start_time) * 1000)
+    return optimized, report
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python mesh_optimizer.py <in.glb> [out.glb]')
+        sys.exit(1)
+    with open(sys.argv[1], 'rb') as f:
+        glb_data = f.read()
+    optimized_data, optimize_report = optimize_glb(glb_data)
+    print(json.dumps(optimize_report, indent=2))
+    if len(sys.argv) > 2 and optimize_report['optimized']:
+        with open(sys.argv[2], 'wb') as f:
+            f.write(optimized_data)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Prefork launcher for the file server.
+
+The master process opens the listening socket (or, with SO_REUSEPORT, lets
+every worker bind its own) and forks N workers that each run a threaded
+HTTP server. Hashing, multipart parsing and GLB processing then scale with
+cores instead of sharing one GIL. Workers share nothing in memory; anything
+they need to agree on lives on disk (ASSETS_ROOT, e.g. jobs.db).
+
+The master stays single-threaded so forking is safe, and supervises workers:
+- a worker's serve loop writes a heartbeat byte to a pipe every poll
+  interval; a worker that stops beating for WORKER_TIMEOUT seconds is killed
+  and replaced, as is any worker that exits
+- SIGHUP does a rolling restart: replacement workers start first, then the
+  old ones drain their in-flight requests and exit; one still running
+  GRACEFUL_TIMEOUT seconds later (e.g. held open by an event stream) is killed
+- SIGTERM / SIGINT stop accepting, give workers GRACEFUL_TIMEOUT seconds to
+  finish, then kill what's left
+
+Code changes still need a full restart; workers are forked from the master.
+"""
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+WORKER_TIMEOUT = 30
+GRACEFUL_TIMEOUT = 30
+RESPAWN_BACKOFF_MAX = 10
+
+
+class WorkerHTTPServer(ThreadingHTTPServer):
+    """Threaded server that reports liveness from its serve loop."""
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, address, handler_class, sock=None, reuse_port=False, heartbeat_fd=None):
+        self.heartbeat_fd = heartbeat_fd
+        self.reuse_port = reuse_port
+        if sock is None:
+            super().__init__(address, handler_class)
+            return
+        # Use the socket inherited from the master instead of binding again
+        super().__init__(address, handler_class, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.server_address = sock.getsockname()
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def service_actions(self):
+        if self.heartbeat_fd is not None:
+            try:
+                os.write(self.heartbeat_fd, b'.')
+            except BlockingIOError:
+                # Master hasn't drained the pipe yet; it already knows we're alive
+                pass
+            except OSError:
+                # Master is gone
+                self.heartbeat_fd = None
+                threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+def create_listen_socket(address, backlog=128):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    return sock
+
+
+class PreforkServer:
+    def __init__(self, address, handler_class, workers=2, reuse_port=False, on_worker_start=None,
+                 on_worker_stop=None):
+        """
+        Args:
+            address: (host, port) to serve on
+            handler_class: request handler passed to each worker's HTTP server
+            workers: number of worker processes
+            reuse_port: bind one socket per worker with SO_REUSEPORT instead of
+                sharing the master's socket (kernel load-balances connections)
+            on_worker_start: called as on_worker_start(index) in each new worker
+                before it serves, to build per-worker state
+            on_worker_stop: called in a worker when it is asked to stop, before
+                it drains, to end long-lived requests and background threads
+        """
+        if reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+            print("[WARNING] SO_REUSEPORT not supported on this platform, using a shared socket")
+            reuse_port = False
+        self.address = address
+        self.handler_class = handler_class
+        self.worker_count = max(1, workers)
+        self.reuse_port = reuse_port
+        self.on_worker_start = on_worker_start
+        self.on_worker_stop = on_worker_stop
+        self.socket = None
+        # pid -> {'index', 'fd', 'last_beat', 'retiring', 'retire_at'}
+        self.workers = {}
+        self._respawn_delay = {}
+        self._signals = []
+        self._stopping = False
+
+    def run(self):
+        if not self.reuse_port:
+            self.socket = create_listen_socket(self.address)
+        print(f"[INFO] Prefork master {os.getpid()} starting {self.worker_count} worker(s) on "
+              f"{self.address[0]}:{self.address[1]} ({'SO_REUSEPORT' if self.reuse_port else 'shared socket'})")
+
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, lambda signum, frame: self._signals.append(signum))
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+        for index in range(self.worker_count):
+            self._spawn(index)
+
+        while not self._stopping:
+            self._handle_signals()
+            self._read_heartbeats(timeout=1.0)
+            self._reap()
+            self._check_timeouts()
+            self._replace_missing()
+
+        self._shutdown()
+
+    def _spawn(self, index):
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(write_fd, False)
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            # Only the master may hold heartbeat read ends, so a dead master shows up as EPIPE
+            for worker in self.workers.values():
+                os.close(worker['fd'])
+            self._worker_main(index, write_fd)
+            os._exit(0)
+
+        os.close(write_fd)
+        self.workers[pid] = {'index': index, 'fd': read_fd, 'last_beat': time.time(), 'retiring': False,
+                             'retire_at': None}
+        print(f"[INFO] Started worker {index} (pid {pid})")
+        return pid
+
+    def _worker_main(self, index, heartbeat_fd):
+        # Default signal handling in the worker; SIGTERM drains and exits
+        for sig in (signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        exit_code = 0
+        try:
+            if self.on_worker_start:
+                self.on_worker_start(index)
+            server = WorkerHTTPServer(self.address, self.handler_class, sock=self.socket,
+                                      reuse_port=self.reuse_port, heartbeat_fd=heartbeat_fd)
+
+            def drain():
+                if self.on_worker_stop:
+                    try:
+                        self.on_worker_stop()
+                    except Exception as e:
+                        print(f"[WARNING] Worker {index} stop hook failed: {e}")
+                server.shutdown()
+
+            def stop(signum, frame):
+                # shutdown() blocks until serve_forever returns, so not from this thread
+                threading.Thread(target=drain, daemon=True).start()
+            signal.signal(signal.SIGTERM, stop)
+
+            server.serve_forever()
+            # Wait for in-flight request threads
+            server.server_close()
+        except Exception as e:
+            print(f"[WARNING] Worker {index} (pid {os.getpid()}) crashed: {e}")
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+        os._exit(exit_code)
+
+    def _handle_signals(self):
+        while self._signals:
+            signum = self._signals.pop(0)
+            if signum == signal.SIGHUP:
+                self._reload()
+            else:
+                print(f"[INFO] Prefork master received {signal.Signals(signum).name}, shutting down")
+                self._stopping = True
+
+    def _reload(self):
+        """Rolling restart: start replacements, then retire the old generation."""
+        old = [pid for pid, worker in self.workers.items() if not worker['retiring']]
+        print(f"[INFO] Reloading {len(old)} worker(s)")
+        deadline = time.time() + GRACEFUL_TIMEOUT
+        for pid in old:
+            self.workers[pid]['retiring'] = True
+            self.workers[pid]['retire_at'] = deadline
+            self._spawn(self.workers[pid]['index'])
+        for pid in old:
+            self._signal_worker(pid, signal.SIGTERM)
+
+    def _read_heartbeats(self, timeout):
+        fds = {worker['fd']: pid for pid, worker in self.workers.items()}
+        if not fds:
+            time.sleep(timeout)
+            return
+        try:
+            readable, _, _ = select.select(list(fds), [], [], timeout)
+        except InterruptedError:
+            return
+        now = time.time()
+        for fd in readable:
+            try:
+                os.read(fd, 4096)
+            except OSError:
+                continue
+            self.workers[fds[fd]]['last_beat'] = now
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                # No children left at all
+                for worker in self.workers.values():
+                    os.close(worker['fd'])
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker['fd'])
+            if not worker['retiring'] and not self._stopping:
+                print(f"[WARNING] Worker {worker['index']} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+                # Back off if a worker keeps dying on startup
+                delay = self._respawn_delay.get(worker['index'], 0)
+                self._respawn_delay[worker['index']] = min(max(1, delay * 2), RESPAWN_BACKOFF_MAX)
+                if delay:
+                    time.sleep(delay)
+            else:
+                self._respawn_delay.pop(worker['index'], None)
+
+    def _check_timeouts(self):
+        now = time.time()
+        for pid, worker in list(self.workers.items()):
+            if worker['retire_at'] is not None and now > worker['retire_at']:
+                print(f"[WARNING] Retired worker {worker['index']} (pid {pid}) did not exit in {GRACEFUL_TIMEOUT}s, killing")
+                worker['retire_at'] = None
+                self._signal_worker(pid, signal.SIGKILL)
+            elif not worker['retiring'] and now - worker['last_beat'] > WORKER_TIMEOUT:
+                print(f"[WARNING] Worker {worker['index']} (pid {pid}) missed heartbeats for {WORKER_TIMEOUT}s, killing")
+                worker['retiring'] = True
+                self._signal_worker(pid, signal.SIGKILL)
+                self._spawn(worker['index'])
+
+    def _replace_missing(self):
+        if self._stopping:
+            return
+        running = {worker['index'] for worker in self.workers.values() if not worker['retiring']}
+        for index in range(self.worker_count):
+            if index not in running:
+                self._spawn(index)
+
+    def _signal_worker(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _shutdown(self):
+        for pid in list(self.workers):
+            self.workers[pid]['retiring'] = True
+            self._signal_worker(pid, signal.SIGTERM)
+        if self.socket:
+            self.socket.close()
+
+        deadline = time.time() + GRACEFUL_TIMEOUT
+        while self.workers and time.time() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        for pid in list(self.workers):
+            print(f"[WARNING] Worker pid {pid} did not exit in {GRACEFUL_TIMEOUT}s, killing")
+            self._signal_worker(pid, signal.SIGKILL)
+        while self.workers:
+            self._reap()
+            time.sleep(0.05)
+        print("[INFO] Prefork master stopped")
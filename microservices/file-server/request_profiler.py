@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-request stack sampling for the file server.
+
+While enabled, one sampler thread per process records the Python stack of
+every in-flight request's thread each interval. When a request finishes its
+samples are kept if it was picked by the sample rate or took longer than the
+slow threshold, and dropped otherwise, so slow requests are always captured
+without knowing in advance which ones they will be.
+
+Kept profiles are written to a directory that acts as a ring buffer (the
+newest `keep` files survive), which prefork workers share. Each profile is
+a set of folded stacks ("frame;frame;frame count"), the input format of
+flamegraph.pl, speedscope and inferno:
+    curl -H 'X-Debug-Token: ...' localhost:9909/debug/profiles/<id> | flamegraph.pl > fetch.svg
+
+Query strings are never recorded because they carry upload secrets.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from fsutil import write_file_atomic
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_KEEP = 200
+MAX_STACK_DEPTH = 96
+
+
+def frame_label(frame):
+    code = frame.f_code
+    # ';' separates frames and ' ' the count in the folded format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+def fold_stack(frame, root):
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ';'.join(reversed(labels))
+
+
+class RequestProfiler:
+    def __init__(self, directory, sample_rate=0.01, slow_ms=1000, interval=DEFAULT_INTERVAL, keep=DEFAULT_KEEP):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval = interval
+        self.keep = keep
+        self._active = {}
+        self._lock = threading.Lock()
+        self._written = 0
+        os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=self._sample_loop, name='request-profiler', daemon=True).start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            # Under the lock so a finished request's samples are never touched again
+            with self._lock:
+                for thread_id, (root, samples) in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[fold_stack(frame, root)] += 1
+            del frames
+
+    @contextmanager
+    def request(self, method, path, handler=None):
+        """Profile the enclosed request handling on the current thread."""
+        path = path.split('?', 1)[0]
+        root = f'{method} {path}'
+        samples = Counter()
+        sampled = random.random() < self.sample_rate
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = (root, samples)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._active.pop(thread_id, None)
+            slow = duration_ms >= self.slow_ms
+            if (sampled or slow) and samples:
+                self._save({
+                    'method': method,
+                    'path': path,
+                    'status': getattr(handler, 'status_code', None),
+                    'duration_ms': round(duration_ms, 1),
+                    'reason': 'slow' if slow else 'sampled',
+                    'interval_ms': self.interval * 1000,
+                    'pid': os.getpid(),
+                }, samples)
+
+    def _save(self, meta, samples):
+        profile_id = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}'
+        meta = dict(meta, id=profile_id, time=time.time(), samples=sum(samples.values()))
+        try:
+            write_file_atomic(os.path.join(self.directory, f'{profile_id}.json'),
+                              json.dumps(dict(meta, folded=dict(samples))).encode())
+            print(f"[DEBUG] Captured {meta['reason']} profile {profile_id}: {meta['method']} {meta['path']} "
+                  f"{meta['duration_ms']}ms, {meta['samples']} samples")
+            self._written += 1
+            if self._written % 10 == 0:
+                self._prune()
+        except OSError as e:
+            print(f"[WARNING] Could not save profile: {e}")
+
+    def _profile_files(self):
+        # Ids start with a millisecond timestamp, so name order is age order
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.json') and '.tmp.' not in name)
+
+    def _prune(self):
+        for name in self._profile_files()[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def load(self, profile_id):
+        if not profile_id or os.sep in profile_id or profile_id.startswith('.'):
+            raise FileNotFoundError(profile_id)
+        with open(os.path.join(self.directory, f'{profile_id}.json')) as f:
+            return json.load(f)
+
+    def list(self, path=None, limit=None):
+        """Metadata of the newest profiles first, optionally for one path."""
+        profiles = []
+        for name in reversed(self._profile_files()[-self.keep:]):
+            try:
+                profile = self.load(name[:-len('.json')])
+            except (FileNotFoundError, ValueError):
+                continue
+            if path and profile['path'] != path:
+                continue
+            profile.pop('folded', None)
+            profiles.append(profile)
+            if limit and len(profiles) >= limit:
+                break
+        return profiles
+
+    def folded(self, profile_ids):
+        """Merge the stacks of several profiles into one folded-stacks text."""
+        merged = Counter()
+        for profile_id in profile_ids:
+            merged.update(self.load(profile_id)['folded'])
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(merged.items()))
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Pluggable blob storage for GLBs and their derived files.
+
+Blobs are addressed by key: <hash>.glb for originals, <hash>.optimized.glb
+and <hash>.report.json for what the asset jobs derive from them. Backends:
+
+    local:<dir>              files in a directory (default: <ASSETS_ROOT>/glbs)
+    memory:                  process-local dict, for tests and benchmarks;
+                             job worker processes can't see it
+    s3://<bucket>/<prefix>   S3 or any S3-compatible store such as MinIO,
+                             with multipart uploads and streamed reads
+
+Select one with GLB_STORAGE. For S3, GLB_S3_ENDPOINT_URL points at a
+non-AWS endpoint and credentials come from the usual boto3 sources, e.g.:
+    docker run -p 9000:9000 minio/minio server /data
+    GLB_STORAGE=s3://glbs GLB_S3_ENDPOINT_URL=http://localhost:9000 \\
+        AWS_ACCESS_KEY_ID=minioadmin AWS_SECRET_ACCESS_KEY=minioadmin python fileserver.py
+"""
+import os
+import threading
+import time
+
+from fsutil import write_file_atomic
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    S3_AVAILABLE = True
+except ImportError:
+    S3_AVAILABLE = False
+
+READ_SIZE = 1024 * 1024
+S3_PART_SIZE = 8 * 1024 * 1024
+
+
+class BlobStore:
+    """Interface shared by all backends. Missing keys raise FileNotFoundError."""
+    spec = None
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def size(self, key):
+        raise NotImplementedError
+
+    def put(self, key, data):
+        raise NotImplementedError
+
+    def stream(self, key, block_size=READ_SIZE):
+        """Yield the blob in blocks without loading it all."""
+        raise NotImplementedError
+
+    def read(self, key):
+        return b''.join(self.stream(key))
+
+    def delete(self, key):
+        """Remove a blob. Returns False if it didn't exist."""
+        raise NotImplementedError
+
+    def list(self):
+        """Yield (key, size, mtime) for every blob."""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root):
+        self.root = root
+        self.spec = f'local:{root}'
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        # Keys are generated by the server, but never let one escape the root
+        if os.sep in key or key.startswith('.'):
+            raise FileNotFoundError(key)
+        return os.path.join(self.root, key)
+
+    def exists(self, key):
+        try:
+            return os.path.exists(self._path(key))
+        except FileNotFoundError:
+            return False
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def put(self, key, data):
+        write_file_atomic(self._path(key), data)
+
+    def stream(self, key, block_size=READ_SIZE):
+        with open(self._path(key), 'rb') as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    return
+                yield block
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list(self):
+        for name in os.listdir(self.root):
+            if '.tmp.' in name:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield name, stat.st_size, stat.st_mtime
+
+
+class MemoryBlobStore(BlobStore):
+    spec = 'memory:'
+
+    def __init__(self):
+        self._blobs = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            try:
+                return self._blobs[key]
+            except KeyError:
+                raise FileNotFoundError(key)
+
+    def exists(self, key):
+        with self._lock:
+            return key in self._blobs
+
+    def size(self, key):
+        return len(self._get(key)[0])
+
+    def put(self, key, data):
+        with self._lock:
+            self._blobs[key] = (bytes(data), time.time())
+
+    def stream(self, key, block_size=READ_SIZE):
+        data = self._get(key)[0]
+        for offset in range(0, len(data), block_size):
+            yield data[offset:offset + block_size]
+
+    def delete(self, key):
+        with self._lock:
+            return self._blobs.pop(key, None) is not None
+
+    def list(self):
+        with self._lock:
+            items = list(self._blobs.items())
+        for key, (data, mtime) in items:
+            yield key, len(data), mtime
+
+
+class S3BlobStore(BlobStore):
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, part_size=S3_PART_SIZE):
+        if not S3_AVAILABLE:
+            raise RuntimeError("boto3 not installed, S3 storage unavailable. Run: pip install boto3")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.part_size = max(5 * 1024 * 1024, part_size)
+        self.spec = f's3://{bucket}/{self.prefix}'
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(key)
+            raise
+
+    def exists(self, key):
+        try:
+            self._head(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def size(self, key):
+        return self._head(key)['ContentLength']
+
+    def put(self, key, data):
+        if len(data) <= self.part_size:
+            self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+            return
+
+        upload = self.client.create_multipart_upload(Bucket=self.bucket, Key=self._key(key))
+        upload_id = upload['UploadId']
+        try:
+            parts = []
+            view = memoryview(data)
+            for number, offset in enumerate(range(0, len(data), self.part_size), start=1):
+                part = self.client.upload_part(
+                    Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                    PartNumber=number, Body=bytes(view[offset:offset + self.part_size])
+                )
+                parts.append({'PartNumber': number, 'ETag': part['ETag']})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            # Don't leave billable orphaned parts behind
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id)
+            raise
+
+    def stream(self, key, block_size=READ_SIZE):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(key)
+            raise
+        body = response['Body']
+        try:
+            yield from body.iter_chunks(block_size)
+        finally:
+            body.close()
+
+    def delete(self, key):
+        existed = self.exists(key)
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return existed
+
+    def list(self):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):], item['Size'], item['LastModified'].timestamp()
+
+
+def open_store(spec, default_root=None):
+    """Build a backend from a GLB_STORAGE spec; 'local' alone means default_root."""
+    if not spec or spec == 'local':
+        if default_root is None:
+            raise ValueError("Storage spec 'local' needs a default root; use local:<dir>")
+        return LocalBlobStore(default_root)
+    if spec.startswith('local:'):
+        return LocalBlobStore(spec[len('local:'):])
+    if spec.startswith('memory'):
+        return MemoryBlobStore()
+    if spec.startswith('s3://'):
+        bucket, _, prefix = spec[len('s3://'):].partition('/')
+        return S3BlobStore(
+            bucket,
+            prefix,
+            endpoint_url=os.getenv('GLB_S3_ENDPOINT_URL') or None,
+            region=os.getenv('GLB_S3_REGION') or None
+        )
+    raise ValueError(f'Unknown storage spec: {spec}')
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+MB = 1024 * 1024
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.01)
+
+
+def queue_upload(controller, nbytes, admitted, name):
+    """Start a thread that waits for admission, records its name and releases at once."""
+    def run():
+        controller.acquire(nbytes)
+        admitted.append(name)
+        controller.release(nbytes)
+    waiting = controller.snapshot()['waiting']
+    thread = threading.Thread(target=run)
+    thread.start()
+    # Queue strictly one after another so ticket order is known
+    wait_until(lambda: controller.snapshot()['waiting'] == waiting + 1)
+    return thread
+
+
+class TestQueue:
+
+    def test_waiters_admitted_in_ticket_order(self):
+        controller = AdmissionController(max_concurrent=1, queue_timeout=5, read_window=0.01)
+        controller.acquire(MB)
+        admitted = []
+        threads = [queue_upload(controller, MB, admitted, name) for name in 'abcd']
+
+        controller.release(MB)
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert admitted == list('abcd')
+
+    def test_small_upload_does_not_overtake_queued_large_one(self):
+        """Test a small upload that would fit the byte budget still waits behind the queue head."""
+        controller = AdmissionController(max_concurrent=4, max_bytes=10 * MB, queue_timeout=5, read_window=0.01)
+        controller.acquire(8 * MB)
+        admitted = []
+        large = queue_upload(controller, 8 * MB, admitted, 'large')
+        small = queue_upload(controller, MB, admitted, 'small')
+
+        assert admitted == []
+        controller.release(8 * MB)
+        large.join(timeout=5)
+        small.join(timeout=5)
+
+        assert admitted == ['large', 'small']
+
+    def test_full_queue_rejected(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5, read_window=0.01)
+        controller.acquire(MB)
+        admitted = []
+        waiter = queue_upload(controller, MB, admitted, 'a')
+
+        with pytest.raises(Overloaded) as error:
+            controller.acquire(MB)
+
+        assert error.value.retry_after >= 1
+        assert controller.snapshot()['rejected'] == 1
+        controller.release(MB)
+        waiter.join(timeout=5)
+
+    def test_wait_times_out(self):
+        controller = AdmissionController(max_concurrent=1, queue_timeout=0.1, read_window=0.01)
+        controller.acquire(MB)
+
+        with pytest.raises(Overloaded):
+            controller.acquire(MB)
+
+        snapshot = controller.snapshot()
+        assert (snapshot['timed_out'], snapshot['waiting'], snapshot['active']) == (1, 0, 1)
+
+
+class TestLimits:
+
+    def test_oversized_upload_runs_alone(self):
+        controller = AdmissionController(max_concurrent=4, max_bytes=MB, queue_timeout=0.05, read_window=0.01)
+
+        controller.acquire(5 * MB)
+        with pytest.raises(Overloaded):
+            controller.acquire(1)
+        controller.release(5 * MB)
+        controller.acquire(1)
+
+    def test_reads_limit_upload_slots(self):
+        controller = AdmissionController(max_concurrent=4, queue_timeout=0.05, slots_under_read_load=1, read_window=0.05)
+
+        with controller.reading():
+            controller.acquire(MB)
+            with pytest.raises(Overloaded):
+                controller.acquire(MB)
+        time.sleep(0.1)
+        controller.acquire(MB)
+
+        assert controller.snapshot()['active'] == 2
@@ -0,0 +1,95 @@
+import hashlib
+import random
+
+import pytest
+
+import chunk_store
+from chunk_store import ChunkStore, chunk_boundaries, split_chunks
+
+SIZES = {'min_size': 2048, 'avg_size': 8192, 'max_size': 32768}
+
+
+def random_bytes(size, seed=1):
+    return random.Random(seed).randbytes(size)
+
+
+class TestChunkBoundaries:
+
+    def test_boundaries_cover_the_data(self):
+        """Test chunks are contiguous, within the size limits and rejoin to the input."""
+        data = random_bytes(500_000)
+
+        boundaries = chunk_boundaries(data, **SIZES)
+        sizes = [end - start for start, end in zip([0] + boundaries, boundaries)]
+
+        assert boundaries[-1] == len(data)
+        assert all(size <= SIZES['max_size'] for size in sizes)
+        assert all(size >= SIZES['min_size'] for size in sizes[:-1])
+        assert b''.join(split_chunks(data, **SIZES)) == data
+
+    def test_numpy_and_python_paths_agree(self, monkeypatch):
+        """Test both implementations cut at the same offsets, so stores stay compatible."""
+        pytest.importorskip('numpy')
+        data = random_bytes(300_000)
+        with_numpy = chunk_boundaries(data, **SIZES)
+
+        monkeypatch.setattr(chunk_store, 'NUMPY_AVAILABLE', False)
+
+        assert chunk_boundaries(data, **SIZES) == with_numpy
+
+    def test_hash_windows_do_not_move_boundaries(self):
+        """Test hashing in small windows finds the same cut points as hashing everything at once."""
+        np = pytest.importorskip('numpy')
+        data = random_bytes(300_000)
+        masks = (chunk_store._top_mask(15), chunk_store._top_mask(11))
+
+        whole = chunk_store._cut_candidates_numpy(data, *masks, window=len(data))
+        windowed = chunk_store._cut_candidates_numpy(data, *masks, window=4099)
+
+        assert len(whole[1]) > 50
+        assert np.array_equal(whole[0], windowed[0])
+        assert np.array_equal(whole[1], windowed[1])
+
+    def test_boundaries_resync_after_an_edit(self):
+        """Test an insertion only changes the chunks around it."""
+        data = random_bytes(400_000)
+        edited = data[:200_000] + b'inserted bytes' + data[200_000:]
+
+        before = {hashlib.sha256(c).digest() for c in split_chunks(data, **SIZES)}
+        after = [hashlib.sha256(c).digest() for c in split_chunks(edited, **SIZES)]
+
+        changed = [c for c in after if c not in before]
+        assert len(changed) <= 2
+        assert len(after) > 20
+
+
+class TestChunkStore:
+
+    def test_put_read_and_dedupe(self, tmp_path):
+        """Test a re-exported file only stores its new chunks and both read back intact."""
+        store = ChunkStore(str(tmp_path), **SIZES)
+        data = random_bytes(400_000)
+        edited = data[:100_000] + b'new material' + data[100_000:]
+
+        first = store.put('a', data)
+        second = store.put('b', edited)
+
+        assert store.read('a') == data
+        assert store.read('b') == edited
+        assert first['new_chunks'] == first['chunks']
+        assert second['new_chunks'] <= 2
+        assert store.stats()['dedupe_ratio'] > 1.8
+
+    def test_sweep_keeps_referenced_chunks(self, tmp_path):
+        """Test deleting one file only reclaims the chunks no other file uses."""
+        store = ChunkStore(str(tmp_path), **SIZES)
+        data = random_bytes(200_000)
+        store.put('a', data)
+        store.put('b', data + random_bytes(50_000, seed=2))
+
+        store.delete('b')
+        removed, _ = store.sweep()
+
+        assert removed >= 1
+        assert store.read('a') == data
+        assert not store.has('b')
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from cluster import HashRing, SingleFlight
+
+NODES = [f'http://node{i}:9909' for i in range(4)]
+KEYS = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(2000)]
+
+
+class TestHashRing:
+
+    def test_owners_are_distinct_and_deterministic(self):
+        ring = HashRing(NODES)
+
+        for key in KEYS[:100]:
+            owners = ring.owners(key, 2)
+            assert len(set(owners)) == 2
+            assert owners == HashRing(list(reversed(NODES))).owners(key, 2)
+
+    def test_count_capped_at_node_count(self):
+        assert sorted(HashRing(NODES).owners(KEYS[0], 10)) == sorted(NODES)
+        assert HashRing([]).owners(KEYS[0], 2) == []
+
+    def test_load_spread_across_nodes(self):
+        primaries = Counter(HashRing(NODES).owners(key, 1)[0] for key in KEYS)
+
+        assert set(primaries) == set(NODES)
+        assert min(primaries.values()) > len(KEYS) / len(NODES) / 2
+
+    def test_adding_a_node_moves_only_its_share(self):
+        """Test keys only move to the new node, and only about 1/N of them."""
+        before = HashRing(NODES)
+        after = HashRing(NODES + ['http://node4:9909'])
+
+        moved = [key for key in KEYS if before.owners(key, 1) != after.owners(key, 1)]
+
+        assert all(after.owners(key, 1) == ['http://node4:9909'] for key in moved)
+        assert len(moved) < len(KEYS) * 0.35
+
+    def test_removing_a_node_keeps_surviving_replicas(self):
+        before = HashRing(NODES)
+        after = HashRing(NODES[1:])
+
+        for key in KEYS[:200]:
+            survivors = [node for node in before.owners(key, 2) if node != NODES[0]]
+            assert after.owners(key, 2)[:len(survivors)] == survivors
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'data'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('k', slow)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do('k', slow))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        assert calls == [1]
+        assert results == ['data'] * 4
+
+    def test_error_reaches_caller_and_is_not_cached(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise IOError('peer down')
+
+        with pytest.raises(IOError):
+            flight.do('k', fail)
+
+        assert flight.do('k', lambda: 'ok') == 'ok'
@@ -0,0 +1,110 @@
+import json
+import random
+import struct
+
+import pytest
+
+import delta_sync
+from delta_sync import DeltaError, apply_delta, block_signatures, parse_delta_body, strong_checksum, weak_checksum
+
+BLOCK = 1024
+
+
+def random_bytes(size, seed=1):
+    return random.Random(seed).randbytes(size)
+
+
+def read_signatures(signature):
+    """Decode a signature into (block_size, file_size, [(weak, strong), ...])."""
+    assert signature[:4] == delta_sync.SIGNATURE_MAGIC
+    block_size, file_size, block_count = struct.unpack_from('<IQI', signature, 4)
+    entry = 4 + delta_sync.STRONG_DIGEST_SIZE
+    offset = 20
+    blocks = []
+    for _ in range(block_count):
+        (weak,) = struct.unpack_from('<I', signature, offset)
+        blocks.append((weak, signature[offset + 4:offset + entry]))
+        offset += entry
+    assert offset == len(signature)
+    return block_size, file_size, blocks
+
+
+def make_delta_body(recipe, literal):
+    encoded = json.dumps(recipe).encode()
+    return struct.pack('<I', len(encoded)) + encoded + literal
+
+
+class TestSignatures:
+
+    def test_signature_matches_per_block_checksums(self):
+        """Test each full block gets its weak and strong checksum and the tail is skipped."""
+        data = random_bytes(BLOCK * 5 + 100)
+
+        block_size, file_size, blocks = read_signatures(block_signatures(data, BLOCK))
+
+        assert (block_size, file_size, len(blocks)) == (BLOCK, len(data), 5)
+        for i, (weak, strong) in enumerate(blocks):
+            block = data[i * BLOCK:(i + 1) * BLOCK]
+            assert weak == weak_checksum(block)
+            assert strong == strong_checksum(block)
+
+    def test_numpy_and_python_paths_agree(self, monkeypatch):
+        data = random_bytes(BLOCK * 8)
+        expected = block_signatures(data, BLOCK)
+
+        monkeypatch.setattr(delta_sync, 'NUMPY_AVAILABLE', False)
+
+        assert block_signatures(data, BLOCK) == expected
+
+
+class TestApplyDelta:
+
+    def test_round_trip_with_edited_block(self):
+        """Test a file is rebuilt from unchanged base blocks plus the edited range."""
+        base = random_bytes(BLOCK * 6)
+        patch = random_bytes(BLOCK + 37, seed=2)
+        new = base[:BLOCK * 2] + patch + base[BLOCK * 3:]
+        recipe = {'block_size': BLOCK, 'ops': [['c', 0, 2], ['d', 0, len(patch)], ['c', 3, 3]]}
+
+        parsed_recipe, literal = parse_delta_body(make_delta_body(recipe, patch))
+
+        assert parsed_recipe == recipe
+        assert apply_delta(base, parsed_recipe, literal) == new
+
+    def test_copy_beyond_base_rejected(self):
+        with pytest.raises(DeltaError):
+            apply_delta(random_bytes(BLOCK * 2), {'block_size': BLOCK, 'ops': [['c', 1, 2]]}, b'')
+
+    def test_data_beyond_literal_rejected(self):
+        with pytest.raises(DeltaError):
+            apply_delta(b'', {'block_size': BLOCK, 'ops': [['d', 0, 10]]}, b'short')
+
+    @pytest.mark.parametrize('recipe', [
+        {'block_size': 100, 'ops': []},
+        {'block_size': '1024', 'ops': []},
+        {'block_size': BLOCK, 'ops': [['x', 0, 1]]},
+        {'block_size': BLOCK, 'ops': [['c', -1, 1]]},
+        {'block_size': BLOCK, 'ops': [['c', 0]]},
+    ])
+    def test_malformed_recipe_rejected(self, recipe):
+        with pytest.raises(DeltaError):
+            apply_delta(random_bytes(BLOCK * 2), recipe, b'')
+
+    def test_size_limit_enforced(self):
+        base = random_bytes(BLOCK * 4)
+
+        with pytest.raises(DeltaError):
+            apply_delta(base, {'block_size': BLOCK, 'ops': [['c', 0, 4]]}, b'', max_size=BLOCK * 3)
+
+
+class TestParseDeltaBody:
+
+    @pytest.mark.parametrize('body', [
+        b'\x01\x00',
+        struct.pack('<I', 100) + b'{}',
+        struct.pack('<I', 5) + b'{nope',
+        struct.pack('<I', 2) + b'\xff\xfe',
+    ])
+    def test_malformed_body_rejected(self, body):
+        with pytest.raises(DeltaError):
+            parse_delta_body(body)
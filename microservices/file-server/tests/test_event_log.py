@@ -0,0 +1,28 @@
+import threading
+
+from event_log import EventLog
+
+
+def test_subscriber_sees_new_events(tmp_path):
+    log = EventLog(str(tmp_path / 'events.db'))
+    events = log.subscribe(last_id=0, heartbeat=5)
+    log.publish('upload', 'a' * 64, data={'size': 1})
+
+    event = next(events)
+    events.close()
+
+    assert (event['kind'], event['hash'], event['size']) == ('upload', 'a' * 64, 1)
+
+
+def test_close_ends_waiting_subscription(tmp_path):
+    """Test close() wakes a subscriber blocked between heartbeats and ends its stream."""
+    log = EventLog(str(tmp_path / 'events.db'))
+    received = []
+    subscriber = threading.Thread(target=lambda: received.extend(log.subscribe(heartbeat=60)))
+    subscriber.start()
+
+    log.close()
+    subscriber.join(timeout=5)
+
+    assert not subscriber.is_alive()
+    assert received == []
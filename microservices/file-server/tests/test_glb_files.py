@@ -0,0 +1,76 @@
+import hashlib
+
+import pytest
+
+from chunk_store import ChunkStore
+from glb_files import VARIANT_OPTIMIZED, VARIANT_ORIGINAL, collect_glb_hashes, hash_from_url, open_glb
+from storage import MemoryBlobStore
+
+HASH_A = hashlib.sha256(b'a').hexdigest()
+HASH_B = hashlib.sha256(b'b').hexdigest()
+
+
+def gltf_entity(url):
+    return {'type': 'BanterGLTF', 'properties': {'url': url}}
+
+
+def read_found(found):
+    variant, size, blocks = found
+    return variant, size, b''.join(blocks)
+
+
+class TestHashFromUrl:
+
+    @pytest.mark.parametrize('url', [
+        HASH_A,
+        f'https://example.com/api/fetch_glb?file={HASH_A}&variant=original',
+        f'https://example.com/assets/glbs/{HASH_A}.glb',
+    ])
+    def test_hash_extracted(self, url):
+        assert hash_from_url(url) == HASH_A
+
+    @pytest.mark.parametrize('url', [None, 42, '', 'https://example.com/model.glb', HASH_A.upper(), f'?file={HASH_A[:-1]}'])
+    def test_non_hash_urls_ignored(self, url):
+        assert hash_from_url(url) is None
+
+
+class TestCollectGlbHashes:
+
+    def test_nested_scene_in_order_without_duplicates(self):
+        scene = {
+            'entities': [
+                {'components': [gltf_entity(HASH_B), {'type': 'BanterMaterial', 'properties': {'url': HASH_A}}]},
+                {'children': [{'components': [gltf_entity(f'/api/fetch_glb?file={HASH_A}'), gltf_entity(HASH_B)]}]},
+            ],
+        }
+
+        assert collect_glb_hashes(scene) == [HASH_B, HASH_A]
+
+    def test_other_components_and_bad_urls_ignored(self):
+        scene = [gltf_entity('https://example.com/model.glb'), {'type': 'BanterGLTF', 'properties': None}, 'text']
+
+        assert collect_glb_hashes(scene) == []
+
+
+class TestOpenGlb:
+
+    def test_optimized_variant_preferred(self):
+        store = MemoryBlobStore()
+        store.put(f'{HASH_A}.glb', b'original')
+        store.put(f'{HASH_A}.optimized.glb', b'optimized')
+
+        assert read_found(open_glb(store, HASH_A)) == (VARIANT_OPTIMIZED, 9, b'optimized')
+        assert read_found(open_glb(store, HASH_A, prefer_optimized=False)) == (VARIANT_ORIGINAL, 8, b'original')
+
+    def test_falls_back_to_chunk_store(self, tmp_path):
+        data = bytes(range(256)) * 100
+        chunks = ChunkStore(str(tmp_path), min_size=2048, avg_size=8192, max_size=32768)
+        chunks.put(HASH_A, data)
+
+        assert read_found(open_glb(MemoryBlobStore(), HASH_A, chunks)) == (VARIANT_ORIGINAL, len(data), data)
+
+    def test_missing_glb(self, tmp_path):
+        chunks = ChunkStore(str(tmp_path))
+
+        assert open_glb(MemoryBlobStore(), HASH_B, chunks) is None
+        assert open_glb(MemoryBlobStore(), HASH_B) is None
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import time
+
+import pytest
+
+import glb_gc
+from asset_index import AssetIndex
+from storage import LocalBlobStore
+
+DAY = 24 * 3600
+
+
+def file_hash(name):
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+@pytest.fixture
+def assets(tmp_path):
+    """A store with GLBs a, b and c (100 bytes each, fetched in that order) and an empty inventory."""
+    store = LocalBlobStore(str(tmp_path / 'glbs'))
+    now = time.time()
+    for age, name in enumerate('cba'):
+        key = f'{file_hash(name)}.glb'
+        store.put(key, bytes(100))
+        stamp = now - (10 + age) * DAY
+        os.utime(os.path.join(store.root, key), (stamp, stamp))
+    inventory = tmp_path / 'inventory'
+    inventory.mkdir()
+    return store, AssetIndex(str(tmp_path / 'index.db')), str(inventory)
+
+
+def evicted(report):
+    return [candidate['hash'] for candidate in report['evict']]
+
+
+class TestPlan:
+
+    def test_no_quota_evicts_nothing(self, assets):
+        store, index, inventory = assets
+
+        report = glb_gc.plan(store, index, reference_dirs=[inventory])
+
+        assert report['unreferenced'] == 3
+        assert report['unreferenced_bytes'] == 300
+        assert report['evict'] == []
+        assert not report['over_quota_after']
+
+    def test_quota_evicts_least_recently_used_first(self, assets):
+        store, index, inventory = assets
+
+        report = glb_gc.plan(store, index, reference_dirs=[inventory], quota_bytes=150)
+
+        assert evicted(report) == [file_hash('a'), file_hash('b')]
+        assert report['evict_bytes'] == 200
+
+    def test_referenced_and_pinned_kept(self, assets, tmp_path):
+        store, index, inventory = assets
+        scene = {'components': [{'type': 'BanterGLTF', 'properties': {'url': f"/api/fetch_glb?file={file_hash('a')}"}}]}
+        (tmp_path / 'inventory' / 'item.json').write_text(json.dumps(scene))
+        index.record_upload(file_hash('b'), 100, username='alice')
+
+        report = glb_gc.plan(store, index, reference_dirs=[inventory], quota_bytes=1, now=time.time() + 30 * DAY)
+
+        assert report['kept'] == {'referenced': 1, 'pinned': 1, 'grace': 0}
+        assert evicted(report) == [file_hash('c')]
+        assert report['over_quota_after']
+
+    def test_grace_period_kept(self, assets):
+        store, index, inventory = assets
+
+        report = glb_gc.plan(store, index, reference_dirs=[inventory], quota_bytes=1, grace_seconds=30 * DAY)
+
+        assert report['kept']['grace'] == 3
+        assert report['evict'] == []
+
+    def test_missing_reference_dir_aborts(self, assets, tmp_path):
+        store, index, _ = assets
+
+        with pytest.raises(FileNotFoundError):
+            glb_gc.plan(store, index, reference_dirs=[str(tmp_path / 'not-mounted')], quota_bytes=1)
+
+
+def test_run_gc_applies_plan(assets, tmp_path):
+    store, _, inventory = assets
+
+    report = glb_gc.run_gc(str(tmp_path), quota_mb=150 / (1024 * 1024), reference_dirs=[inventory], dry_run=False)
+
+    assert report['result']['evicted'] == 2
+    assert [key for key, _, _ in store.list()] == [f"{file_hash('c')}.glb"]
+
+
+def test_run_gc_rejects_memory_storage(tmp_path):
+    with pytest.raises(ValueError):
+        glb_gc.run_gc(str(tmp_path), storage_spec='memory:', reference_dirs=[str(tmp_path)])
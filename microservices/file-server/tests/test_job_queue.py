@@ -0,0 +1,102 @@
+import json
+import os
+import struct
+import time
+
+import pytest
+
+from job_queue import JobQueue, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED, connect
+from storage import LocalBlobStore
+
+
+def make_glb(gltf):
+    """A GLB with only a JSON chunk."""
+    chunk = json.dumps(gltf).encode()
+    chunk += b' ' * (-len(chunk) % 4)
+    return struct.pack('<III', 0x46546C67, 2, 20 + len(chunk)) + struct.pack('<II', len(chunk), 0x4E4F534A) + chunk
+
+
+@pytest.fixture
+def glb_store(tmp_path):
+    return LocalBlobStore(str(tmp_path / 'glbs'))
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), workers=1, poll_interval=0.05, retry_backoff=0.01)
+    yield queue
+    queue.stop()
+
+
+def payload(store, file_hash):
+    return {'assets_dir': store.root, 'storage': store.spec, 'hash': file_hash}
+
+
+def wait_finished(queue, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] not in (STATUS_QUEUED, STATUS_RUNNING):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'Job {job_id} still {job["status"]} after {timeout}s')
+
+
+class TestJobQueue:
+
+    def test_claim_is_exclusive(self, tmp_path):
+        """Test two dispatchers on one database never claim the same job."""
+        first = JobQueue(str(tmp_path / 'jobs.db'))
+        second = JobQueue(str(tmp_path / 'jobs.db'))
+        job_id = first.enqueue('validate_glb', {})
+
+        claims = [first._claim(connect(first.db_path)), second._claim(connect(second.db_path))]
+
+        assert [row['id'] for row in claims if row] == [job_id]
+        assert first.get(job_id)['status'] == STATUS_RUNNING
+        assert first.get(job_id)['attempts'] == 1
+
+    def test_job_succeeds(self, queue, glb_store):
+        """Test a task's result is stored and reported to on_finish."""
+        finished = []
+        queue.on_finish = lambda *args: finished.append(args)
+        glb_store.put('good.glb', make_glb({'asset': {'version': '2.0', 'generator': 'test'}, 'meshes': [{}]}))
+        queue.start()
+
+        job = wait_finished(queue, queue.enqueue('validate_glb', payload(glb_store, 'good'), 'good'))
+
+        assert job['status'] == STATUS_SUCCEEDED
+        assert job['result']['generator'] == 'test'
+        assert finished[0][:3] == ('validate_glb', 'good', STATUS_SUCCEEDED)
+
+    def test_transient_failure_is_retried(self, queue, glb_store):
+        """Test an error that may go away is retried up to max_attempts."""
+        queue.start()
+
+        # The GLB is not there (e.g. a replica still arriving)
+        job = wait_finished(queue, queue.enqueue('validate_glb', payload(glb_store, 'missing'), 'missing', max_attempts=2))
+
+        assert job['status'] == STATUS_FAILED
+        assert job['attempts'] == 2
+
+    def test_malformed_glb_fails_without_retries(self, queue, glb_store):
+        """Test a deterministic task failure is not run again."""
+        glb_store.put('bad.glb', b'not a GLB at all, but long enough')
+        queue.start()
+
+        job = wait_finished(queue, queue.enqueue('validate_glb', payload(glb_store, 'bad'), 'bad', max_attempts=3))
+
+        assert job['status'] == STATUS_FAILED
+        assert job['attempts'] == 1
+        assert 'bad magic' in job['error']
+
+    def test_broken_pool_is_replaced_once(self, tmp_path):
+        """Test every caller noticing one broken pool gets the same replacement."""
+        queue = JobQueue(str(tmp_path / 'jobs.db'))
+        broken = queue._pool = queue._new_pool()
+
+        replacement = queue._replace_pool(broken)
+
+        assert replacement is not broken
+        assert queue._replace_pool(broken) is replacement
+        replacement.shutdown()
@@ -0,0 +1,111 @@
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import mesh_optimizer
+from mesh_optimizer import build_glb, optimize_glb, parse_glb
+
+# Two quads sharing nothing, so Tipsify has something to reorder
+POSITIONS = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (2, 0, 0), (3, 0, 0), (3, 1, 0), (2, 1, 0)]
+INDICES = [0, 1, 2, 0, 2, 3, 4, 5, 6, 4, 6, 7]
+
+
+def make_glb(material, attributes=('TEXCOORD_0', 'TEXCOORD_1')):
+    """A GLB with one indexed primitive: POSITION, the given extra VEC2 attributes and material."""
+    chunks, views, accessors = [], [], []
+
+    def add(data, count, component_type, accessor_type, target, **extra):
+        views.append({'buffer': 0, 'byteOffset': sum(len(c) for c in chunks), 'byteLength': len(data), 'target': target})
+        chunks.append(data + b'\0' * (-len(data) % 4))
+        accessors.append(dict({'bufferView': len(views) - 1, 'componentType': component_type,
+                               'count': count, 'type': accessor_type}, **extra))
+        return len(accessors) - 1
+
+    primitive_attributes = {'POSITION': add(
+        b''.join(struct.pack('<3f', *p) for p in POSITIONS), len(POSITIONS), 5126, 'VEC3', 34962,
+        min=[0, 0, 0], max=[3, 1, 0]
+    )}
+    for set_index, name in enumerate(attributes):
+        uvs = b''.join(struct.pack('<2f', x + set_index, y) for x, y, _ in POSITIONS)
+        primitive_attributes[name] = add(uvs, len(POSITIONS), 5126, 'VEC2', 34962)
+    indices = add(struct.pack(f'<{len(INDICES)}H', *INDICES), len(INDICES), 5123, 'SCALAR', 34963)
+
+    gltf = {
+        'asset': {'version': '2.0'},
+        'buffers': [{'byteLength': sum(len(c) for c in chunks)}],
+        'bufferViews': views,
+        'accessors': accessors,
+        'materials': [material],
+        'meshes': [{'primitives': [{'attributes': primitive_attributes, 'indices': indices, 'material': 0}]}],
+        'nodes': [{'mesh': 0}],
+        'scenes': [{'nodes': [0]}],
+    }
+    return build_glb(gltf, b''.join(chunks))
+
+
+def read_triangles(data):
+    """Triangles of the first primitive as sets of vertex positions, to compare across reorderings."""
+    gltf, bin_chunk = parse_glb(data)
+    primitive = gltf['meshes'][0]['primitives'][0]
+    positions = mesh_optimizer._typed(
+        mesh_optimizer._read_accessor_bytes(gltf, bin_chunk, primitive['attributes']['POSITION']),
+        gltf['accessors'][primitive['attributes']['POSITION']]
+    )
+    indices = mesh_optimizer._read_indices(gltf, bin_chunk, primitive['indices'])
+    return sorted(tuple(sorted(tuple(positions[i]) for i in indices[t:t + 3])) for t in range(0, len(indices), 3))
+
+
+def texture(tex_coord):
+    return {'index': 0, 'texCoord': tex_coord}
+
+
+class TestMeshOptimizer:
+
+    def test_triangles_survive_reordering(self):
+        """Test optimization keeps every triangle, only in a different order."""
+        data = make_glb({'pbrMetallicRoughness': {'baseColorTexture': texture(0)}})
+
+        optimized, report = optimize_glb(data)
+
+        assert report['optimized']
+        assert read_triangles(optimized) == read_triangles(data)
+
+    def test_trailing_unused_texcoord_is_dropped(self):
+        """Test a set above the highest one the material reads is dropped."""
+        data = make_glb({'pbrMetallicRoughness': {'baseColorTexture': texture(0)}})
+
+        optimized, report = optimize_glb(data)
+
+        gltf, _ = parse_glb(optimized)
+        assert set(gltf['meshes'][0]['primitives'][0]['attributes']) == {'POSITION', 'TEXCOORD_0'}
+        assert report['primitives'][0]['dropped_attributes'] == ['TEXCOORD_1']
+
+    def test_texcoord_sets_stay_consecutive(self):
+        """Test an unused TEXCOORD_0 is kept when the material reads TEXCOORD_1."""
+        data = make_glb({'pbrMetallicRoughness': {'baseColorTexture': texture(1)}})
+
+        optimized, report = optimize_glb(data)
+
+        gltf, _ = parse_glb(optimized)
+        assert set(gltf['meshes'][0]['primitives'][0]['attributes']) == {'POSITION', 'TEXCOORD_0', 'TEXCOORD_1'}
+        assert report['primitives'][0]['dropped_attributes'] == []
+
+    def test_texture_transform_texcoord_counts_as_used(self):
+        """Test KHR_texture_transform's texCoord override keeps its set."""
+        info = dict(texture(0), extensions={'KHR_texture_transform': {'texCoord': 1}})
+        data = make_glb({'emissiveTexture': info})
+
+        optimized, _ = optimize_glb(data)
+
+        gltf, _ = parse_glb(optimized)
+        assert 'TEXCOORD_1' in gltf['meshes'][0]['primitives'][0]['attributes']
+
+    def test_fifo_cache_metrics(self):
+        """Test a strip-like index order misses the cache once per vertex."""
+        indices = np.array(INDICES)
+
+        metrics = mesh_optimizer.cache_metrics(indices, cache_size=16)
+
+        assert metrics['acmr'] == pytest.approx(len(POSITIONS) / (len(INDICES) // 3))
+        assert metrics['atvr'] == pytest.approx(1.0)
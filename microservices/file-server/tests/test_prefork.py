@@ -0,0 +1,76 @@
+import os
+import signal
+import time
+
+import pytest
+
+import prefork
+from prefork import PreforkServer
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='prefork needs fork()')
+
+
+def spawn_stubborn_child():
+    """Fork a child that ignores SIGTERM, like a worker held open by a long request."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        os.write(write_fd, b'.')
+        while True:
+            time.sleep(1)
+    os.close(write_fd)
+    os.read(read_fd, 1)
+    return pid, read_fd
+
+
+def add_worker(server, pid, fd, **state):
+    server.workers[pid] = dict({'index': 0, 'fd': fd, 'last_beat': time.time(), 'retiring': False, 'retire_at': None}, **state)
+
+
+def exited(pid, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_retiring_worker_killed_after_deadline():
+    server = PreforkServer(('127.0.0.1', 0), None)
+    pid, fd = spawn_stubborn_child()
+    add_worker(server, pid, fd, retiring=True, retire_at=time.time() - 1)
+
+    server._check_timeouts()
+
+    assert exited(pid)
+    assert server.workers[pid]['retire_at'] is None
+    os.close(fd)
+
+
+def test_retiring_worker_left_alone_before_deadline():
+    server = PreforkServer(('127.0.0.1', 0), None)
+    pid, fd = spawn_stubborn_child()
+    add_worker(server, pid, fd, retiring=True, retire_at=time.time() + prefork.GRACEFUL_TIMEOUT)
+    try:
+        server._check_timeouts()
+
+        assert not exited(pid, timeout=0.3)
+    finally:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        os.close(fd)
+
+
+def test_reload_sets_retire_deadline(monkeypatch):
+    server = PreforkServer(('127.0.0.1', 0), None)
+    add_worker(server, 101, -1)
+    monkeypatch.setattr(server, '_spawn', lambda index: None)
+    monkeypatch.setattr(server, '_signal_worker', lambda pid, sig: None)
+
+    before = time.time()
+    server._reload()
+
+    assert server.workers[101]['retiring']
+    assert server.workers[101]['retire_at'] >= before + prefork.GRACEFUL_TIMEOUT
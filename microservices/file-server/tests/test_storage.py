@@ -0,0 +1,55 @@
+import pytest
+
+import storage
+from storage import LocalBlobStore, MemoryBlobStore
+
+
+@pytest.fixture(params=['local', 'memory'])
+def store(request, tmp_path):
+    if request.param == 'local':
+        return LocalBlobStore(str(tmp_path / 'glbs'))
+    return MemoryBlobStore()
+
+
+def test_put_stream_delete(store):
+    data = bytes(range(256)) * 10
+
+    store.put('a.glb', data)
+
+    assert store.exists('a.glb')
+    assert store.size('a.glb') == len(data)
+    assert b''.join(store.stream('a.glb', block_size=100)) == data
+    assert [(key, size) for key, size, _ in store.list()] == [('a.glb', len(data))]
+    assert store.delete('a.glb')
+    assert not store.delete('a.glb')
+
+
+def test_missing_key_raises(store):
+    with pytest.raises(FileNotFoundError):
+        store.read('missing.glb')
+    assert not store.exists('missing.glb')
+
+
+def test_local_keys_cannot_escape_root(tmp_path):
+    store = LocalBlobStore(str(tmp_path / 'glbs'))
+
+    with pytest.raises(FileNotFoundError):
+        store.put('../outside.glb', b'x')
+    assert not store.exists('.hidden')
+
+
+class TestOpenStore:
+
+    def test_specs(self, tmp_path):
+        assert storage.open_store('local', str(tmp_path / 'a')).spec == f"local:{tmp_path / 'a'}"
+        assert storage.open_store(None, str(tmp_path / 'a')).spec == f"local:{tmp_path / 'a'}"
+        assert storage.open_store(f"local:{tmp_path / 'b'}").spec == f"local:{tmp_path / 'b'}"
+        assert isinstance(storage.open_store('memory'), MemoryBlobStore)
+
+    def test_local_without_root_rejected(self):
+        with pytest.raises(ValueError):
+            storage.open_store('local')
+
+    def test_unknown_spec_rejected(self):
+        with pytest.raises(ValueError):
+            storage.open_store('ftp://glbs')
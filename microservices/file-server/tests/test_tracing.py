@@ -0,0 +1,121 @@
+import contextvars
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import tracing
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+@pytest.fixture
+def span_log(tmp_path):
+    """Export spans to a JSON-lines file for the duration of a test."""
+    path = tmp_path / 'spans.jsonl'
+    tracing.configure('file-server', log_path=str(path))
+    yield path
+    tracing.configure('file-server')
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestTraceparent:
+
+    def test_parse_headers(self):
+        assert tracing.parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-01') == (TRACE_ID, PARENT_ID, True)
+        assert tracing.parse_traceparent(f' 00-{TRACE_ID.upper()}-{PARENT_ID}-00 ') == (TRACE_ID, PARENT_ID, False)
+        assert tracing.parse_traceparent(None) is None
+        assert tracing.parse_traceparent('garbage') is None
+        assert tracing.parse_traceparent(f'00-{"0" * 32}-{PARENT_ID}-01') is None
+        assert tracing.parse_traceparent(f'00-{TRACE_ID}-{"0" * 16}-01') is None
+
+    def test_proxy_passes_its_own_span_downstream(self, span_log):
+        """Test the header sent upstream names the proxy's client span in the caller's trace."""
+        with tracing.start_span('POST /api/process-text', f'00-{TRACE_ID}-{PARENT_ID}-01', kind=tracing.KIND_SERVER):
+            with tracing.start_span('proxy process-text', kind=tracing.KIND_CLIENT) as client:
+                assert tracing.current_traceparent() == f'00-{TRACE_ID}-{client.span_id}-01'
+
+        spans = {span['name']: span for span in read_spans(span_log)}
+        server = spans['POST /api/process-text']
+        assert (server['trace_id'], server['parent_id'], server['service']) == (TRACE_ID, PARENT_ID, 'file-server')
+        assert spans['proxy process-text']['parent_id'] == server['span_id']
+        assert tracing.current_span() is None
+
+    def test_begin_and_finish_across_contexts(self, span_log):
+        """Test finish_span copes with a token from another context, as in streamed responses."""
+        span, token = contextvars.copy_context().run(tracing.begin_span, 'stream', f'00-{TRACE_ID}-{PARENT_ID}-01')
+
+        tracing.finish_span(span, token)
+
+        assert read_spans(span_log)[0]['name'] == 'stream'
+        assert tracing.current_span() is None
+
+
+class TestSampling:
+
+    def test_unsampled_parent_not_exported(self, span_log):
+        with tracing.start_span('root', f'00-{TRACE_ID}-{PARENT_ID}-00'):
+            pass
+
+        assert not span_log.exists()
+
+    def test_new_traces_follow_sample_ratio(self):
+        tracing.configure('file-server', sample_ratio=0.0)
+        try:
+            with tracing.start_span('root') as span:
+                assert span.traceparent.endswith('-00')
+        finally:
+            tracing.configure('file-server')
+        with tracing.start_span('root') as span:
+            assert span.traceparent.endswith('-01')
+
+
+def test_exception_recorded(span_log):
+    with pytest.raises(ValueError):
+        with tracing.start_span('failing'):
+            raise ValueError('boom')
+
+    span = read_spans(span_log)[0]
+    assert span['status'] == tracing.STATUS_ERROR
+    assert span['attributes']['exception.type'] == 'ValueError'
+
+
+def test_otlp_export():
+    """Test spans are batched to an OTLP/HTTP collector with typed attributes."""
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    collector = HTTPServer(('127.0.0.1', 0), Collector)
+    threading.Thread(target=collector.handle_request, daemon=True).start()
+    exporter = tracing.SpanExporter('file-server', otlp_endpoint=f'http://127.0.0.1:{collector.server_port}/v1/traces',
+                                    flush_interval=0.05)
+    span = tracing.Span('upload', TRACE_ID, PARENT_ID, attributes={'bytes': 5, 'ok': True, 'ratio': 0.5, 'name': 'a'})
+    span.end_ns = span.start_ns + 1000
+    exporter.export(span)
+
+    deadline = time.monotonic() + 5
+    while not received and time.monotonic() < deadline:
+        time.sleep(0.05)
+    collector.server_close()
+
+    resource = received[0]['resourceSpans'][0]
+    assert resource['resource']['attributes'][0]['value'] == {'stringValue': 'file-server'}
+    encoded = resource['scopeSpans'][0]['spans'][0]
+    assert (encoded['traceId'], encoded['parentSpanId'], encoded['name']) == (TRACE_ID, PARENT_ID, 'upload')
+    assert {a['key']: a['value'] for a in encoded['attributes']} == {
+        'bytes': {'intValue': '5'}, 'ok': {'boolValue': True}, 'ratio': {'doubleValue': 0.5}, 'name': {'stringValue': 'a'}
+    }
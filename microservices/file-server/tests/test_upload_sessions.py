@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import random
+import time
+
+import pytest
+
+from upload_sessions import MIN_CHUNK_SIZE, ChecksumMismatch, UploadError, UploadSessionStore
+
+CHUNK = MIN_CHUNK_SIZE
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunks_of(data):
+    return [data[i:i + CHUNK] for i in range(0, len(data), CHUNK)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadSessionStore(str(tmp_path / 'uploads'), max_size=10 * CHUNK)
+
+
+@pytest.fixture
+def data():
+    return random.Random(1).randbytes(CHUNK * 2 + 500)
+
+
+class TestCreate:
+
+    @pytest.mark.parametrize('kwargs', [
+        {'size': 0},
+        {'size': 11 * CHUNK},
+        {'size': '100'},
+        {'sha256': 'abc'},
+        {'chunk_size': CHUNK - 1},
+    ])
+    def test_invalid_parameters_rejected(self, store, kwargs):
+        args = {'size': 100, 'sha256': '0' * 64, 'chunk_size': CHUNK, **kwargs}
+
+        with pytest.raises(UploadError):
+            store.create(**args)
+
+    def test_new_session_has_everything_missing(self, store, data):
+        status = store.create(len(data), sha256(data), CHUNK)
+
+        assert status['chunk_count'] == 3
+        assert status['missing'] == [0, 1, 2]
+        assert status['offset'] == 0
+        assert not status['complete']
+
+    def test_unknown_session_id_is_not_a_path(self, store):
+        with pytest.raises(FileNotFoundError):
+            store.status('../../etc')
+
+
+class TestChunks:
+
+    def test_out_of_order_chunks_assemble(self, store, data):
+        """Test chunks arrive in any order, offset tracks the contiguous prefix and the file reassembles."""
+        session_id = store.create(len(data), sha256(data), CHUNK, metadata={'name': 'a.glb'})['id']
+        parts = chunks_of(data)
+
+        status = store.put_chunk(session_id, 2, parts[2], sha256(parts[2]))
+        assert status['offset'] == 0
+        status = store.put_chunk(session_id, 0, parts[0], sha256(parts[0]))
+        assert status['offset'] == CHUNK
+        assert status['missing'] == [1]
+        with pytest.raises(UploadError):
+            store.assemble(session_id)
+
+        status = store.put_chunk(session_id, 1, parts[1], sha256(parts[1]))
+
+        assert status['complete']
+        assert status['offset'] == len(data)
+        assert store.assemble(session_id) == (data, {'name': 'a.glb'})
+
+    def test_chunk_checksum_mismatch_not_stored(self, store, data):
+        session_id = store.create(len(data), sha256(data), CHUNK)['id']
+        first = chunks_of(data)[0]
+
+        with pytest.raises(ChecksumMismatch):
+            store.put_chunk(session_id, 0, first, sha256(b'other'))
+
+        assert store.status(session_id)['received'] == []
+
+    @pytest.mark.parametrize('index, length', [(3, 500), (-1, CHUNK), (0, CHUNK - 1), (2, CHUNK)])
+    def test_bad_index_or_length_rejected(self, store, data, index, length):
+        session_id = store.create(len(data), sha256(data), CHUNK)['id']
+        chunk = bytes(length)
+
+        with pytest.raises(UploadError):
+            store.put_chunk(session_id, index, chunk, sha256(chunk))
+
+    def test_assembled_checksum_mismatch(self, store, data):
+        session_id = store.create(len(data), sha256(b'something else'), CHUNK)['id']
+        for index, part in enumerate(chunks_of(data)):
+            store.put_chunk(session_id, index, part, sha256(part))
+
+        with pytest.raises(ChecksumMismatch):
+            store.assemble(session_id)
+
+
+class TestExpire:
+
+    def test_expire_removes_only_old_sessions(self, tmp_path, data):
+        store = UploadSessionStore(str(tmp_path / 'uploads'), max_size=10 * CHUNK, ttl=60)
+        old_id = store.create(len(data), sha256(data), CHUNK)['id']
+        new_id = store.create(len(data), sha256(data), CHUNK)['id']
+        # Backdate the first session past the TTL
+        session_path = os.path.join(store.root, old_id, 'session.json')
+        session = store._load(old_id)
+        session['created_at'] = time.time() - 120
+        with open(session_path, 'w') as f:
+            json.dump(session, f)
+
+        assert store.expire() == 1
+        assert not os.path.exists(os.path.join(store.root, old_id))
+        assert store.status(new_id)['id'] == new_id
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Resumable chunked uploads for large GLBs.
+
+A client creates a session with the final size and SHA-256, PUTs numbered
+chunks (each with its own SHA-256) in any order and as often as it likes,
+asks the session which chunks are still missing after a dropped connection,
+and finalizes once everything has arrived. Each chunk is written atomically
+to its own file under <root>/<session_id>/, so a half-received chunk never
+counts as received and a crashed server keeps everything it acknowledged.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+from fsutil import write_file_atomic
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+SESSION_TTL = 24 * 60 * 60
+
+
+class UploadError(ValueError):
+    """Raised for invalid session parameters or chunks."""
+
+
+class ChecksumMismatch(UploadError):
+    """Raised when a chunk or the assembled file doesn't match its SHA-256."""
+
+
+class UploadSessionStore:
+    def __init__(self, root, max_size, ttl=SESSION_TTL):
+        self.root = root
+        self.max_size = max_size
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+
+    def _session_dir(self, session_id):
+        # Session ids are generated here; anything else could be a path
+        if len(session_id) != 32 or not all(c in '0123456789abcdef' for c in session_id):
+            raise FileNotFoundError(session_id)
+        return os.path.join(self.root, session_id)
+
+    def _chunk_path(self, session_id, index):
+        return os.path.join(self._session_dir(session_id), f'{index}.chunk')
+
+    def _load(self, session_id):
+        with open(os.path.join(self._session_dir(session_id), 'session.json')) as f:
+            return json.load(f)
+
+    def create(self, size, sha256, chunk_size=DEFAULT_CHUNK_SIZE, metadata=None):
+        if not isinstance(size, int) or not 0 < size <= self.max_size:
+            raise UploadError(f'size must be between 1 and {self.max_size} bytes')
+        if not isinstance(sha256, str) or len(sha256) != 64:
+            raise UploadError('sha256 must be a 64 character hex digest')
+        if not isinstance(chunk_size, int) or not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            raise UploadError(f'chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes')
+
+        self.expire()
+
+        session_id = uuid.uuid4().hex
+        session = {
+            'id': session_id,
+            'size': size,
+            'sha256': sha256.lower(),
+            'chunk_size': chunk_size,
+            'chunk_count': (size + chunk_size - 1) // chunk_size,
+            'metadata': metadata or {},
+            'created_at': time.time(),
+        }
+        os.makedirs(self._session_dir(session_id))
+        write_file_atomic(os.path.join(self._session_dir(session_id), 'session.json'), json.dumps(session).encode())
+        return self.status(session_id)
+
+    def _expected_length(self, session, index):
+        if index == session['chunk_count'] - 1:
+            return session['size'] - index * session['chunk_size']
+        return session['chunk_size']
+
+    def put_chunk(self, session_id, index, data, sha256):
+        """Store one chunk after checking its length and checksum."""
+        session = self._load(session_id)
+        if not 0 <= index < session['chunk_count']:
+            raise UploadError(f"Chunk index {index} out of range (0-{session['chunk_count'] - 1})")
+        expected_length = self._expected_length(session, index)
+        if len(data) != expected_length:
+            raise UploadError(f'Chunk {index} must be {expected_length} bytes, got {len(data)}')
+        if hashlib.sha256(data).hexdigest() != (sha256 or '').lower():
+            raise ChecksumMismatch(f'Chunk {index} SHA-256 mismatch')
+
+        write_file_atomic(self._chunk_path(session_id, index), data)
+        return self.status(session_id)
+
+    def status(self, session_id):
+        session = self._load(session_id)
+        received = [i for i in range(session['chunk_count']) if os.path.exists(self._chunk_path(session_id, i))]
+        received_set = set(received)
+
+        # Bytes the client can treat as done if it resumes sequentially
+        contiguous = 0
+        while contiguous in received_set:
+            contiguous += 1
+
+        return {
+            'id': session_id,
+            'size': session['size'],
+            'sha256': session['sha256'],
+            'chunk_size': session['chunk_size'],
+            'chunk_count': session['chunk_count'],
+            'received': received,
+            'missing': [i for i in range(session['chunk_count']) if i not in received_set],
+            'offset': min(contiguous * session['chunk_size'], session['size']),
+            'complete': len(received) == session['chunk_count'],
+        }
+
+    def assemble(self, session_id):
+        """
+        Join all chunks and verify the whole-file SHA-256.
+
+        Returns:
+            tuple: (file bytes, session metadata)
+        """
+        session = self._load(session_id)
+        status = self.status(session_id)
+        if not status['complete']:
+            raise UploadError(f"Upload incomplete, missing chunks: {status['missing']}")
+
+        parts = []
+        for index in range(session['chunk_count']):
+            with open(self._chunk_path(session_id, index), 'rb') as f:
+                parts.append(f.read())
+        data = b''.join(parts)
+
+        if hashlib.sha256(data).hexdigest() != session['sha256']:
+            raise ChecksumMismatch('Assembled file SHA-256 mismatch')
+        return data, session['metadata']
+
+    def delete(self, session_id):
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def expire(self):
+        """Remove sessions older than the TTL. Returns how many were removed."""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for session_id in os.listdir(self.root):
+            try:
+                if self._load(session_id)['created_at'] < cutoff:
+                    self.delete(session_id)
+                    removed += 1
+            except (OSError, ValueError, KeyError):
+                continue
+        return removed
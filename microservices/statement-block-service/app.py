@@ -1,14 +1,23 @@
+import json
 import logging
 import time
 from functools import wraps
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, stream_with_context
 from flask_cors import CORS
 import redis
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 from config import Config
-from utils import validate_request_data, create_error_response, timer_decorator
+from utils import validate_request_data, validate_ingest_data, create_error_response, timer_decorator
+from metrics import metrics
+from result_cache import ResultCache, cache_key
+from block_sessions import BlockSessionStore, SessionConflict, block_texts, diff_blocks
+from ingest import IngestCoordinator, ends_sentence
+from cascade import processor_for
+import semantic_cache as semantic
+import deadline
+import tracing
 
 # Set up logging
 logging.basicConfig(
@@ -17,6 +26,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Export spans if a trace log or collector is configured
+tracing.configure(
+    Config.SERVICE_NAME,
+    log_path=Config.TRACE_LOG_FILE or None,
+    otlp_endpoint=Config.TRACE_OTLP_ENDPOINT or None,
+    sample_ratio=Config.TRACE_SAMPLE_RATIO
+)
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -26,15 +43,63 @@ CORS(app)
 
 # Initialize the appropriate processor based on config
 if Config.MODEL_PROVIDER == 'claude':
-    from claude_processor import ClaudeProcessor
-    text_processor = ClaudeProcessor()
+    text_processor = processor_for('claude')
     logger.info("Using Claude model for text processing")
 elif Config.MODEL_PROVIDER == 'gemini':
-    from gemini_processor import GeminiProcessor
-    text_processor = GeminiProcessor()
+    text_processor = processor_for('gemini')
     logger.info("Using Gemini model for text processing")
+elif Config.MODEL_PROVIDER == 'router':
+    from router import ProviderRouter
+    text_processor = ProviderRouter.from_config()
+    metrics.register_collector(text_processor.collect)
+    logger.info(f"Routing between Claude and Gemini, {text_processor.primary} first")
 else:
     raise ValueError(f"Unknown model provider: {Config.MODEL_PROVIDER}")
+if Config.CASCADE_ENABLED:
+    logger.info("Answering from the fast models first, escalating results that fail the checks")
+
+# Cache results of identical requests in Redis
+result_cache = None
+if Config.RESULT_CACHE_ENABLED:
+    result_cache = ResultCache.from_url(
+        Config.REDIS_URL,
+        ttl=Config.RESULT_CACHE_TTL,
+        max_entries=Config.RESULT_CACHE_MAX_ENTRIES,
+        max_entry_bytes=Config.RESULT_CACHE_MAX_ENTRY_BYTES
+    )
+    if result_cache:
+        metrics.register_collector(result_cache.collect)
+
+# Blocks of clients that send only their new text
+block_sessions = BlockSessionStore.from_url(Config.REDIS_URL, ttl=Config.SESSION_TTL)
+
+# Newest transcript frame of each live recording
+ingest = IngestCoordinator.from_url(Config.REDIS_URL)
+
+# Answer near-duplicates of recent requests by patching their blocks
+semantic_cache = None
+if Config.SEMANTIC_CACHE_ENABLED:
+    if semantic.NUMPY_AVAILABLE:
+        semantic_cache = semantic.SemanticCache(
+            threshold=Config.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=Config.SEMANTIC_CACHE_MAX_ENTRIES,
+            ttl=Config.SEMANTIC_CACHE_TTL
+        )
+    else:
+        logger.warning("numpy is not installed. Semantic cache disabled.")
+
+metrics.describe('statement_requests_total', 'Processed /process-text requests by cache result')
+metrics.describe('statement_request_seconds', 'Latency of /process-text requests by cache result')
+metrics.describe('statement_stream_first_block_seconds', 'Time from request to the first streamed block')
+metrics.describe('statement_stream_seconds', 'Time from request to the end of a streamed response')
+metrics.describe('statement_semantic_cache_lookups_total', 'Near-duplicate lookups: hit, miss or unreconciled match')
+metrics.describe('statement_ingest_frames_total', 'Live transcript frames by outcome: processed, superseded, cancelled or empty')
+
+def cache_bypassed(req):
+    """Clients skip the result cache with Cache-Control: no-cache or X-Cache-Bypass: 1."""
+    cache_control = req.headers.get('Cache-Control', '').lower()
+    return 'no-cache' in cache_control or 'no-store' in cache_control or \
+        req.headers.get('X-Cache-Bypass', '').lower() in ('1', 'true')
 
 # Set up rate limiter
 limiter = None
@@ -88,46 +153,177 @@ def health_check():
             health_status['redis'] = 'disconnected'
             health_status['status'] = 'degraded'
     
+    health_status['result_cache'] = 'enabled' if result_cache else 'disabled'
+    health_status['semantic_cache'] = 'enabled' if semantic_cache is not None else 'disabled'
+    
     return jsonify(health_status), 200 if health_status['status'] == 'healthy' else 503
 
-@app.route('/process-text', methods=['POST'])
-@limiter.limit(f"{Config.RATE_LIMIT_CALLS} per {Config.RATE_LIMIT_PERIOD} seconds")
-@timer_decorator
-def process_text():
-    """Main endpoint to process text into statement blocks."""
+def read_process_request(validate=validate_request_data):
+    """Parse and validate a processing request. Returns (request data, error response)."""
     # Get request data
     try:
         data = request.get_json()
     except Exception:
-        return create_error_response("Invalid JSON in request body", status_code=400)
+        return None, create_error_response("Invalid JSON in request body", status_code=400)
     
     # Validate request data
-    validation_errors = validate_request_data(data)
+    with tracing.start_span('validate') as span:
+        validation_errors = validate(data)
+        span.set_attribute('validation.errors', len(validation_errors))
     if validation_errors:
-        return create_error_response(
+        return None, create_error_response(
             "Validation failed",
             status_code=400,
             details=validation_errors
         )
     
+    return data, None
+
+def session_conflict_response(message, session=None):
+    """409 with the session's current blocks so the client can start over from them."""
+    body = {'error': message, 'status_code': 409}
+    if session:
+        body.update(session_id=session['id'], version=session['version'], blocks=session['blocks'])
+    return jsonify(body), 409
+
+def open_block_session(data):
+    """
+    Load or create the session of a session request, applying the client's
+    blocks if it sent them. Returns (session, resynced, error response).
+    """
+    session_id = data.get('session_id')
+    session = block_sessions.load(session_id)
+    if session is None:
+        if session_id and 'existing_blocks' not in data:
+            return None, False, session_conflict_response("Session not found")
+        return block_sessions.create(data.get('existing_blocks', [])), True, None
+    
+    if 'existing_blocks' in data:
+        # The client edited its blocks; they replace the session's
+        base_version = session['version']
+        diff_blocks(session, data['existing_blocks'])
+        try:
+            return block_sessions.save(session, base_version), True, None
+        except SessionConflict:
+            return None, False, session_conflict_response("Session changed", block_sessions.load(session['id']))
+    
+    if data.get('base_version') is not None and data['base_version'] != session['version']:
+        return None, False, session_conflict_response("Session changed", session)
+    return session, False, None
+
+def commit_block_session(session, resynced, blocks):
+    """Store the processed blocks in the session and describe the change for the client."""
+    base_version = session['version']
+    ops = diff_blocks(session, blocks)
+    block_sessions.save(session, base_version)
+    if resynced:
+        # The client does not know the ids yet
+        return {'session_id': session['id'], 'version': session['version'], 'blocks': session['blocks']}
+    return {'session_id': session['id'], 'base_version': base_version, 'version': session['version'], 'ops': ops}
+
+def lookup_cached_blocks(text, existing_blocks, intent):
+    """
+    Answer repeats from the result cache, then near-duplicates from the semantic cache.
+    Returns (cached blocks or None, result cache key, semantic cache context).
+    """
+    key = None
+    context = None
+    bypass = cache_bypassed(request)
+    if result_cache or semantic_cache is not None:
+        identity = text_processor.cache_identity()
+        g.cache_status = 'BYPASS' if bypass else 'MISS'
+    if result_cache:
+        key = cache_key(text, existing_blocks, intent, identity)
+        cached_blocks = None if bypass else result_cache.get(key)
+        if cached_blocks is not None:
+            g.cache_status = 'HIT'
+            return cached_blocks, key, context
+    if semantic_cache is not None:
+        # Everything but the text, so only requests that differ in their text are compared
+        context = cache_key('', existing_blocks, intent, identity)
+        if not bypass:
+            near_blocks, similarity = semantic_cache.lookup(text, context)
+            if near_blocks:
+                metrics.inc('statement_semantic_cache_lookups_total', result='hit')
+                g.cache_status = 'NEAR'
+                return near_blocks[:Config.MAX_BLOCKS], key, context
+            result = 'miss' if similarity < semantic_cache.threshold else 'unreconciled'
+            metrics.inc('statement_semantic_cache_lookups_total', result=result)
+    return None, key, context
+
+def run_processor(text, existing_blocks, intent):
+    """
+    Process text through the processor's stream.
+
+    Returns:
+        tuple: (blocks, fallback) where fallback is the reason the blocks came
+        from fallback processing ('deadline', 'error' or 'parse') or None
+    """
+    blocks = existing_blocks or []
+    fallback = None
+    for kind, value in text_processor.stream_text(text, existing_blocks, intent):
+        if kind == 'fallback':
+            fallback = value
+        elif kind == 'done':
+            blocks = value
+    return blocks, fallback
+
+def store_blocks(text, key, context, blocks, fallback=None):
+    """Cache the model's blocks for a request, unless they are fallback output."""
+    # Degraded fallback output is not worth repeating
+    if not fallback and 'no-store' not in request.headers.get('Cache-Control', '').lower():
+        if key:
+            result_cache.set(key, blocks)
+        if context:
+            semantic_cache.add(text, context, blocks)
+
+@app.route('/process-text', methods=['POST'])
+@limiter.limit(f"{Config.RATE_LIMIT_CALLS} per {Config.RATE_LIMIT_PERIOD} seconds")
+@timer_decorator
+def process_text():
+    """Main endpoint to process text into statement blocks."""
+    data, error_response = read_process_request()
+    if error_response:
+        return error_response
+    
     # Extract parameters
     text = data.get('text', '').strip()
     existing_blocks = data.get('existing_blocks', [])
     intent = data.get('intent', '')
     
-    # Process the text
+    # Session requests take the existing blocks from the server
+    session = None
+    if 'session_id' in data:
+        session, resynced, error_response = open_block_session(data)
+        if error_response:
+            return error_response
+        existing_blocks = block_texts(session)
+    
+    cached_blocks, key, context = lookup_cached_blocks(text, existing_blocks, intent)
+    if cached_blocks is not None:
+        if session:
+            try:
+                return commit_block_session(session, resynced, cached_blocks), 200
+            except SessionConflict:
+                return session_conflict_response("Session changed", block_sessions.load(session['id']))
+        return {
+            'blocks': cached_blocks
+        }, 200
+    
+    # Process the text; the request deadline bounds the provider calls, which
+    # answer with fallback blocks when it runs out
     try:
-        # Set timeout for the entire operation
-        start_time = time.time()
         print(f"Processing text: {text}, existing_blocks: {existing_blocks}, intent: {intent}", text_processor)
-        blocks = text_processor.process_text(text, existing_blocks, intent)
+        # Streamed internally so fallback output is announced and kept out of the caches
+        blocks, fallback = run_processor(text, existing_blocks, intent)
+        
+        store_blocks(text, key, context, blocks, fallback)
         
-        # Check if we exceeded timeout
-        if time.time() - start_time > Config.REQUEST_TIMEOUT:
-            return create_error_response(
-                "Request timeout exceeded",
-                status_code=504
-            )
+        if session:
+            try:
+                return commit_block_session(session, resynced, blocks), 200
+            except SessionConflict:
+                return session_conflict_response("Session changed", block_sessions.load(session['id']))
         
         # Return successful response
         return {
@@ -142,6 +338,167 @@ def process_text():
             details=str(e) if Config.DEBUG else None
         )
 
+def ndjson(message):
+    return json.dumps(message) + '\n'
+
+@app.route('/process-text/stream', methods=['POST'])
+@limiter.limit(f"{Config.RATE_LIMIT_CALLS} per {Config.RATE_LIMIT_PERIOD} seconds")
+def process_text_stream():
+    """
+    Process text into statement blocks, streamed as newline-delimited JSON.
+    
+    Each block is sent as {"type": "block", "index": i, "text": ...} as soon as
+    the model has finished it, followed by {"type": "done", "blocks": [...]}
+    with the final list, which replaces the streamed blocks. Failures after
+    the response started are sent as {"type": "error", "error": ...}.
+    """
+    data, error_response = read_process_request()
+    if error_response:
+        return error_response
+    
+    text = data.get('text', '').strip()
+    existing_blocks = data.get('existing_blocks', [])
+    intent = data.get('intent', '')
+    
+    session = None
+    if 'session_id' in data:
+        session, resynced, error_response = open_block_session(data)
+        if error_response:
+            return error_response
+        existing_blocks = block_texts(session)
+    
+    cached_blocks, key, context = lookup_cached_blocks(text, existing_blocks, intent)
+    start_time = time.perf_counter()
+    
+    def done(blocks):
+        message = {'type': 'done', 'blocks': blocks}
+        if session:
+            # Sessions get the same patch or id-tagged blocks as /process-text
+            try:
+                message = dict(commit_block_session(session, resynced, blocks), type='done')
+            except SessionConflict:
+                return ndjson({'type': 'error', 'error': "Session changed"})
+        message['processing_time_ms'] = int((time.perf_counter() - start_time) * 1000)
+        return ndjson(message)
+    
+    def generate():
+        if cached_blocks is not None:
+            for index, block in enumerate(cached_blocks):
+                yield ndjson({'type': 'block', 'index': index, 'text': block})
+            yield done(cached_blocks)
+            return
+        
+        index = 0
+        blocks = []
+        fallback = None
+        try:
+            for kind, value in text_processor.stream_text(text, existing_blocks, intent):
+                if kind == 'block':
+                    if index == 0:
+                        metrics.observe('statement_stream_first_block_seconds', time.perf_counter() - start_time)
+                    yield ndjson({'type': 'block', 'index': index, 'text': value})
+                    index += 1
+                elif kind == 'fallback':
+                    fallback = value
+                elif kind == 'done':
+                    blocks = value
+        except Exception as e:
+            logger.error(f"Error streaming text: {str(e)}", exc_info=True)
+            yield ndjson({'type': 'error', 'error': "An error occurred while processing the text"})
+            return
+        
+        store_blocks(text, key, context, blocks, fallback)
+        metrics.observe('statement_stream_seconds', time.perf_counter() - start_time)
+        yield done(blocks)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/ingest', methods=['POST'])
+@limiter.limit(f"{Config.INGEST_RATE_LIMIT_CALLS} per {Config.RATE_LIMIT_PERIOD} seconds")
+def ingest_frame():
+    """
+    Turn a live transcript into statement blocks once the speaker pauses.
+    
+    The client posts a frame for every partial transcript of a recording:
+    stream_id, an increasing seq, text (the transcript not yet turned into
+    blocks) and final (end of an utterance), plus the fields of /process-text.
+    The response is held until the frame is processed or a newer frame of the
+    stream supersedes it, which also cancels its model call:
+    
+        {"status": "superseded", "seq": n}
+        {"status": "processed", "seq": n, "blocks": [...]}   (or the session patch)
+    """
+    data, error_response = read_process_request(validate_ingest_data)
+    if error_response:
+        return error_response
+    
+    stream_id = data['stream_id']
+    seq = data['seq']
+    text = data.get('text', '').strip()
+    intent = data.get('intent', '')
+    span = tracing.current_span()
+    if span is not None:
+        span.set_attribute('ingest.seq', seq)
+    
+    def outcome(status, **body):
+        metrics.inc('statement_ingest_frames_total', outcome=status)
+        if span is not None:
+            span.set_attribute('ingest.outcome', status)
+        return dict(body, status='superseded' if status == 'cancelled' else status, seq=seq), 200
+    
+    if ingest.publish(stream_id, seq) > seq:
+        return outcome('superseded')
+    if not text:
+        return outcome('empty')
+    
+    # Wait for the speaker to pause; a newer frame replaces this one
+    if not data.get('final'):
+        pause_ms = Config.INGEST_SENTENCE_PAUSE_MS if ends_sentence(text) else Config.INGEST_DEBOUNCE_MS
+        if ingest.wait_superseded(stream_id, seq, pause_ms / 1000):
+            return outcome('superseded')
+    
+    existing_blocks = data.get('existing_blocks', [])
+    session = None
+    if 'session_id' in data:
+        session, resynced, error_response = open_block_session(data)
+        if error_response:
+            return error_response
+        existing_blocks = block_texts(session)
+    
+    # Partial transcripts rarely repeat, so the caches are not consulted
+    blocks = None
+    try:
+        for kind, value in text_processor.stream_text(text, existing_blocks, intent,
+                                                      cancelled=ingest.canceller(stream_id, seq)):
+            if kind == 'done':
+                blocks = value
+    except Exception as e:
+        logger.error(f"Error processing transcript frame: {str(e)}", exc_info=True)
+        return create_error_response(
+            "An error occurred while processing the text",
+            status_code=500,
+            details=str(e) if Config.DEBUG else None
+        )
+    if blocks is None or ingest.superseded(stream_id, seq):
+        return outcome('cancelled')
+    
+    if session:
+        try:
+            return outcome('processed', **commit_block_session(session, resynced, blocks))
+        except SessionConflict:
+            return session_conflict_response("Session changed", block_sessions.load(session['id']))
+    return outcome('processed', blocks=blocks)
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def prometheus_metrics():
+    """Metrics in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
@@ -157,17 +514,61 @@ def internal_error(error):
         details=str(error) if Config.DEBUG else None
     )
 
+def request_timeout():
+    """Seconds the request may take: REQUEST_TIMEOUT, or less if the client asks with X-Request-Timeout-Ms."""
+    try:
+        client_timeout = int(request.headers.get('X-Request-Timeout-Ms', '')) / 1000
+    except ValueError:
+        return Config.REQUEST_TIMEOUT
+    return max(0, min(Config.REQUEST_TIMEOUT, client_timeout))
+
 @app.before_request
 def log_request():
-    """Log incoming requests."""
+    """Log incoming requests and join or start their trace."""
     logger.debug(f"{request.method} {request.path} - {request.remote_addr}")
+    g.start_time = time.perf_counter()
+    g.deadline = deadline.start(request_timeout())
+    g.trace = tracing.begin_span(
+        f"{request.method} {request.path}",
+        request.headers.get('traceparent'),
+        kind=tracing.KIND_SERVER,
+        **{'http.method': request.method, 'http.route': request.path}
+    )
 
 @app.after_request
 def log_response(response):
     """Log response status."""
     logger.debug(f"Response: {response.status_code}")
+    trace = g.get('trace')
+    if trace:
+        span = trace[0]
+        span.set_attribute('http.status_code', response.status_code)
+        if response.status_code >= 500:
+            span.set_error(f"HTTP {response.status_code}")
+        response.headers['X-Trace-Id'] = span.trace_id
+    if request.endpoint in ('process_text', 'process_text_stream'):
+        cache_status = g.get('cache_status')
+        if cache_status:
+            response.headers['X-Cache'] = cache_status
+        cache_label = (cache_status or 'off').lower()
+        metrics.inc('statement_requests_total', endpoint=request.endpoint, cache=cache_label, status=response.status_code)
+        # Streams are timed when they end
+        if 'start_time' in g and request.endpoint == 'process_text':
+            metrics.observe('statement_request_seconds', time.perf_counter() - g.start_time, cache=cache_label)
     return response
 
+@app.teardown_request
+def end_trace(error=None):
+    """Finish the request span and drop the request deadline."""
+    token = g.pop('deadline', None)
+    if token is not None:
+        deadline.clear(token)
+    trace = g.pop('trace', None)
+    if trace:
+        if error is not None:
+            trace[0].record_exception(error)
+        tracing.finish_span(*trace)
+
 if __name__ == '__main__':
     # Development server
     app.run(
@@ -0,0 +1,153 @@
+"""
+Server-side statement block sessions.
+
+Instead of resending every existing block with each utterance, a client opens
+a session and then sends only its session id, the version it last saw and
+the new text. The service keeps the blocks in Redis under stable block ids
+and answers with a patch against the client's version:
+
+    {"op": "insert", "id": "b7", "after": "b3", "text": "..."}   (after null: first)
+    {"op": "update", "id": "b3", "text": "..."}
+    {"op": "delete", "id": "b4"}
+
+Applying the ops in order to the blocks of base_version gives the blocks of
+version. A client whose local blocks changed (edits in the editor) sends
+them as existing_blocks once; they replace the session's blocks and the
+response carries the full list with ids instead of a patch.
+
+Without Redis, sessions are kept in process memory, which only works with a
+single worker.
+"""
+import difflib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'statement-blocks:session:'
+
+
+class SessionConflict(Exception):
+    """The session changed since the version the client or request started from."""
+
+
+def new_session_id():
+    return os.urandom(12).hex()
+
+
+def diff_blocks(session, texts):
+    """
+    Replace the session's blocks with texts, keeping the ids of unchanged and
+    edited blocks. Returns the ops that turn the old blocks into the new ones.
+    """
+    old_blocks = session['blocks']
+    old_texts = [block['text'] for block in old_blocks]
+    new_blocks = []
+    ops = []
+
+    def insert(text):
+        block = {'id': f"b{session['next_id']}", 'text': text}
+        session['next_id'] += 1
+        ops.append({'op': 'insert', 'id': block['id'], 'after': new_blocks[-1]['id'] if new_blocks else None, 'text': text})
+        new_blocks.append(block)
+
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_texts, texts, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            new_blocks.extend(old_blocks[i1:i2])
+            continue
+        # Pair replaced blocks up as edits, the rest are inserted or deleted
+        paired = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for offset in range(paired):
+            block = {'id': old_blocks[i1 + offset]['id'], 'text': texts[j1 + offset]}
+            ops.append({'op': 'update', 'id': block['id'], 'text': block['text']})
+            new_blocks.append(block)
+        for block in old_blocks[i1 + paired:i2]:
+            ops.append({'op': 'delete', 'id': block['id']})
+        for text in texts[j1 + paired:j2]:
+            insert(text)
+
+    session['blocks'] = new_blocks
+    return ops
+
+
+def block_texts(session):
+    return [block['text'] for block in session['blocks']]
+
+
+class BlockSessionStore:
+    def __init__(self, client=None, ttl=86400, max_memory_sessions=10000):
+        self.client = client
+        self.ttl = ttl
+        self.max_memory_sessions = max_memory_sessions
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Keep sessions in Redis, or in memory if it is unreachable."""
+        try:
+            client = redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            client.ping()
+            logger.info("Block sessions stored in Redis")
+            return cls(client, **kwargs)
+        except Exception as e:
+            logger.warning(f"Redis connection failed: {str(e)}. Block sessions kept in memory.")
+            return cls(None, **kwargs)
+
+    def create(self, texts=None):
+        session = {'id': new_session_id(), 'version': 0, 'next_id': 1, 'blocks': []}
+        diff_blocks(session, list(texts or []))
+        self.save(session, None)
+        return session
+
+    def load(self, session_id):
+        if not session_id:
+            return None
+        if self.client is None:
+            with self._lock:
+                entry = self._memory.get(session_id)
+                if entry is None or entry[0] < time.time():
+                    return None
+                return json.loads(entry[1])
+        value = self.client.get(KEY_PREFIX + session_id)
+        return json.loads(value) if value else None
+
+    def save(self, session, expected_version):
+        """
+        Store session as the next version. Raises SessionConflict if the stored
+        version is no longer expected_version (None for a new session).
+        """
+        key = KEY_PREFIX + session['id']
+        if self.client is None:
+            with self._lock:
+                entry = self._memory.get(session['id'])
+                current = json.loads(entry[1])['version'] if entry else None
+                if current != expected_version:
+                    raise SessionConflict(session['id'])
+                session['version'] = (current or 0) + 1
+                self._memory[session['id']] = (time.time() + self.ttl, json.dumps(session))
+                self._memory.move_to_end(session['id'])
+                while len(self._memory) > self.max_memory_sessions:
+                    self._memory.popitem(last=False)
+            return session
+
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                stored = pipe.get(key)
+                current = json.loads(stored)['version'] if stored else None
+                if current != expected_version:
+                    raise SessionConflict(session['id'])
+                session['version'] = (current or 0) + 1
+                pipe.multi()
+                pipe.set(key, json.dumps(session), ex=self.ttl)
+                pipe.execute()
+            except redis.WatchError:
+                raise SessionConflict(session['id'])
+        return session
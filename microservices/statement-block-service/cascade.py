@@ -0,0 +1,158 @@
+"""
+Model cascade: a fast model first, the larger one only when needed.
+
+With CASCADE_ENABLED a provider answers from its fast model
+(CLAUDE_FAST_MODEL / GEMINI_FAST_MODEL) first. The blocks go through cheap
+local checks (check_blocks) and only a result that fails them, or a failed
+call answered with fallback blocks, is escalated to the configured
+CLAUDE_MODEL / GEMINI_MODEL. The last tier's answer is used as it is.
+
+Streams buffer the fast tier, which is quick, so clients never see blocks
+that are replaced after an escalation; the last tier is streamed as usual.
+"""
+import logging
+import re
+import time
+
+from config import Config
+from metrics import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('statement_cascade_tier_seconds', 'Latency of each cascade tier')
+metrics.describe('statement_cascade_requests_total', 'Cascaded requests by the tier that answered them')
+metrics.describe('statement_cascade_escalations_total', 'Results escalated to the next tier by tier and first failed check')
+metrics.describe('statement_cascade_check_failures_total', 'Failed quality checks by tier and check')
+
+FILLER_WORDS = {'basically', 'actually', 'like', 'just', 'really', 'mean', 'know', 'kind', 'sort', 'yeah'}
+WORD = re.compile(r"[a-z0-9']+")
+SENTENCE_END = re.compile(r'[.!?]+(?=\s|$)')
+
+
+def content_words(text):
+    """Words that carry meaning, cut to 5 letters so grammar fixes (plurals, tenses) still match."""
+    return {word[:5] for word in WORD.findall(text.lower()) if len(word) > 3 and word not in FILLER_WORDS}
+
+
+def count_sentences(block):
+    return max(1, len(SENTENCE_END.findall(block.strip())))
+
+
+def check_blocks(text, existing_blocks, blocks, min_coverage=None, max_sentences=None):
+    """
+    Cheap checks of a model's blocks. Returns the names of the failed checks:
+
+    - blocks: not a list of non-empty strings, or no blocks
+    - block_count: more than MAX_BLOCKS, or more blocks than the text could
+      sensibly be split into (one per 4 words on top of the existing blocks)
+    - sentences: a block longer than max_sentences sentences
+    - coverage: fewer than min_coverage of the input's content words kept
+    """
+    min_coverage = Config.CASCADE_MIN_COVERAGE if min_coverage is None else min_coverage
+    max_sentences = Config.CASCADE_MAX_SENTENCES if max_sentences is None else max_sentences
+    existing_blocks = existing_blocks or []
+
+    if not isinstance(blocks, list) or not blocks or \
+            not all(isinstance(block, str) and block.strip() for block in blocks):
+        return ['blocks']
+
+    failed = []
+    word_count = len(WORD.findall(text.lower()))
+    if len(blocks) > Config.MAX_BLOCKS or len(blocks) > len(existing_blocks) + max(1, word_count // 4):
+        failed.append('block_count')
+    if any(count_sentences(block) > max_sentences for block in blocks):
+        failed.append('sentences')
+
+    words = content_words(' '.join([text] + existing_blocks))
+    if words:
+        kept = words & content_words(' '.join(blocks))
+        if len(kept) / len(words) < min_coverage:
+            failed.append('coverage')
+    return failed
+
+
+class ModelCascade:
+    def __init__(self, tiers):
+        """tiers: [(name, processor)], cheapest first. Names label the metrics, e.g. the model."""
+        self.tiers = list(tiers)
+
+    def cache_identity(self):
+        """Settings that change the output for the same input, for result cache keys."""
+        return {
+            'provider': 'cascade',
+            'tiers': [processor.cache_identity() for _, processor in self.tiers],
+            'min_coverage': Config.CASCADE_MIN_COVERAGE,
+            'max_sentences': Config.CASCADE_MAX_SENTENCES
+        }
+
+    def process_text(self, text, existing_blocks=None, intent=None):
+        """Process text like the processors do, escalating through the tiers."""
+        for kind, value in self.stream_text(text, existing_blocks, intent):
+            if kind == 'done':
+                return value
+        return existing_blocks or []
+
+    def stream_text(self, text, existing_blocks=None, intent=None, cancelled=None):
+        """Stream like the processors' stream_text, escalating through the tiers."""
+        if not text or not text.strip():
+            yield 'done', existing_blocks or []
+            return
+
+        for index, (tier, processor) in enumerate(self.tiers):
+            last = index == len(self.tiers) - 1
+            start_time = time.perf_counter()
+            blocks = None
+            fallback = None
+            with tracing.start_span('cascade_tier', **{'cascade.tier': tier}) as span:
+                for kind, value in processor.stream_text(text, existing_blocks, intent, cancelled=cancelled):
+                    if kind == 'done':
+                        blocks = value
+                    elif kind == 'fallback':
+                        # Failed calls are answered with fallback blocks, announced before 'done'
+                        fallback = value
+                    elif last:
+                        yield kind, value
+                if blocks is None:
+                    # Cancelled
+                    return
+                metrics.observe('statement_cascade_tier_seconds', time.perf_counter() - start_time, tier=tier)
+
+                failed = ['fallback'] if fallback else check_blocks(text, existing_blocks, blocks)
+                for check in failed:
+                    metrics.inc('statement_cascade_check_failures_total', tier=tier, check=check)
+                if failed and not last:
+                    span.set_attribute('cascade.escalated', ','.join(failed))
+                    metrics.inc('statement_cascade_escalations_total', tier=tier, reason=failed[0])
+                    logger.info(f"Escalating from {tier}: {', '.join(failed)}")
+                    continue
+            break
+
+        metrics.inc('statement_cascade_requests_total', tier=tier)
+        parent = tracing.current_span()
+        if parent is not None:
+            parent.set_attribute('cascade.tier', tier)
+            if fallback:
+                parent.set_attribute('statement.fallback', True)
+        if not last:
+            for block in blocks:
+                yield 'block', block
+        if fallback:
+            yield 'fallback', fallback
+        yield 'done', blocks
+
+
+def processor_for(provider):
+    """The processor of a provider, cascading from its fast model if CASCADE_ENABLED."""
+    if provider == 'claude':
+        from claude_processor import ClaudeProcessor as processor_class
+        fast_model, model = Config.CLAUDE_FAST_MODEL, Config.CLAUDE_MODEL
+    elif provider == 'gemini':
+        from gemini_processor import GeminiProcessor as processor_class
+        fast_model, model = Config.GEMINI_FAST_MODEL, Config.GEMINI_MODEL
+    else:
+        raise ValueError(f"Unknown model provider: {provider}")
+
+    if not Config.CASCADE_ENABLED or not fast_model or fast_model == model:
+        return processor_class()
+    return ModelCascade([(fast_model, processor_class(fast_model)), (model, processor_class(model))])
@@ -1,18 +1,54 @@
 import json
 import logging
+import httpx
 from anthropic import Anthropic, APIError, APITimeoutError
 from config import Config
-from utils import parse_claude_response, sanitize_input
+import deadline
+from utils import BLOCKS_SCHEMA, IncrementalBlockParser, parse_blocks, sanitize_input
+import tracing
 
 logger = logging.getLogger(__name__)
 
+# Claude answers by calling this tool, so its input is validated JSON instead of free text
+BLOCKS_TOOL = {
+    'name': 'submit_statement_blocks',
+    'description': 'Submit the processed statement blocks.',
+    'input_schema': BLOCKS_SCHEMA
+}
+
 class ClaudeProcessor:
-    def __init__(self):
-        self.client = Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-        self.model = Config.CLAUDE_MODEL
+    # Bump when _build_prompt changes so cached results are not reused
+    PROMPT_VERSION = 3
+    
+    def __init__(self, model=None):
+        # One pooled keep-alive client per worker, shared by concurrent requests.
+        # No SDK retries: each call gets the rest of the request deadline as its
+        # timeout, which retries would outlive.
+        self.client = Anthropic(
+            api_key=Config.ANTHROPIC_API_KEY,
+            max_retries=0,
+            http_client=httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=Config.PROVIDER_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.PROVIDER_MAX_KEEPALIVE
+                ),
+                timeout=Config.REQUEST_TIMEOUT
+            )
+        )
+        self.model = model or Config.CLAUDE_MODEL
         self.max_tokens = Config.CLAUDE_MAX_TOKENS
         self.temperature = Config.CLAUDE_TEMPERATURE
     
+    def cache_identity(self):
+        """Settings that change the output for the same input, for result cache keys."""
+        return {
+            'provider': 'claude',
+            'model': self.model,
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens,
+            'prompt_version': self.PROMPT_VERSION
+        }
+    
     def process_text(self, text, existing_blocks=None, intent=None):
         """
         Process text using Claude to create organized statement blocks.
@@ -28,35 +64,41 @@ class ClaudeProcessor:
         if not text or not text.strip():
             return existing_blocks or []
         
-        # Sanitize inputs
-        text = sanitize_input(text)
-        intent = sanitize_input(intent)
-        if existing_blocks:
-            existing_blocks = [sanitize_input(block) for block in existing_blocks]
-        
-        # Build the prompt
-        prompt = self._build_prompt(text, existing_blocks, intent)
+        text, existing_blocks, prompt = self._prepare(text, existing_blocks, intent)
+        timeout = deadline.provider_timeout('claude', Config.REQUEST_TIMEOUT)
+        if timeout is None:
+            logger.warning("Too little of the request deadline left for Claude, using fallback")
+            return self._fallback_processing(text, existing_blocks)
         
         try:
             # Call Claude API
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            # Extract the response text
-            response_text = response.content[0].text
-            logger.debug(f"Claude response: {response_text}")
+            with tracing.start_span('provider_call', kind=tracing.KIND_CLIENT,
+                                    **{'llm.provider': 'claude', 'llm.model': self.model,
+                                       'llm.timeout_ms': int(timeout * 1000)}) as span:
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    tools=[BLOCKS_TOOL],
+                    tool_choice={'type': 'tool', 'name': BLOCKS_TOOL['name']},
+                    timeout=timeout
+                )
+                
+                # The tool call's input, and any text as a fallback
+                structured = next((content.input for content in response.content if content.type == 'tool_use'), None)
+                response_text = ''.join(
+                    content.text for content in response.content if isinstance(getattr(content, 'text', None), str)
+                )
+                span.set_attribute('response.chars', len(response_text))
+            logger.debug(f"Claude response: {structured if structured is not None else response_text}")
             
-            # Parse the response
-            blocks = parse_claude_response(response_text)
+            blocks = parse_blocks('claude', structured, response_text)
             
             if blocks:
                 # Limit to MAX_BLOCKS
@@ -78,6 +120,98 @@ class ClaudeProcessor:
             logger.error(f"Unexpected error: {str(e)}")
             return self._fallback_processing(text, existing_blocks)
     
+    def stream_text(self, text, existing_blocks=None, intent=None, cancelled=None):
+        """
+        Process text like process_text, streaming the model's response.
+        
+        Yields ('block', text) for each statement block as soon as it is complete,
+        then ('done', blocks) with the final list. The final list replaces the
+        streamed blocks, e.g. when the stream failed and fallback processing ran;
+        fallback blocks are announced by ('fallback', reason) just before 'done',
+        reason being 'deadline', 'error' or 'parse'.
+        
+        cancelled is checked for every received chunk; once it returns True the
+        provider stream is closed and the generator ends without 'done'. At the
+        request deadline the stream is closed and fallback blocks are returned.
+        """
+        if not text or not text.strip():
+            yield 'done', existing_blocks or []
+            return
+        
+        text, existing_blocks, prompt = self._prepare(text, existing_blocks, intent)
+        parser = IncrementalBlockParser()
+        response_text = ''
+        timeout = deadline.provider_timeout('claude', Config.REQUEST_TIMEOUT)
+        if timeout is None:
+            logger.warning("Too little of the request deadline left for Claude, using fallback")
+            yield 'fallback', 'deadline'
+            yield 'done', self._fallback_processing(text, existing_blocks)
+            return
+        
+        try:
+            with tracing.start_span('provider_call', kind=tracing.KIND_CLIENT,
+                                    **{'llm.provider': 'claude', 'llm.model': self.model, 'llm.stream': True,
+                                       'llm.timeout_ms': int(timeout * 1000)}) as span:
+                with self.client.messages.stream(
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    tools=[BLOCKS_TOOL],
+                    tool_choice={'type': 'tool', 'name': BLOCKS_TOOL['name']},
+                    timeout=timeout
+                ) as stream:
+                    for event in stream:
+                        if cancelled and cancelled():
+                            span.set_attribute('cancelled', True)
+                            return
+                        # The timeout bounds each read; the deadline bounds the whole stream
+                        deadline.check('claude')
+                        if event.type == 'text':
+                            response_text += event.text
+                        if event.type != 'input_json':
+                            continue
+                        # The tool input streams as JSON text: {"blocks": ["...", ...]}
+                        for block in parser.feed(event.partial_json):
+                            if len(parser.blocks) == 1:
+                                span.set_attribute('first_block_ms', round(span.duration_ms, 1))
+                            if len(parser.blocks) <= Config.MAX_BLOCKS:
+                                yield 'block', block
+                span.set_attribute('response.chars', len(parser.text) + len(response_text))
+                span.set_attribute('blocks', len(parser.blocks))
+        except Exception as e:
+            logger.error(f"Claude streaming error: {str(e)}")
+            yield 'fallback', 'deadline' if isinstance(e, deadline.DeadlineExceeded) else 'error'
+            yield 'done', self._fallback_processing(text, existing_blocks)
+            return
+        
+        blocks = parse_blocks('claude', parser.text, response_text, partial=parser.blocks)
+        if blocks:
+            yield 'done', blocks[:Config.MAX_BLOCKS]
+        else:
+            logger.warning("Failed to parse streamed Claude response, using fallback")
+            yield 'fallback', 'parse'
+            yield 'done', self._fallback_processing(text, existing_blocks)
+    
+    def _prepare(self, text, existing_blocks, intent):
+        """Sanitize the inputs and build the prompt."""
+        with tracing.start_span('build_prompt') as span:
+            # Sanitize inputs
+            text = sanitize_input(text)
+            intent = sanitize_input(intent)
+            if existing_blocks:
+                existing_blocks = [sanitize_input(block) for block in existing_blocks]
+            
+            # Build the prompt
+            prompt = self._build_prompt(text, existing_blocks, intent)
+            span.set_attribute('prompt.chars', len(prompt))
+        return text, existing_blocks, prompt
+    
     def _build_prompt(self, text, existing_blocks, intent):
         """Build the prompt for Claude."""
         prompt = """You are a text processing assistant that organizes unstructured text into clear, concise statement blocks.
@@ -94,17 +228,18 @@ Rules:
 - Preserve the speaker's intent and meaning
 - Remove filler words and fix grammar
 - Merge similar ideas from new text with existing blocks
-- Return ONLY a JSON array of strings, no explanation
+- Submit the blocks with the submit_statement_blocks tool, no explanation
 
 """
         if intent:
             prompt += f"Speaking context:\n\"{intent}\"\n\n"
         
         if existing_blocks:
-            prompt += f"Existing blocks:\n{json.dumps(existing_blocks, indent=2)}\n\n"
+            # Compact JSON: indentation only costs prompt tokens
+            prompt += f"Existing blocks:\n{json.dumps(existing_blocks, ensure_ascii=False)}\n\n"
         
         prompt += f"New text to process:\n\"{text}\"\n\n"
-        prompt += "Return a JSON array of processed statement blocks:"
+        prompt += "Submit the processed statement blocks:"
         
         return prompt
     
@@ -113,6 +248,10 @@ Rules:
         # Simple fallback: split by sentences and clean
         import re
         
+        span = tracing.current_span()
+        if span:
+            span.set_attribute('statement.fallback', True)
+        
         # Split into sentences
         sentences = re.split(r'[.!?]+', text)
         
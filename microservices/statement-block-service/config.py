@@ -5,19 +5,32 @@ load_dotenv()
 
 class Config:
     # Model selection - default to Gemini
-    MODEL_PROVIDER = os.getenv('MODEL_PROVIDER', 'gemini').lower()  # 'claude' or 'gemini'
+    MODEL_PROVIDER = os.getenv('MODEL_PROVIDER', 'gemini').lower()  # 'claude', 'gemini' or 'router' (both)
     
     # API Keys
     ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
     GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
     
     # Validate API key based on selected model
-    if MODEL_PROVIDER == 'claude' and not ANTHROPIC_API_KEY:
+    if MODEL_PROVIDER in ['claude', 'router'] and not ANTHROPIC_API_KEY:
         raise ValueError("ANTHROPIC_API_KEY environment variable is required for Claude model")
-    elif MODEL_PROVIDER == 'gemini' and not GOOGLE_API_KEY:
+    elif MODEL_PROVIDER in ['gemini', 'router'] and not GOOGLE_API_KEY:
         raise ValueError("GOOGLE_API_KEY environment variable is required for Gemini model")
-    elif MODEL_PROVIDER not in ['claude', 'gemini']:
-        raise ValueError("MODEL_PROVIDER must be either 'claude' or 'gemini'")
+    elif MODEL_PROVIDER not in ['claude', 'gemini', 'router']:
+        raise ValueError("MODEL_PROVIDER must be 'claude', 'gemini' or 'router'")
+    
+    # Router (MODEL_PROVIDER=router): hedge to the other provider when one is slower than its p95
+    ROUTER_PRIMARY = os.getenv('ROUTER_PRIMARY', 'gemini').lower()  # tried first until latencies are known
+    ROUTER_WINDOW = int(os.getenv('ROUTER_WINDOW', '200'))  # recent calls per provider the stats cover
+    ROUTER_MIN_SAMPLES = int(os.getenv('ROUTER_MIN_SAMPLES', '20'))  # calls before a provider's p95 is used
+    ROUTER_HEDGE_DEFAULT_MS = int(os.getenv('ROUTER_HEDGE_DEFAULT_MS', '3000'))  # hedge delay without a p95
+    ROUTER_HEDGE_MIN_MS = int(os.getenv('ROUTER_HEDGE_MIN_MS', '250'))
+    ROUTER_MAX_ERROR_RATE = float(os.getenv('ROUTER_MAX_ERROR_RATE', '0.2'))  # above this a provider is tried last
+    
+    # Cascade: answer from the fast model first, escalate results failing the local checks
+    CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'false').lower() == 'true'
+    CASCADE_MIN_COVERAGE = float(os.getenv('CASCADE_MIN_COVERAGE', '0.6'))  # share of input content words kept
+    CASCADE_MAX_SENTENCES = int(os.getenv('CASCADE_MAX_SENTENCES', '3'))  # per block, as the prompt asks
     
     # Redis
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
@@ -26,24 +39,59 @@ class Config:
     MAX_TEXT_LENGTH = int(os.getenv('MAX_TEXT_LENGTH', '10000'))
     MAX_BLOCKS = int(os.getenv('MAX_BLOCKS', '50'))
     
-    # Request configuration
+    # Request configuration: each request's deadline, which bounds its provider calls
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
+    FALLBACK_RESERVE_MS = int(os.getenv('FALLBACK_RESERVE_MS', '200'))  # kept back for the local fallback
+    MIN_PROVIDER_BUDGET_MS = int(os.getenv('MIN_PROVIDER_BUDGET_MS', '1000'))  # less left: skip the provider
+    
+    # Provider connection pool, shared by all requests in a worker. Under gevent
+    # workers every in-flight request holds one connection while it waits.
+    PROVIDER_MAX_CONNECTIONS = int(os.getenv('PROVIDER_MAX_CONNECTIONS', '1000'))
+    PROVIDER_MAX_KEEPALIVE = int(os.getenv('PROVIDER_MAX_KEEPALIVE', '100'))
+    
+    # Result cache: identical requests are answered from Redis
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '86400'))  # 1 day in seconds
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '10000'))
+    RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv('RESULT_CACHE_MAX_ENTRY_BYTES', '65536'))
+    
+    # Near-duplicate cache: similar texts are answered by patching cached blocks (in memory, per worker)
+    SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9'))  # cosine similarity
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '1000'))
+    SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', '3600'))  # 1 hour in seconds
+    
+    # Block sessions: clients send only new text, blocks are kept in Redis
+    SESSION_TTL = int(os.getenv('SESSION_TTL', '86400'))  # 1 day in seconds
+    
+    # Live transcript ingest: frames are turned into blocks once the speaker pauses
+    INGEST_DEBOUNCE_MS = int(os.getenv('INGEST_DEBOUNCE_MS', '1500'))  # silence after a partial sentence
+    INGEST_SENTENCE_PAUSE_MS = int(os.getenv('INGEST_SENTENCE_PAUSE_MS', '400'))  # silence after a finished sentence
+    INGEST_RATE_LIMIT_CALLS = int(os.getenv('INGEST_RATE_LIMIT_CALLS', '5000'))  # frames per RATE_LIMIT_PERIOD
     
     # Rate limiting
     RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
     RATE_LIMIT_CALLS = int(os.getenv('RATE_LIMIT_CALLS', '100'))
     RATE_LIMIT_PERIOD = int(os.getenv('RATE_LIMIT_PERIOD', '3600'))  # 1 hour in seconds
     
+    # Tracing: W3C traceparent propagation, spans exported to a JSON-lines log and/or an OTLP collector
+    SERVICE_NAME = os.getenv('SERVICE_NAME', 'statement-block-service')
+    TRACE_LOG_FILE = os.getenv('TRACE_LOG_FILE', '')
+    TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', '')  # e.g. http://localhost:4318/v1/traces
+    TRACE_SAMPLE_RATIO = float(os.getenv('TRACE_SAMPLE_RATIO', '1.0'))
+    
     # Flask configuration
     FLASK_ENV = os.getenv('FLASK_ENV', 'production')
     DEBUG = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
     
     # Claude model configuration
     CLAUDE_MODEL = os.getenv('CLAUDE_MODEL', 'claude-3-5-sonnet-20241022')
+    CLAUDE_FAST_MODEL = os.getenv('CLAUDE_FAST_MODEL', 'claude-3-5-haiku-20241022')  # first cascade tier
     CLAUDE_MAX_TOKENS = int(os.getenv('CLAUDE_MAX_TOKENS', '4096'))
     CLAUDE_TEMPERATURE = float(os.getenv('CLAUDE_TEMPERATURE', '0.3'))
     
     # Gemini model configuration
     GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+    GEMINI_FAST_MODEL = os.getenv('GEMINI_FAST_MODEL', 'gemini-2.0-flash-lite')  # first cascade tier
     GEMINI_MAX_TOKENS = int(os.getenv('GEMINI_MAX_TOKENS', '4096'))
     GEMINI_TEMPERATURE = float(os.getenv('GEMINI_TEMPERATURE', '0.3'))
\ No newline at end of file
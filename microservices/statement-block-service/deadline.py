@@ -0,0 +1,75 @@
+"""
+Request deadlines.
+
+Every request gets a deadline when it arrives: REQUEST_TIMEOUT seconds, or
+sooner if the client sends X-Request-Timeout-Ms. The deadline is kept in a
+context variable, so it reaches the processors through the router and the
+cascade without being passed along.
+
+Provider calls get the time left as their SDK timeout, minus
+FALLBACK_RESERVE_MS kept for the local fallback processing. With less than
+MIN_PROVIDER_BUDGET_MS left a provider is not called at all and the fallback
+answers, and streams stop at the deadline (check()), so a stuck call never
+holds a worker past its request's deadline.
+"""
+import contextvars
+import time
+
+from config import Config
+from metrics import metrics
+import tracing
+
+metrics.describe('statement_deadline_skips_total', 'Provider calls skipped because too little of the request deadline was left')
+metrics.describe('statement_deadline_exceeded_total', 'Provider calls cut off at the request deadline')
+
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline (less the fallback reserve) has passed."""
+
+
+def start(seconds):
+    """Set the current deadline seconds from now. Returns a token for clear()."""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def clear(token):
+    try:
+        _deadline.reset(token)
+    except ValueError:
+        # Set in a different context, e.g. by a framework hook
+        _deadline.set(None)
+
+
+def remaining():
+    """Seconds left until the deadline, None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def provider_timeout(provider, default):
+    """
+    Timeout for a provider call: the time left before the fallback reserve, at
+    most default. None if that is less than MIN_PROVIDER_BUDGET_MS, in which
+    case the caller should answer with its fallback instead.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    budget = min(default, left - Config.FALLBACK_RESERVE_MS / 1000)
+    if budget >= Config.MIN_PROVIDER_BUDGET_MS / 1000:
+        return budget
+    metrics.inc('statement_deadline_skips_total', provider=provider)
+    span = tracing.current_span()
+    if span is not None:
+        span.set_attribute('deadline.skipped', True)
+    return None
+
+
+def check(provider):
+    """Raise DeadlineExceeded once only the fallback reserve is left, e.g. between streamed chunks."""
+    left = remaining()
+    if left is not None and left <= Config.FALLBACK_RESERVE_MS / 1000:
+        metrics.inc('statement_deadline_exceeded_total', provider=provider)
+        raise DeadlineExceeded(f"{provider} call stopped at the request deadline")
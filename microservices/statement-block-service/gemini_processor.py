@@ -3,17 +3,33 @@ import logging
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from config import Config
-from utils import parse_claude_response, sanitize_input
+import deadline
+from utils import BLOCKS_SCHEMA, IncrementalBlockParser, parse_blocks, sanitize_input
+import tracing
 
 logger = logging.getLogger(__name__)
 
 class GeminiProcessor:
-    def __init__(self):
+    # Bump when _build_prompt changes so cached results are not reused
+    PROMPT_VERSION = 3
+    
+    def __init__(self, model=None):
         genai.configure(api_key=Config.GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+        self.model_name = model or Config.GEMINI_MODEL
+        self.model = genai.GenerativeModel(self.model_name)
         self.max_tokens = Config.GEMINI_MAX_TOKENS
         self.temperature = Config.GEMINI_TEMPERATURE
         
+    def cache_identity(self):
+        """Settings that change the output for the same input, for result cache keys."""
+        return {
+            'provider': 'gemini',
+            'model': self.model_name,
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens,
+            'prompt_version': self.PROMPT_VERSION
+        }
+    
     def process_text(self, text, existing_blocks=None, intent=None):
         """
         Process text using Gemini to create organized statement blocks.
@@ -29,21 +45,15 @@ class GeminiProcessor:
         if not text or not text.strip():
             return existing_blocks or []
         
-        # Sanitize inputs
-        text = sanitize_input(text)
-        intent = sanitize_input(intent)
-        if existing_blocks:
-            existing_blocks = [sanitize_input(block) for block in existing_blocks]
-        
-        # Build the prompt
-        prompt = self._build_prompt(text, existing_blocks, intent)
+        text, existing_blocks, prompt = self._prepare(text, existing_blocks, intent)
+        timeout = deadline.provider_timeout('gemini', Config.REQUEST_TIMEOUT)
+        if timeout is None:
+            logger.warning("Too little of the request deadline left for Gemini, using fallback")
+            return self._fallback_processing(text, existing_blocks)
         
         try:
             # Configure generation settings
-            generation_config = genai.types.GenerationConfig(
-                max_output_tokens=self.max_tokens,
-                temperature=self.temperature,
-            )
+            generation_config = self._generation_config()
             
             # Safety settings - allow all content for processing
             safety_settings = {
@@ -54,26 +64,34 @@ class GeminiProcessor:
             }
             #print(f"Prompt: {prompt}")
             # Call Gemini API
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config,
-                # safety_settings=safety_settings
-            )
-            print(f"Response: {response}")
-            # Extract the response text from Gemini response object
-            if hasattr(response, 'text'):
-                response_text = response.text
-            elif hasattr(response, 'candidates') and response.candidates:
-                # Access the first candidate's content
-                response_text = response.candidates[0].content.parts[0].text
-            else:
+            with tracing.start_span('provider_call', kind=tracing.KIND_CLIENT,
+                                    **{'llm.provider': 'gemini', 'llm.model': self.model_name,
+                                       'llm.timeout_ms': int(timeout * 1000)}) as span:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    # safety_settings=safety_settings
+                    request_options=self._request_options(timeout)
+                )
+                print(f"Response: {response}")
+                # Extract the response text from Gemini response object
+                if hasattr(response, 'text'):
+                    response_text = response.text
+                elif hasattr(response, 'candidates') and response.candidates:
+                    # Access the first candidate's content
+                    response_text = response.candidates[0].content.parts[0].text
+                else:
+                    response_text = None
+                span.set_attribute('response.chars', len(response_text or ''))
+            
+            if response_text is None:
                 logger.error("Unable to extract text from Gemini response")
                 return self._fallback_processing(text, existing_blocks)
                 
             print(f"Gemini response: {response_text}")
             
-            # Parse the response (reuse the same parser)
-            blocks = parse_claude_response(response_text)
+            # JSON mode answers with BLOCKS_SCHEMA, the legacy parser covers anything else
+            blocks = parse_blocks('gemini', response_text)
             print(f"Blocks: {blocks}")
             if blocks:
                 # Limit to MAX_BLOCKS
@@ -87,6 +105,106 @@ class GeminiProcessor:
             logger.error(f"Gemini API error: {str(e)}")
             return self._fallback_processing(text, existing_blocks)
     
+    def stream_text(self, text, existing_blocks=None, intent=None, cancelled=None):
+        """
+        Process text like process_text, streaming the model's response.
+        
+        Yields ('block', text) for each statement block as soon as it is complete,
+        then ('done', blocks) with the final list. The final list replaces the
+        streamed blocks, e.g. when the stream failed and fallback processing ran;
+        fallback blocks are announced by ('fallback', reason) just before 'done',
+        reason being 'deadline', 'error' or 'parse'.
+        
+        cancelled is checked for every received chunk; once it returns True the
+        provider stream is closed and the generator ends without 'done'. At the
+        request deadline the stream is closed and fallback blocks are returned.
+        """
+        if not text or not text.strip():
+            yield 'done', existing_blocks or []
+            return
+        
+        text, existing_blocks, prompt = self._prepare(text, existing_blocks, intent)
+        parser = IncrementalBlockParser()
+        timeout = deadline.provider_timeout('gemini', Config.REQUEST_TIMEOUT)
+        if timeout is None:
+            logger.warning("Too little of the request deadline left for Gemini, using fallback")
+            yield 'fallback', 'deadline'
+            yield 'done', self._fallback_processing(text, existing_blocks)
+            return
+        
+        try:
+            generation_config = self._generation_config()
+            with tracing.start_span('provider_call', kind=tracing.KIND_CLIENT,
+                                    **{'llm.provider': 'gemini', 'llm.model': self.model_name, 'llm.stream': True,
+                                       'llm.timeout_ms': int(timeout * 1000)}) as span:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    stream=True,
+                    request_options=self._request_options(timeout)
+                )
+                for chunk in response:
+                    if cancelled and cancelled():
+                        span.set_attribute('cancelled', True)
+                        return
+                    deadline.check('gemini')
+                    # Chunks without text parts (e.g. safety or finish metadata) raise on .text
+                    try:
+                        chunk_text = chunk.text
+                    except ValueError:
+                        continue
+                    for block in parser.feed(chunk_text):
+                        if len(parser.blocks) == 1:
+                            span.set_attribute('first_block_ms', round(span.duration_ms, 1))
+                        if len(parser.blocks) <= Config.MAX_BLOCKS:
+                            yield 'block', block
+                span.set_attribute('response.chars', len(parser.text))
+                span.set_attribute('blocks', len(parser.blocks))
+        except Exception as e:
+            logger.error(f"Gemini streaming error: {str(e)}")
+            yield 'fallback', 'deadline' if isinstance(e, deadline.DeadlineExceeded) else 'error'
+            yield 'done', self._fallback_processing(text, existing_blocks)
+            return
+        
+        blocks = parse_blocks('gemini', parser.text, partial=parser.blocks)
+        if blocks:
+            yield 'done', blocks[:Config.MAX_BLOCKS]
+        else:
+            logger.warning("Failed to parse streamed Gemini response, using fallback")
+            yield 'fallback', 'parse'
+            yield 'done', self._fallback_processing(text, existing_blocks)
+    
+    def _request_options(self, timeout):
+        """
+        Per-call options bounded by the request deadline. The SDK's default retry
+        of ServiceUnavailable runs for up to 600s on top of the per-attempt
+        timeout, so it is turned off; failures go to the fallback instead.
+        """
+        return {'timeout': timeout, 'retry': None}
+    
+    def _generation_config(self):
+        """Generation settings, with JSON output following BLOCKS_SCHEMA."""
+        return genai.types.GenerationConfig(
+            max_output_tokens=self.max_tokens,
+            temperature=self.temperature,
+            response_mime_type='application/json',
+            response_schema=BLOCKS_SCHEMA,
+        )
+    
+    def _prepare(self, text, existing_blocks, intent):
+        """Sanitize the inputs and build the prompt."""
+        with tracing.start_span('build_prompt') as span:
+            # Sanitize inputs
+            text = sanitize_input(text)
+            intent = sanitize_input(intent)
+            if existing_blocks:
+                existing_blocks = [sanitize_input(block) for block in existing_blocks]
+            
+            # Build the prompt
+            prompt = self._build_prompt(text, existing_blocks, intent)
+            span.set_attribute('prompt.chars', len(prompt))
+        return text, existing_blocks, prompt
+    
     def _build_prompt(self, text, existing_blocks, intent):
         """Build the prompt for Gemini."""
         prompt = """You are a text processing assistant that organizes unstructured text into clear, concise statement blocks.
@@ -103,17 +221,18 @@ Rules:
 - Preserve the speaker's intent and meaning
 - Remove filler words and fix grammar
 - Merge similar ideas from new text with existing blocks
-- Return ONLY a JSON array of strings, no explanation
+- Return ONLY a JSON object with the blocks, no explanation
 
 """
         if intent:
             prompt += f"Speaking context:\n\"{intent}\"\n\n"
         
         if existing_blocks:
-            prompt += f"Existing blocks:\n{json.dumps(existing_blocks, indent=2)}\n\n"
+            # Compact JSON: indentation only costs prompt tokens
+            prompt += f"Existing blocks:\n{json.dumps(existing_blocks, ensure_ascii=False)}\n\n"
         
         prompt += f"New text to process:\n\"{text}\"\n\n"
-        prompt += "Return a JSON array of processed statement blocks:"
+        prompt += "Return the processed statement blocks as {\"blocks\": [...]}:"
         
         return prompt
     
@@ -122,6 +241,10 @@ Rules:
         # Simple fallback: split by sentences and clean
         import re
         
+        span = tracing.current_span()
+        if span:
+            span.set_attribute('statement.fallback', True)
+        
         # Split into sentences
         sentences = re.split(r'[.!?]+', text)
         
@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for serving the statement-block service.
+
+    gunicorn app:app
+
+Requests spend nearly all of their time waiting on the model provider, so the
+default gevent workers run each request in a greenlet: while one waits on the
+network the worker serves the others, and a single process holds up to
+WORKER_CONNECTIONS requests in flight instead of one per thread. The provider
+clients are created once per worker and keep their connections alive across
+requests (see PROVIDER_MAX_CONNECTIONS in config.py).
+
+Set WORKER_CLASS=gthread (with THREADS) or sync where gevent is unavailable.
+"""
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = os.getenv('WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '1000'))
+threads = int(os.getenv('THREADS', '1'))
+keepalive = int(os.getenv('KEEPALIVE', '5'))
+
+# Provider calls are bounded by REQUEST_TIMEOUT; leave headroom for the fallback
+timeout = int(os.getenv('REQUEST_TIMEOUT', '30')) + 15
+graceful_timeout = 30
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+
+def post_worker_init(worker):
+    # gRPC (the Gemini client) blocks the whole worker unless switched to
+    # gevent's loop, after the stdlib is patched and before any channel exists
+    if worker_class == 'gevent':
+        try:
+            import grpc.experimental.gevent as grpc_gevent
+            grpc_gevent.init_gevent()
+        except ImportError:
+            pass
@@ -0,0 +1,117 @@
+"""
+Debounced ingest of live microphone transcripts.
+
+While the user speaks, the client posts a frame to POST /ingest for every
+partial transcript: the text not yet turned into blocks plus an increasing
+sequence number. Each frame request waits until the speaker pauses, and only
+then calls the model:
+
+- a final frame (end of an utterance, mic stopped) is processed at once
+- a frame ending a sentence is processed after INGEST_SENTENCE_PAUSE_MS
+  without a newer frame
+- any other frame after INGEST_DEBOUNCE_MS without a newer frame
+
+A newer frame supersedes the older ones: their requests return at once, and
+a model call already running for an older frame is cancelled between
+streamed chunks. A spoken paragraph therefore costs a call or two instead of
+one per partial transcript.
+
+The latest sequence number per session is kept in Redis so frames of one
+session may reach different workers; without Redis it is kept in memory.
+"""
+import logging
+import re
+import threading
+import time
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'statement-blocks:ingest:'
+POLL_INTERVAL = 0.05
+
+SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s*$')
+
+
+def ends_sentence(text):
+    return bool(SENTENCE_END.search(text or ''))
+
+
+class IngestCoordinator:
+    def __init__(self, client=None, ttl=3600):
+        self.client = client
+        self.ttl = ttl
+        self._latest = {}
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            client = redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            client.ping()
+            return cls(client, **kwargs)
+        except Exception as e:
+            logger.warning(f"Redis connection failed: {str(e)}. Ingest frames coordinated in memory.")
+            return cls(None, **kwargs)
+
+    def publish(self, session_id, seq):
+        """Record frame seq as the newest of the session unless a newer one was seen. Returns the newest."""
+        if self.client is None:
+            with self._condition:
+                latest = max(self._latest.get(session_id, -1), seq)
+                self._latest[session_id] = latest
+                self._condition.notify_all()
+                return latest
+        key = KEY_PREFIX + session_id
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    stored = pipe.get(key)
+                    latest = max(int(stored) if stored else -1, seq)
+                    pipe.multi()
+                    pipe.set(key, latest, ex=self.ttl)
+                    pipe.execute()
+                    return latest
+                except redis.WatchError:
+                    continue
+
+    def latest(self, session_id):
+        if self.client is None:
+            with self._condition:
+                return self._latest.get(session_id, -1)
+        stored = self.client.get(KEY_PREFIX + session_id)
+        return int(stored) if stored else -1
+
+    def superseded(self, session_id, seq):
+        return self.latest(session_id) > seq
+
+    def wait_superseded(self, session_id, seq, timeout):
+        """Wait up to timeout seconds for a newer frame. Returns True if one arrived."""
+        deadline = time.monotonic() + timeout
+        if self.client is None:
+            with self._condition:
+                while self._latest.get(session_id, -1) <= seq:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                return True
+        while time.monotonic() < deadline:
+            if self.superseded(session_id, seq):
+                return True
+            time.sleep(min(POLL_INTERVAL, max(0, deadline - time.monotonic())))
+        return self.superseded(session_id, seq)
+
+    def canceller(self, session_id, seq):
+        """A check for stream_text's cancelled that looks the newest frame up at most every POLL_INTERVAL."""
+        checked = [0.0, False]
+
+        def cancelled():
+            now = time.monotonic()
+            if not checked[1] and now - checked[0] >= POLL_INTERVAL:
+                checked[0] = now
+                checked[1] = self.superseded(session_id, seq)
+            return checked[1]
+        return cancelled
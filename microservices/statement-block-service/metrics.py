@@ -0,0 +1,97 @@
+"""
+In-process metrics in the Prometheus text format, served at GET /metrics.
+
+Counters and histograms live in the worker that recorded them, so with
+several gunicorn workers each scrape sees one worker's share. Components
+whose state is shared across workers (e.g. the Redis result cache) register
+a collector that reports the shared values instead.
+"""
+import threading
+from collections import defaultdict
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{k}="{str(v)}"' for k, v in sorted(labels))
+    return '{' + pairs + '}'
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(histogram['buckets']):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def register_collector(self, collector):
+        """collector() returns [(name, type, value, labels dict)] at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name in typed:
+                return
+            typed.add(name)
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(h, counts=list(h['counts']))) for key, h in self._histograms.items())
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f'{name}{_label_text(labels)} {value:g}')
+
+        for (name, labels), histogram in histograms:
+            header(name, 'histogram')
+            for bound, count in zip(histogram['buckets'], histogram['counts']):
+                lines.append(f'{name}_bucket{_label_text(labels + (("le", f"{bound:g}"),))} {count}')
+            lines.append(f'{name}_bucket{_label_text(labels + (("le", "+Inf"),))} {histogram["count"]}')
+            lines.append(f'{name}_sum{_label_text(labels)} {histogram["sum"]:.6f}')
+            lines.append(f'{name}_count{_label_text(labels)} {histogram["count"]}')
+
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception:
+                continue
+            for name, kind, value, labels in samples:
+                header(name, kind)
+                lines.append(f'{name}{_label_text(tuple(sorted(labels.items())))} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,121 @@
+"""
+Redis-backed cache of /process-text results.
+
+Entries are keyed by a hash of the normalized request (text, existing blocks,
+intent) together with everything that changes the model's answer: provider,
+model, temperature, max tokens and the prompt template version. Repeated
+submissions from the feedback editor are answered from Redis without a
+provider call.
+
+Entries expire after RESULT_CACHE_TTL seconds and the cache is capped at
+RESULT_CACHE_MAX_ENTRIES by evicting the oldest entries, tracked in a sorted
+set. Hit and miss counts are kept in Redis so they cover every worker.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'statement-blocks:result:'
+INDEX_KEY = KEY_PREFIX + 'index'
+STATS_KEY = KEY_PREFIX + 'stats'
+
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', (text or '')).strip()
+
+
+def cache_key(text, existing_blocks, intent, identity):
+    """Canonical hash of the request inputs and the processor identity."""
+    canonical = json.dumps({
+        'text': normalize_text(text),
+        'existing_blocks': [normalize_text(block) for block in (existing_blocks or [])],
+        'intent': normalize_text(intent),
+        'processor': identity,
+    }, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, client, ttl=86400, max_entries=10000, max_entry_bytes=65536):
+        self.client = client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Connect to Redis, returning None (cache disabled) if it is unreachable."""
+        try:
+            client = redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            client.ping()
+        except Exception as e:
+            logger.warning(f"Redis connection failed: {str(e)}. Result cache disabled.")
+            return None
+        logger.info("Result cache enabled with Redis")
+        return cls(client, **kwargs)
+
+    def get(self, key):
+        """Cached blocks for key, or None. Redis errors count as misses."""
+        try:
+            value = self.client.get(KEY_PREFIX + key)
+            self.client.hincrby(STATS_KEY, 'hits' if value is not None else 'misses', 1)
+        except redis.RedisError as e:
+            logger.warning(f"Result cache lookup failed: {str(e)}")
+            return None
+        if value is None:
+            return None
+        try:
+            return json.loads(value)['blocks']
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, key, blocks):
+        value = json.dumps({'blocks': blocks, 'cached_at': time.time()})
+        if len(value) > self.max_entry_bytes:
+            return False
+        now = time.time()
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(KEY_PREFIX + key, value, ex=self.ttl)
+            pipe.zadd(INDEX_KEY, {key: now})
+            # Expired entries leave Redis on their own; drop them from the index too
+            pipe.zremrangebyscore(INDEX_KEY, '-inf', now - self.ttl)
+            pipe.zcard(INDEX_KEY)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                self._evict(size - self.max_entries)
+        except redis.RedisError as e:
+            logger.warning(f"Result cache store failed: {str(e)}")
+            return False
+        return True
+
+    def _evict(self, count):
+        oldest = self.client.zrange(INDEX_KEY, 0, count - 1)
+        if not oldest:
+            return
+        pipe = self.client.pipeline()
+        pipe.delete(*[KEY_PREFIX + key.decode() for key in oldest])
+        pipe.zrem(INDEX_KEY, *oldest)
+        pipe.hincrby(STATS_KEY, 'evictions', len(oldest))
+        pipe.execute()
+
+    def stats(self):
+        stats = {k.decode(): int(v) for k, v in self.client.hgetall(STATS_KEY).items()}
+        stats['entries'] = self.client.zcard(INDEX_KEY)
+        return stats
+
+    def collect(self):
+        """Metrics collector reporting the cache totals shared by all workers."""
+        stats = self.stats()
+        return [
+            ('statement_result_cache_lookups_total', 'counter', stats.get('hits', 0), {'result': 'hit'}),
+            ('statement_result_cache_lookups_total', 'counter', stats.get('misses', 0), {'result': 'miss'}),
+            ('statement_result_cache_evictions_total', 'counter', stats.get('evictions', 0), {}),
+            ('statement_result_cache_entries', 'gauge', stats['entries'], {}),
+        ]
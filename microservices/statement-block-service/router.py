@@ -0,0 +1,254 @@
+"""
+Latency-aware routing between the Claude and Gemini processors.
+
+With MODEL_PROVIDER=router both processors stay live. A request goes to the
+provider that currently looks best: providers failing more than
+ROUTER_MAX_ERROR_RATE of their recent calls come last, the rest are ordered
+by their rolling p95 latency (ROUTER_PRIMARY first until there are enough
+samples). If the provider has not answered within its p95, the same request
+is sent to the next provider as well (a hedge). Whichever answers first is
+used and the other call is cancelled. A provider that fails starts the next
+one at once instead of waiting for the hedge.
+
+Calls go through the processors' stream_text, whose cancelled check closes
+the provider stream of the losing call. Latency and error rates are kept per
+worker over the last ROUTER_WINDOW calls; cancelled calls are not sampled.
+"""
+import contextvars
+import logging
+import math
+import queue
+import threading
+import time
+from collections import deque
+
+from config import Config
+from metrics import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('statement_provider_seconds', 'Latency of successful provider calls made by the router')
+metrics.describe('statement_router_attempts_total', 'Provider calls made by the router: won, lost (cancelled) or failed')
+metrics.describe('statement_router_hedges_total', 'Hedged requests by the provider they were sent to, and why')
+
+
+class ProviderStats:
+    """Rolling latency and error rate of one provider."""
+
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds=None, ok=True):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(seconds)
+
+    @property
+    def samples(self):
+        return len(self.latencies)
+
+    def percentile(self, q):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        return latencies[max(0, math.ceil(q * len(latencies)) - 1)]
+
+    def error_rate(self):
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ProviderRouter:
+    def __init__(self, providers, primary=None, window=200, min_samples=20,
+                 hedge_default=3.0, hedge_min=0.25, max_error_rate=0.2):
+        self.providers = dict(providers)
+        self.primary = primary if primary in self.providers else next(iter(self.providers))
+        self.stats = {name: ProviderStats(window) for name in self.providers}
+        self.min_samples = min_samples
+        self.hedge_default = hedge_default
+        self.hedge_min = hedge_min
+        self.max_error_rate = max_error_rate
+
+    @classmethod
+    def from_config(cls):
+        from cascade import processor_for
+        return cls(
+            {'claude': processor_for('claude'), 'gemini': processor_for('gemini')},
+            primary=Config.ROUTER_PRIMARY,
+            window=Config.ROUTER_WINDOW,
+            min_samples=Config.ROUTER_MIN_SAMPLES,
+            hedge_default=Config.ROUTER_HEDGE_DEFAULT_MS / 1000,
+            hedge_min=Config.ROUTER_HEDGE_MIN_MS / 1000,
+            max_error_rate=Config.ROUTER_MAX_ERROR_RATE
+        )
+
+    def cache_identity(self):
+        """Either provider may answer, so cached results depend on both."""
+        return {
+            'provider': 'router',
+            'providers': {name: provider.cache_identity() for name, provider in sorted(self.providers.items())}
+        }
+
+    def p95(self, name):
+        stats = self.stats[name]
+        return stats.percentile(0.95) if stats.samples >= self.min_samples else None
+
+    def ranked(self):
+        """Provider names in the order to try them."""
+        def rank(name):
+            p95 = self.p95(name)
+            return (self.stats[name].error_rate() > self.max_error_rate, p95 is None, p95 or 0, name != self.primary)
+        return sorted(self.providers, key=rank)
+
+    def hedge_delay(self, name):
+        """How long to wait for a provider before hedging: its p95, or a default until it has samples."""
+        p95 = self.p95(name)
+        return self.hedge_default if p95 is None else max(self.hedge_min, p95)
+
+    def collect(self):
+        """Metrics collector reporting the rolling numbers routing decisions are based on."""
+        samples = []
+        for name, stats in sorted(self.stats.items()):
+            p95 = stats.percentile(0.95)
+            if p95 is not None:
+                samples.append(('statement_router_p95_seconds', 'gauge', p95, {'provider': name}))
+            samples.append(('statement_router_error_rate', 'gauge', stats.error_rate(), {'provider': name}))
+        return samples
+
+    def process_text(self, text, existing_blocks=None, intent=None):
+        """Process text like the processors do, answered by whichever provider is first."""
+        for kind, value in self.stream_text(text, existing_blocks, intent):
+            if kind == 'done':
+                return value
+        return existing_blocks or []
+
+    def stream_text(self, text, existing_blocks=None, intent=None, cancelled=None):
+        """
+        Stream like the processors' stream_text, from whichever provider is first.
+
+        The first provider to send a block (or its final list) wins; blocks of
+        the other call are dropped and it is cancelled.
+        """
+        if not text or not text.strip():
+            yield 'done', existing_blocks or []
+            return
+
+        events = queue.Queue()
+        pending = self.ranked()
+        running = []
+        winner = None
+        failed_blocks = None
+        failed_reason = None
+        error = None
+
+        def start(reason):
+            name = pending.pop(0)
+            attempt = {'name': name, 'cancel': threading.Event(), 'start': time.perf_counter()}
+            running.append(attempt)
+            if reason:
+                metrics.inc('statement_router_hedges_total', provider=name, reason=reason)
+            stop = lambda: attempt['cancel'].is_set() or bool(cancelled and cancelled())
+            context = contextvars.copy_context()
+            threading.Thread(
+                target=context.run,
+                args=(self._attempt, attempt, stop, events, text, existing_blocks, intent),
+                daemon=True
+            ).start()
+            return time.perf_counter() + self.hedge_delay(name) if pending else None
+
+        def settle(attempt):
+            """attempt won: cancel the others."""
+            for other in running:
+                if other is not attempt and not other.get('failed'):
+                    other['cancel'].set()
+                    metrics.inc('statement_router_attempts_total', provider=other['name'], outcome='lost')
+
+        span = tracing.current_span()
+        hedge_at = start(None)
+        try:
+            while True:
+                timeout = None if winner or hedge_at is None else max(0, hedge_at - time.perf_counter())
+                try:
+                    attempt, kind, value, failed = events.get(timeout=timeout)
+                except queue.Empty:
+                    hedge_at = start('slow')
+                    continue
+
+                if kind == 'end':
+                    running.remove(attempt)
+                    if attempt is winner or (winner is None and not running and not pending):
+                        break
+                    continue
+                if winner is not None and attempt is not winner:
+                    continue
+
+                if kind == 'block':
+                    if winner is None:
+                        winner = attempt
+                        settle(attempt)
+                    yield kind, value
+                    continue
+
+                elapsed = time.perf_counter() - attempt['start']
+                if kind == 'done' and not failed:
+                    self.stats[attempt['name']].record(elapsed)
+                    metrics.observe('statement_provider_seconds', elapsed, provider=attempt['name'])
+                    metrics.inc('statement_router_attempts_total', provider=attempt['name'], outcome='won')
+                    if winner is None:
+                        winner = attempt
+                        settle(attempt)
+                    if span is not None:
+                        span.set_attribute('router.provider', attempt['name'])
+                    yield kind, value
+                    return
+
+                # Failed: fallback blocks or an exception
+                attempt['failed'] = True
+                self.stats[attempt['name']].record(ok=False)
+                metrics.inc('statement_router_attempts_total', provider=attempt['name'], outcome='failed')
+                if kind == 'done':
+                    failed_blocks, failed_reason = value, failed
+                else:
+                    error = value
+                if winner is attempt:
+                    # Blocks were already sent, so there is no switching providers
+                    break
+                if pending:
+                    hedge_at = start('failed')
+
+            if cancelled and cancelled():
+                return
+            if failed_blocks is None:
+                raise error or RuntimeError("No provider answered")
+            if span is not None:
+                span.set_attribute('statement.fallback', True)
+            yield 'fallback', failed_reason
+            yield 'done', failed_blocks
+        finally:
+            for attempt in running:
+                attempt['cancel'].set()
+
+    def _attempt(self, attempt, stop, events, text, existing_blocks, intent):
+        """Run one provider call, reporting (attempt, kind, value, fallback reason or None) events, then 'end'."""
+        name = attempt['name']
+        try:
+            with tracing.start_span('route_attempt', **{'router.provider': name}) as span:
+                fallback = None
+                for kind, value in self.providers[name].stream_text(text, existing_blocks, intent, cancelled=stop):
+                    # The processors announce fallback blocks before their 'done'
+                    if kind == 'fallback':
+                        fallback = value
+                        continue
+                    events.put((attempt, kind, value, fallback if kind == 'done' else None))
+                if stop():
+                    span.set_attribute('router.cancelled', True)
+        except Exception as e:
+            logger.error(f"Router call to {name} failed: {str(e)}")
+            events.put((attempt, 'error', e, 'error'))
+        finally:
+            events.put((attempt, 'end', None, None))
@@ -0,0 +1,213 @@
+"""
+In-memory near-duplicate cache for /process-text.
+
+Transcripts rarely repeat byte for byte, so the Redis result cache misses on
+a retried mic capture or a one-word correction. This cache vectorizes each
+processed text (hashed word and character trigram features, TF-IDF weighted
+with document frequencies of the cached texts) and looks up the most similar
+cached text for the same existing blocks, intent and processor. Above the
+similarity threshold the cached blocks are patched with a word diff between
+the two texts instead of calling the model. Edits that cannot be placed in
+the blocks unambiguously make the lookup a miss.
+
+The index lives in each worker process and evicts the least recently used
+entry once full.
+"""
+import difflib
+import logging
+import re
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 2048
+MAX_CHANGED_RATIO = 0.25
+MAX_EDITS = 4
+
+# Speech artifacts whose addition or removal never changes the blocks
+FILLER_WORDS = {'um', 'umm', 'uh', 'uhh', 'erm', 'er', 'ah', 'hmm', 'mm'}
+
+WORD_PATTERN = re.compile(r"[\w']+")
+
+
+def words(text):
+    return [word for word in WORD_PATTERN.findall((text or '').lower()) if word not in FILLER_WORDS]
+
+
+def features(text):
+    """Hashed term counts: words plus character trigrams, which absorb small transcription errors."""
+    counts = {}
+    for word in words(text):
+        tokens = [f'w:{word}']
+        padded = f' {word} '
+        tokens.extend(f'c:{padded[i:i + 3]}' for i in range(len(padded) - 2))
+        for token in tokens:
+            index = zlib.crc32(token.encode('utf-8')) % DIMENSIONS
+            counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+def _phrase_pattern(phrase):
+    return re.compile(r'\b' + r"[^\w']+".join(re.escape(word) for word in phrase) + r'\b', re.IGNORECASE)
+
+
+def _find_unique(blocks, phrase):
+    """(block index, match) of the only occurrence of phrase, else None."""
+    pattern = _phrase_pattern(phrase)
+    found = None
+    for i, block in enumerate(blocks):
+        for match in pattern.finditer(block):
+            if found is not None:
+                return None
+            found = (i, match)
+    return found
+
+
+def _tidy(block):
+    block = re.sub(r'\s{2,}', ' ', block)
+    block = re.sub(r'\s+([.,!?;:])', r'\1', block)
+    return block.strip()
+
+
+def reconcile(old_text, new_text, blocks):
+    """
+    Patch blocks produced for old_text so they reflect new_text.
+
+    Returns the patched blocks, or None when the difference is too large or an
+    edit cannot be located in the blocks unambiguously.
+    """
+    old_words, new_words = words(old_text), words(new_text)
+    opcodes = [op for op in difflib.SequenceMatcher(None, old_words, new_words, autojunk=False).get_opcodes()
+               if op[0] != 'equal']
+    if not opcodes:
+        return list(blocks)
+
+    changed = sum(max(i2 - i1, j2 - j1) for _, i1, i2, j1, j2 in opcodes)
+    if len(opcodes) > MAX_EDITS or changed > MAX_CHANGED_RATIO * max(len(old_words), 1):
+        return None
+
+    blocks = list(blocks)
+    for tag, i1, i2, j1, j2 in opcodes:
+        replacement = ' '.join(new_words[j1:j2])
+        if tag == 'delete' and not _phrase_pattern(old_words[i1:i2]).search(' '.join(blocks)):
+            # Already left out of the blocks, e.g. a word the model cleaned up
+            continue
+        if tag in ('replace', 'delete'):
+            located = _find_unique(blocks, old_words[i1:i2])
+            if located is None:
+                return None
+            index, match = located
+            if replacement and match.group()[0].isupper():
+                replacement = replacement[0].upper() + replacement[1:]
+        else:
+            # Insert after the preceding words, or else before the following ones
+            located = _find_unique(blocks, old_words[max(0, i1 - 2):i1]) if i1 > 0 else None
+            if located is not None:
+                index, match = located
+                replacement = match.group() + ' ' + replacement
+            else:
+                located = _find_unique(blocks, old_words[i1:i1 + 2]) if i1 < len(old_words) else None
+                if located is None:
+                    return None
+                index, match = located
+                following = match.group()
+                if following[0].isupper():
+                    replacement = replacement[0].upper() + replacement[1:]
+                    following = following[0].lower() + following[1:]
+                replacement = replacement + ' ' + following
+        block = blocks[index]
+        blocks[index] = _tidy(block[:match.start()] + replacement + block[match.end():])
+    return [block for block in blocks if block and WORD_PATTERN.search(block)]
+
+
+class SemanticCache:
+    """
+    Index of processed texts. The context passed to lookup() and add() is a hex
+    digest of everything besides the text that the blocks depend on; only texts
+    with the same context are compared.
+    """
+
+    def __init__(self, threshold=0.9, max_entries=1000, ttl=3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max_entries, DIMENSIONS), dtype=np.float32)
+        self._squares = np.zeros((max_entries, DIMENSIONS), dtype=np.float32)
+        self._contexts = np.zeros(max_entries, dtype=np.int64)
+        self._added = np.zeros(max_entries, dtype=np.float64)
+        self._document_frequency = np.zeros(DIMENSIONS, dtype=np.float32)
+        self._used = np.zeros(max_entries, dtype=bool)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._entries = [None] * max_entries
+
+    def __len__(self):
+        return int(self._used.sum())
+
+    def _vector(self, text):
+        vector = np.zeros(DIMENSIONS, dtype=np.float32)
+        for index, count in features(text).items():
+            vector[index] = 1 + np.log(count)
+        return vector
+
+    def _idf(self):
+        return np.log((1 + len(self)) / (1 + self._document_frequency)) + 1
+
+    @staticmethod
+    def _context_id(context):
+        return int(context[:15], 16)
+
+    def lookup(self, text, context):
+        """
+        (blocks, similarity) for the nearest cached text with the same context,
+        reconciled to text, or (None, similarity) when there is no usable match.
+        """
+        query = self._vector(text)
+        if not query.any():
+            return None, 0.0
+        now = time.time()
+        with self._lock:
+            candidates = self._used & (self._contexts == self._context_id(context)) & (now - self._added < self.ttl)
+            if not candidates.any():
+                return None, 0.0
+            # Cosine similarity of the TF-IDF weighted vectors, as matrix-vector products
+            idf = self._idf()
+            squared_idf = idf * idf
+            norms = np.sqrt(self._squares @ squared_idf) * np.sqrt((query * query) @ squared_idf)
+            similarities = np.where(candidates, (self._vectors @ (query * squared_idf)) / (norms + 1e-9), -1.0)
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                return None, similarity
+            entry = self._entries[slot]
+            self._last_used[slot] = now
+
+        blocks = reconcile(entry['text'], text, entry['blocks'])
+        return blocks, similarity
+
+    def add(self, text, context, blocks):
+        vector = self._vector(text)
+        if not vector.any():
+            return
+        with self._lock:
+            if self._used.all():
+                slot = int(np.argmin(self._last_used))
+                self._document_frequency -= self._vectors[slot] > 0
+            else:
+                slot = int(np.argmin(self._used))
+            self._vectors[slot] = vector
+            self._squares[slot] = vector * vector
+            self._contexts[slot] = self._context_id(context)
+            self._added[slot] = time.time()
+            self._document_frequency += vector > 0
+            self._used[slot] = True
+            self._last_used[slot] = time.time()
+            self._entries[slot] = {'text': text, 'blocks': list(blocks)}
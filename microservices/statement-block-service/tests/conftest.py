@@ -0,0 +1,5 @@
+import os
+
+# Tests must not answer from caches filled by earlier tests or a local Redis
+os.environ.setdefault('RESULT_CACHE_ENABLED', 'false')
+os.environ.setdefault('SEMANTIC_CACHE_ENABLED', 'false')
@@ -0,0 +1,12 @@
+"""Helpers for tests that mock a text processor's stream_text."""
+
+
+def streamed(blocks, fallback=None):
+    """side_effect for a mocked stream_text that answers with blocks, as fallback output if a reason is given."""
+    def stream_text(*args, **kwargs):
+        for block in blocks:
+            yield 'block', block
+        if fallback:
+            yield 'fallback', fallback
+        yield 'done', blocks
+    return stream_text
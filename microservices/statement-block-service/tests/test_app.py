@@ -3,6 +3,7 @@ import json
 from unittest.mock import patch, Mock
 from app import app
 from config import Config
+from tests.streams import streamed
 
 @pytest.fixture
 def client():
@@ -64,10 +65,10 @@ class TestProcessTextEndpoint:
     
     def test_process_text_success(self, client, mock_text_processor):
         """Test successful text processing."""
-        mock_text_processor.process_text.return_value = [
+        mock_text_processor.stream_text.side_effect = streamed([
             "This is the first statement.",
             "This is the second statement."
-        ]
+        ])
         
         response = client.post('/process-text',
             json={
@@ -151,10 +152,10 @@ class TestProcessTextEndpoint:
     
     def test_process_text_with_existing_blocks(self, client, mock_text_processor):
         """Test processing with existing blocks."""
-        mock_text_processor.process_text.return_value = [
+        mock_text_processor.stream_text.side_effect = streamed([
             "Updated first block.",
             "Existing second block."
-        ]
+        ])
         
         response = client.post('/process-text',
             json={
@@ -170,7 +171,7 @@ class TestProcessTextEndpoint:
     
     def test_process_text_empty_text(self, client, mock_text_processor):
         """Test processing empty text."""
-        mock_text_processor.process_text.return_value = ['Existing block.']
+        mock_text_processor.stream_text.side_effect = streamed(['Existing block.'])
         
         response = client.post('/process-text',
             json={
@@ -185,7 +186,7 @@ class TestProcessTextEndpoint:
     
     def test_process_text_exception_handling(self, client, mock_text_processor):
         """Test exception handling during processing."""
-        mock_text_processor.process_text.side_effect = Exception("Processing error")
+        mock_text_processor.stream_text.side_effect = Exception("Processing error")
         
         response = client.post('/process-text',
             json={
@@ -223,7 +224,7 @@ class TestRateLimiting:
     def test_rate_limiting_exceeded(self, client_with_rate_limiting, mock_text_processor):
         """Test rate limiting when exceeded."""
         # Make successful requests up to the limit
-        mock_text_processor.process_text.return_value = ["Test response"]
+        mock_text_processor.stream_text.side_effect = streamed(["Test response"])
         
         # First two requests should succeed
         for i in range(2):
@@ -245,7 +246,7 @@ class TestRateLimiting:
     @patch.object(Config, 'RATE_LIMIT_ENABLED', False)
     def test_rate_limiting_disabled(self, client, mock_text_processor):
         """Test that rate limiting can be disabled."""
-        mock_text_processor.process_text.return_value = ["Test response"]
+        mock_text_processor.stream_text.side_effect = streamed(["Test response"])
         
         # Make many requests - all should succeed when rate limiting is disabled
         for i in range(10):
@@ -0,0 +1,114 @@
+import pytest
+import json
+from unittest.mock import patch
+from app import app
+from block_sessions import BlockSessionStore, SessionConflict, diff_blocks
+from tests.streams import streamed
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_text_processor():
+    """Mock the text processor."""
+    with patch('app.text_processor') as mock:
+        mock.cache_identity.return_value = {'provider': 'test'}
+        yield mock
+
+def apply_ops(blocks, ops):
+    """Apply a patch the way clients do."""
+    blocks = [dict(block) for block in blocks]
+    for op in ops:
+        if op['op'] == 'delete':
+            blocks = [block for block in blocks if block['id'] != op['id']]
+        elif op['op'] == 'update':
+            next(block for block in blocks if block['id'] == op['id'])['text'] = op['text']
+        else:
+            index = 0 if op['after'] is None else [block['id'] for block in blocks].index(op['after']) + 1
+            blocks.insert(index, {'id': op['id'], 'text': op['text']})
+    return blocks
+
+class TestDiffBlocks:
+
+    @pytest.mark.parametrize('old, new', [
+        (['A.', 'B.'], ['A.', 'B2.', 'C.']),
+        (['A.', 'B.', 'C.'], ['C.', 'A.']),
+        (['A.'], ['Z.', 'A.']),
+        (['A.', 'B.'], []),
+        ([], ['A.', 'B.']),
+    ])
+    def test_ops_reproduce_new_blocks(self, old, new):
+        """Test applying the ops to the old blocks gives the new ones."""
+        session = {'next_id': 1, 'blocks': []}
+        diff_blocks(session, old)
+        before = list(session['blocks'])
+
+        ops = diff_blocks(session, new)
+
+        assert apply_ops(before, ops) == session['blocks']
+        assert [block['text'] for block in session['blocks']] == new
+
+    def test_unchanged_and_edited_blocks_keep_ids(self):
+        """Test block ids survive edits and new blocks get fresh ids."""
+        session = {'next_id': 1, 'blocks': []}
+        diff_blocks(session, ['A.', 'B.'])
+
+        ops = diff_blocks(session, ['A.', 'B2.', 'C.'])
+
+        assert [block['id'] for block in session['blocks']] == ['b1', 'b2', 'b3']
+        assert ops[0] == {'op': 'update', 'id': 'b2', 'text': 'B2.'}
+
+class TestSessionStore:
+
+    def test_versions_and_conflicts(self):
+        """Test saves advance the version and stale saves are rejected."""
+        store = BlockSessionStore()
+        session = store.create(['A.'])
+        assert session['version'] == 1
+
+        store.save(store.load(session['id']), 1)
+        with pytest.raises(SessionConflict):
+            store.save(session, 1)
+        assert store.load(session['id'])['version'] == 2
+
+class TestSessionEndpoint:
+
+    def test_session_flow(self, client, mock_text_processor):
+        """Test a session answers with ids, then with patches against the client's version."""
+        mock_text_processor.stream_text.side_effect = streamed(["A.", "B."])
+        first = json.loads(client.post('/process-text', json={'session_id': None, 'text': 'a b'}).data)
+
+        assert [block['text'] for block in first['blocks']] == ["A.", "B."]
+
+        mock_text_processor.stream_text.side_effect = streamed(["A.", "B.", "C."])
+        second = json.loads(client.post('/process-text', json={
+            'session_id': first['session_id'], 'base_version': first['version'], 'text': 'c'
+        }).data)
+
+        mock_text_processor.stream_text.assert_called_with('c', ["A.", "B."], '')
+        assert second['base_version'] == first['version']
+        assert apply_ops(first['blocks'], second['ops'])[-1]['text'] == "C."
+
+    def test_stale_version_conflicts(self, client, mock_text_processor):
+        """Test a client behind the session gets the current blocks back."""
+        mock_text_processor.stream_text.side_effect = streamed(["A."])
+        first = json.loads(client.post('/process-text', json={'session_id': None, 'text': 'a'}).data)
+        client.post('/process-text', json={'session_id': first['session_id'], 'text': 'b'})
+
+        response = client.post('/process-text', json={
+            'session_id': first['session_id'], 'base_version': first['version'], 'text': 'c'
+        })
+
+        assert response.status_code == 409
+        assert json.loads(response.data)['blocks'][0]['text'] == "A."
+
+    def test_unknown_session_requires_blocks(self, client, mock_text_processor):
+        """Test an expired session is reported so the client resends its blocks."""
+        response = client.post('/process-text', json={'session_id': 'abc123', 'text': 'a'})
+
+        assert response.status_code == 409
+        mock_text_processor.stream_text.assert_not_called()
@@ -0,0 +1,86 @@
+import pytest
+import tracing
+from cascade import ModelCascade, check_blocks
+from metrics import metrics
+
+TEXT = "um so the menu is really hard to find and the colors are way too bright"
+
+class StubTier:
+    """Local model answering with fixed blocks, or failing like the processors do."""
+
+    def __init__(self, blocks, fail=False):
+        self.blocks = blocks
+        self.fail = fail
+        self.calls = 0
+
+    def cache_identity(self):
+        return {'provider': 'stub'}
+
+    def stream_text(self, text, existing_blocks=None, intent=None, cancelled=None):
+        self.calls += 1
+        if self.fail:
+            yield 'fallback', 'error'
+        else:
+            for block in self.blocks:
+                yield 'block', block
+        yield 'done', self.blocks
+
+class TestCheckBlocks:
+
+    def test_good_blocks_pass(self):
+        """Test a faithful split passes every check."""
+        assert check_blocks(TEXT, [], ["The menu is hard to find.", "The colors are too bright."]) == []
+
+    @pytest.mark.parametrize('blocks, check', [
+        ([], 'blocks'),
+        (["Fine.", ""], 'blocks'),
+        (["The menu is hard."], 'coverage'),
+        (["The menu is hard. To find. The colors. Are too bright."], 'sentences'),
+        (["Menu.", "Hard.", "Find.", "Colors.", "Bright."], 'block_count'),
+    ])
+    def test_bad_blocks_fail(self, blocks, check):
+        """Test each check catches its kind of bad output."""
+        assert check in check_blocks(TEXT, [], blocks)
+
+    def test_existing_blocks_must_be_kept(self):
+        """Test dropping the existing blocks fails the coverage check."""
+        existing = ["Loading scenes takes far too long on Quest headsets.", "Uploads sometimes silently fail."]
+
+        assert 'coverage' in check_blocks("dark mode please", existing, ["Please add dark mode."])
+
+class TestModelCascade:
+
+    def test_fast_tier_answers_good_results(self):
+        """Test the larger model is not called when the fast result passes."""
+        fast = StubTier(["The menu is hard to find.", "The colors are too bright."])
+        strong = StubTier(["Strong."])
+        cascade = ModelCascade([('fast', fast), ('strong', strong)])
+
+        assert cascade.process_text(TEXT) == fast.blocks
+        assert strong.calls == 0
+
+    def test_failed_check_escalates(self):
+        """Test a result failing the checks is replaced by the next tier's."""
+        fast = StubTier(["The menu is hard."])
+        strong = StubTier(["The menu is hard to find.", "The colors are too bright."])
+        cascade = ModelCascade([('fast', fast), ('strong', strong)])
+        escalations = metrics.counter('statement_cascade_escalations_total', tier='fast', reason='coverage')
+
+        events = list(cascade.stream_text(TEXT))
+
+        # Blocks of the fast tier are never streamed
+        assert events == [('block', strong.blocks[0]), ('block', strong.blocks[1]), ('done', strong.blocks)]
+        assert metrics.counter('statement_cascade_escalations_total', tier='fast', reason='coverage') == escalations + 1
+
+    def test_fallback_escalates_and_last_tier_is_final(self):
+        """Test provider failures escalate and a failing last tier marks the request as fallback."""
+        fast = StubTier(["Fallback."], fail=True)
+        strong = StubTier(["Strong fallback."], fail=True)
+        cascade = ModelCascade([('fast', fast), ('strong', strong)])
+
+        with tracing.start_span('request') as span:
+            assert list(cascade.stream_text(TEXT)) == [('fallback', 'error'), ('done', ["Strong fallback."])]
+
+        assert strong.calls == 1
+        assert span.attributes['statement.fallback']
+        assert span.attributes['cascade.tier'] == 'strong'
@@ -0,0 +1,115 @@
+import pytest
+import json
+import time
+from unittest.mock import Mock, patch
+import deadline
+from app import app
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def claude():
+    """Claude processor with a mocked client."""
+    from claude_processor import ClaudeProcessor
+    with patch('claude_processor.Anthropic'):
+        yield ClaudeProcessor()
+
+@pytest.fixture
+def gemini():
+    """Gemini processor with a mocked model."""
+    from gemini_processor import GeminiProcessor
+    with patch('gemini_processor.genai'):
+        yield GeminiProcessor()
+
+@pytest.fixture
+def request_deadline():
+    """Run the test under a request deadline of the given seconds."""
+    tokens = []
+    yield lambda seconds: tokens.append(deadline.start(seconds))
+    for token in reversed(tokens):
+        deadline.clear(token)
+
+class TestDeadline:
+
+    def test_provider_timeout_is_remaining_budget(self, request_deadline):
+        """Test provider calls get the time left less the fallback reserve."""
+        assert deadline.provider_timeout('claude', 30) == 30
+
+        request_deadline(5)
+
+        assert 4.5 < deadline.provider_timeout('claude', 30) <= 5 - 0.2
+        assert deadline.provider_timeout('claude', 2) == 2
+
+    def test_too_little_budget_skips_provider(self, claude, request_deadline):
+        """Test the fallback answers at once when the deadline is too close."""
+        request_deadline(0.5)
+
+        blocks = claude.process_text("The menu is hard to find. The colors are too bright.")
+
+        assert blocks
+        claude.client.messages.create.assert_not_called()
+
+    def test_timeout_passed_to_sdk(self, claude, request_deadline):
+        """Test the SDK call is bounded by the request deadline."""
+        response = Mock()
+        response.content = [Mock(text='["Block."]')]
+        claude.client.messages.create.return_value = response
+        request_deadline(5)
+
+        assert claude.process_text("block") == ["Block."]
+        assert claude.client.messages.create.call_args.kwargs['timeout'] <= 5
+
+    def test_gemini_bounded_without_retries(self, gemini, request_deadline):
+        """Test Gemini calls get the deadline as timeout and no SDK retries on top of it."""
+        response = Mock()
+        response.text = '{"blocks": ["Block."]}'
+        gemini.model.generate_content.return_value = response
+        request_deadline(5)
+
+        assert gemini.process_text("block") == ["Block."]
+        request_options = gemini.model.generate_content.call_args.kwargs['request_options']
+        assert request_options['timeout'] <= 5
+        assert request_options['retry'] is None
+
+        gemini.model.generate_content.return_value = iter([])
+        list(gemini.stream_text("block"))
+        request_options = gemini.model.generate_content.call_args.kwargs['request_options']
+        assert request_options['timeout'] <= 5
+        assert request_options['retry'] is None
+
+    def test_stream_stops_at_deadline(self, claude, request_deadline):
+        """Test a stream still going at the deadline ends with fallback blocks."""
+        def slow_events():
+            yield Mock(type='input_json', partial_json='{"blocks": ["First.", ')
+            while True:
+                time.sleep(0.05)
+                yield Mock(type='input_json', partial_json=' ')
+        stream = slow_events()
+        claude.client.messages.stream.return_value.__enter__ = Mock(return_value=stream)
+        claude.client.messages.stream.return_value.__exit__ = Mock(return_value=False)
+        request_deadline(1.5)
+
+        start = time.monotonic()
+        with patch('deadline.Config.MIN_PROVIDER_BUDGET_MS', 100):
+            events = list(claude.stream_text("First. Second."))
+
+        assert time.monotonic() - start < 1.5
+        assert events[0] == ('block', 'First.')
+        assert events[-2] == ('fallback', 'deadline')
+        assert events[-1][0] == 'done'
+
+    def test_client_timeout_header(self, client):
+        """Test X-Request-Timeout-Ms shortens the request deadline."""
+        budgets = []
+        with patch('app.text_processor') as mock_processor:
+            mock_processor.stream_text.side_effect = lambda *args: budgets.append(deadline.remaining()) or iter([('done', ["Block."])])
+            response = client.post('/process-text', json={'text': 'block'}, headers={'X-Request-Timeout-Ms': '2000'})
+
+        assert response.status_code == 200
+        assert 0 < budgets[0] <= 2
+        assert deadline.remaining() is None
@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import Mock, patch
 from gemini_processor import GeminiProcessor
+from metrics import metrics
+from utils import BLOCKS_SCHEMA
 
 class TestGeminiProcessor:
     
@@ -78,7 +80,7 @@ class TestGeminiProcessor:
         
         assert "New text" in prompt
         assert "Existing block" in prompt
-        assert "JSON array" in prompt
+        assert '"blocks"' in prompt
     
     def test_max_blocks_limit(self, processor):
         """Test that response is limited to MAX_BLOCKS."""
@@ -90,4 +92,20 @@ class TestGeminiProcessor:
         
         with patch('config.Config.MAX_BLOCKS', 10):
             result = processor.process_text("Generate many blocks")
-            assert len(result) <= 10
\ No newline at end of file
+            assert len(result) <= 10
+    
+    def test_process_text_json_mode(self, processor):
+        """Test Gemini is asked for BLOCKS_SCHEMA JSON and its answer read as structured output."""
+        mock_response = Mock()
+        mock_response.text = '{"blocks": ["First.", "Second."]}'
+        processor.model.generate_content.return_value = mock_response
+        structured = metrics.counter('statement_parse_path_total', provider='gemini', path='structured')
+        
+        result = processor.process_text("first and second")
+        
+        assert result == ["First.", "Second."]
+        generation_config = processor.model.generate_content.call_args.kwargs['generation_config']
+        assert generation_config.response_mime_type == 'application/json'
+        assert generation_config.response_schema == BLOCKS_SCHEMA
+        assert metrics.counter('statement_parse_path_total', provider='gemini', path='structured') == structured + 1
+
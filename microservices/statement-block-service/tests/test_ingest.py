@@ -0,0 +1,103 @@
+import pytest
+import json
+import threading
+import time
+from unittest.mock import patch
+from app import app
+from ingest import IngestCoordinator, ends_sentence
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_text_processor():
+    """Mock the text processor."""
+    with patch('app.text_processor') as mock, patch('app.ingest', IngestCoordinator()), \
+            patch('app.Config.INGEST_DEBOUNCE_MS', 300), patch('app.Config.INGEST_SENTENCE_PAUSE_MS', 100):
+        yield mock
+
+def post_frame(seq, text, final=False, **fields):
+    with app.test_client() as client:
+        response = client.post('/ingest', json=dict(fields, stream_id='mic1', seq=seq, text=text, final=final))
+        return response.status_code, json.loads(response.data)
+
+class TestIngestCoordinator:
+
+    def test_ends_sentence(self):
+        """Test sentence ends are recognized, also before closing quotes."""
+        assert ends_sentence("It is too bright.")
+        assert ends_sentence('He said "stop!" ')
+        assert not ends_sentence("and the colors are")
+
+    def test_newer_frame_supersedes(self):
+        """Test waiting ends as soon as a newer frame is published."""
+        coordinator = IngestCoordinator()
+        coordinator.publish('s', 1)
+        threading.Timer(0.05, coordinator.publish, ('s', 2)).start()
+
+        start = time.monotonic()
+        assert coordinator.wait_superseded('s', 1, 2)
+        assert time.monotonic() - start < 1
+        assert not coordinator.wait_superseded('s', 2, 0.05)
+        assert coordinator.publish('s', 1) == 2
+
+class TestIngestEndpoint:
+
+    def test_final_frame_is_processed(self, client, mock_text_processor):
+        """Test a final frame is processed without waiting."""
+        mock_text_processor.stream_text.return_value = iter([('block', 'Too bright.'), ('done', ['Too bright.'])])
+
+        status, body = post_frame(1, "the colors are too bright", final=True)
+
+        assert status == 200
+        assert body == {'status': 'processed', 'seq': 1, 'blocks': ['Too bright.']}
+
+    def test_partial_frames_are_debounced(self, client, mock_text_processor):
+        """Test frames followed by newer ones are superseded and only the last is processed."""
+        mock_text_processor.stream_text.return_value = iter([('done', ['The menu is hard to find.'])])
+        results = {}
+
+        def send(seq, text):
+            results[seq] = post_frame(seq, text)
+        threads = []
+        for seq, text in enumerate(["the menu", "the menu is hard", "the menu is hard to find"]):
+            threads.append(threading.Thread(target=send, args=(seq, text)))
+            threads[-1].start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+
+        assert [results[seq][1]['status'] for seq in range(3)] == ['superseded', 'superseded', 'processed']
+        mock_text_processor.stream_text.assert_called_once()
+        assert mock_text_processor.stream_text.call_args[0][0] == "the menu is hard to find"
+
+    def test_in_flight_call_is_cancelled(self, client, mock_text_processor):
+        """Test a newer frame cancels the model call of an older one."""
+        def slow_stream(text, existing_blocks, intent, cancelled=None):
+            for _ in range(100):
+                if cancelled():
+                    return
+                time.sleep(0.01)
+            yield 'done', [text]
+        mock_text_processor.stream_text.side_effect = slow_stream
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(first=post_frame(1, "first part", final=True)))
+        thread.start()
+        time.sleep(0.1)
+
+        second = post_frame(2, "first part and more", final=True)
+        thread.join()
+
+        assert result['first'][1]['status'] == 'superseded'
+        assert second[1]['status'] == 'processed'
+
+    def test_frame_requires_stream_and_seq(self, client, mock_text_processor):
+        """Test frames without a stream id or sequence number are rejected."""
+        response = client.post('/ingest', json={'text': 'hello'})
+
+        assert response.status_code == 400
+        mock_text_processor.stream_text.assert_not_called()
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import Mock, patch
 from claude_processor import ClaudeProcessor
 from anthropic import APIError, APITimeoutError
+from metrics import metrics
 
 class TestClaudeProcessor:
     
@@ -89,7 +90,7 @@ class TestClaudeProcessor:
         
         assert "New text" in prompt
         assert "Existing block" in prompt
-        assert "JSON array" in prompt
+        assert "submit_statement_blocks" in prompt
     
     def test_max_blocks_limit(self, processor):
         """Test that response is limited to MAX_BLOCKS."""
@@ -101,4 +102,29 @@ class TestClaudeProcessor:
         
         with patch('config.Config.MAX_BLOCKS', 10):
             result = processor.process_text("Generate many blocks")
-            assert len(result) <= 10
\ No newline at end of file
+            assert len(result) <= 10
+    
+    def test_process_text_tool_use(self, processor):
+        """Test blocks are read from the forced tool call."""
+        mock_response = Mock()
+        mock_response.content = [Mock(type='tool_use', input={'blocks': ["First.", " ", "Second."]})]
+        processor.client.messages.create.return_value = mock_response
+        structured = metrics.counter('statement_parse_path_total', provider='claude', path='structured')
+        
+        result = processor.process_text("first and second")
+        
+        assert result == ["First.", "Second."]
+        assert processor.client.messages.create.call_args.kwargs['tool_choice']['name'] == 'submit_statement_blocks'
+        assert metrics.counter('statement_parse_path_total', provider='claude', path='structured') == structured + 1
+    
+    def test_process_text_without_tool_use(self, processor):
+        """Test a text answer still goes through the legacy parser."""
+        mock_response = Mock()
+        mock_response.content = [Mock(type='text', text='Here you go: ["First.", "Second."]')]
+        processor.client.messages.create.return_value = mock_response
+        legacy = metrics.counter('statement_parse_path_total', provider='claude', path='legacy')
+        
+        result = processor.process_text("first and second")
+        
+        assert result == ["First.", "Second."]
+        assert metrics.counter('statement_parse_path_total', provider='claude', path='legacy') == legacy + 1
@@ -0,0 +1,144 @@
+import pytest
+import json
+from unittest.mock import Mock, patch
+from app import app
+from metrics import Metrics
+from result_cache import cache_key
+from tests.streams import streamed
+
+IDENTITY = {'provider': 'claude', 'model': 'm', 'temperature': 0.3, 'max_tokens': 4096, 'prompt_version': 1}
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_text_processor():
+    """Mock the text processor."""
+    with patch('app.text_processor') as mock:
+        mock.cache_identity.return_value = IDENTITY
+        yield mock
+
+@pytest.fixture
+def mock_cache():
+    """Mock an enabled result cache."""
+    with patch('app.result_cache') as mock:
+        yield mock
+
+class TestCacheKey:
+
+    def test_whitespace_is_normalized(self):
+        """Test keys ignore insignificant whitespace."""
+        assert cache_key('Hello  there ', ['A  block'], ' intent', IDENTITY) == \
+            cache_key('Hello there', ['A block'], 'intent', IDENTITY)
+
+    def test_inputs_and_model_change_the_key(self):
+        """Test every input and processor setting is part of the key."""
+        base = cache_key('Hello', ['A'], 'intent', IDENTITY)
+        assert cache_key('Hello!', ['A'], 'intent', IDENTITY) != base
+        assert cache_key('Hello', ['A', 'B'], 'intent', IDENTITY) != base
+        assert cache_key('Hello', ['A'], 'other', IDENTITY) != base
+        assert cache_key('Hello', ['A'], 'intent', dict(IDENTITY, model='other')) != base
+        assert cache_key('Hello', ['A'], 'intent', dict(IDENTITY, prompt_version=2)) != base
+
+class TestCachedEndpoint:
+
+    def test_hit_skips_processor(self, client, mock_text_processor, mock_cache):
+        """Test a cache hit is returned without calling the model."""
+        mock_cache.get.return_value = ["Cached block."]
+
+        response = client.post('/process-text', json={'text': 'some text'})
+
+        assert response.status_code == 200
+        assert json.loads(response.data)['blocks'] == ["Cached block."]
+        assert response.headers['X-Cache'] == 'HIT'
+        mock_text_processor.stream_text.assert_not_called()
+
+    def test_miss_stores_result(self, client, mock_text_processor, mock_cache):
+        """Test a miss calls the model and caches its blocks."""
+        mock_cache.get.return_value = None
+        mock_text_processor.stream_text.side_effect = streamed(["Fresh block."])
+
+        response = client.post('/process-text', json={'text': 'some text'})
+
+        assert response.headers['X-Cache'] == 'MISS'
+        key = cache_key('some text', [], '', IDENTITY)
+        mock_cache.set.assert_called_once_with(key, ["Fresh block."])
+
+    def test_bypass_header_skips_lookup(self, client, mock_text_processor, mock_cache):
+        """Test clients can force a fresh result."""
+        mock_text_processor.stream_text.side_effect = streamed(["Fresh block."])
+
+        response = client.post('/process-text', json={'text': 'some text'}, headers={'X-Cache-Bypass': '1'})
+
+        assert response.headers['X-Cache'] == 'BYPASS'
+        mock_cache.get.assert_not_called()
+        mock_cache.set.assert_called_once()
+
+class TestFallbackNotCached:
+
+    @pytest.fixture
+    def mock_semantic_cache(self):
+        """Mock an enabled semantic cache."""
+        with patch('app.semantic_cache') as mock:
+            mock.lookup.return_value = (None, 0.0)
+            mock.threshold = 0.9
+            yield mock
+
+    def test_fallback_blocks_not_cached(self, client, mock_text_processor, mock_cache, mock_semantic_cache):
+        """Test blocks announced as fallback output are returned but kept out of both caches."""
+        mock_cache.get.return_value = None
+        mock_text_processor.stream_text.side_effect = streamed(["Fallback block."], fallback='deadline')
+
+        response = client.post('/process-text', json={'text': 'some text'})
+
+        assert json.loads(response.data)['blocks'] == ["Fallback block."]
+        mock_cache.set.assert_not_called()
+        mock_semantic_cache.add.assert_not_called()
+
+    def test_streamed_fallback_blocks_not_cached(self, client, mock_text_processor, mock_cache, mock_semantic_cache):
+        """Test the stream endpoint skips the caches after a ('fallback', reason) event."""
+        mock_cache.get.return_value = None
+        mock_text_processor.stream_text.side_effect = streamed(["Fallback block."], fallback='error')
+
+        response = client.post('/process-text/stream', json={'text': 'some text'})
+
+        messages = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert messages[-1]['blocks'] == ["Fallback block."]
+        mock_cache.set.assert_not_called()
+        mock_semantic_cache.add.assert_not_called()
+
+    def test_model_blocks_cached_in_both(self, client, mock_text_processor, mock_cache, mock_semantic_cache):
+        mock_cache.get.return_value = None
+        mock_text_processor.stream_text.side_effect = streamed(["Fresh block."])
+
+        client.post('/process-text', json={'text': 'some text'})
+
+        mock_cache.set.assert_called_once()
+        mock_semantic_cache.add.assert_called_once()
+
+class TestMetrics:
+
+    def test_render_counters_and_histograms(self):
+        """Test the Prometheus text output."""
+        registry = Metrics()
+        registry.inc('requests_total', cache='hit')
+        registry.inc('requests_total', cache='hit')
+        registry.observe('latency_seconds', 0.02, buckets=(0.01, 0.1))
+
+        text = registry.render()
+
+        assert 'requests_total{cache="hit"} 2' in text
+        assert 'latency_seconds_bucket{le="0.01"} 0' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_count 1' in text
+
+    def test_metrics_endpoint(self, client):
+        """Test the metrics endpoint serves text."""
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
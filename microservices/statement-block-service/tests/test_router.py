@@ -0,0 +1,117 @@
+import pytest
+import time
+import tracing
+from router import ProviderRouter, ProviderStats
+
+class StubProvider:
+    """Local provider answering after delay seconds, or failing like the processors do."""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = False
+
+    def cache_identity(self):
+        return {'provider': self.name}
+
+    def stream_text(self, text, existing_blocks=None, intent=None, cancelled=None):
+        self.calls += 1
+        deadline = time.monotonic() + self.delay
+        while time.monotonic() < deadline:
+            if cancelled and cancelled():
+                self.cancelled = True
+                return
+            time.sleep(0.005)
+        if self.fail:
+            yield 'fallback', 'error'
+            yield 'done', ['Fallback.']
+            return
+        yield 'block', f"{self.name}."
+        yield 'done', [f"{self.name}."]
+
+def make_router(primary, secondary, **kwargs):
+    kwargs.setdefault('hedge_default', 0.1)
+    kwargs.setdefault('min_samples', 3)
+    return ProviderRouter({primary.name: primary, secondary.name: secondary}, primary=primary.name, **kwargs)
+
+class TestProviderStats:
+
+    def test_percentile_and_error_rate(self):
+        """Test the rolling p95 and error rate cover the window."""
+        stats = ProviderStats(window=20)
+        for i in range(1, 21):
+            stats.record(i / 10)
+        stats.record(ok=False)
+
+        assert stats.percentile(0.95) == 1.9
+        assert stats.error_rate() == pytest.approx(1 / 20)
+
+class TestProviderRouter:
+
+    def test_fast_primary_is_not_hedged(self):
+        """Test a primary answering within its hedge delay is the only call."""
+        primary, secondary = StubProvider('claude'), StubProvider('gemini')
+        router = make_router(primary, secondary)
+
+        assert router.process_text("some text") == ["claude."]
+        assert secondary.calls == 0
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        """Test the hedge answers first and the slow call is cancelled."""
+        primary, secondary = StubProvider('claude', delay=2), StubProvider('gemini', delay=0.02)
+        router = make_router(primary, secondary)
+
+        start = time.monotonic()
+        events = list(router.stream_text("some text"))
+
+        assert events == [('block', 'gemini.'), ('done', ['gemini.'])]
+        assert time.monotonic() - start < 1
+        time.sleep(0.05)
+        assert primary.cancelled
+
+    def test_failure_starts_next_provider_at_once(self):
+        """Test a failed call does not wait for the hedge delay."""
+        primary, secondary = StubProvider('claude', fail=True), StubProvider('gemini')
+        router = make_router(primary, secondary, hedge_default=5)
+
+        start = time.monotonic()
+        assert router.process_text("some text") == ["gemini."]
+        assert time.monotonic() - start < 1
+        assert router.stats['claude'].error_rate() == 1.0
+
+    def test_all_failing_returns_fallback(self):
+        """Test fallback blocks are returned and marked when every provider fails."""
+        router = make_router(StubProvider('claude', fail=True), StubProvider('gemini', fail=True))
+
+        with tracing.start_span('request') as span:
+            events = list(router.stream_text("some text"))
+        assert events == [('fallback', 'error'), ('done', ["Fallback."])]
+        assert span.attributes['statement.fallback']
+
+    def test_faster_and_healthier_provider_goes_first(self):
+        """Test routing follows the rolling latency and error rates."""
+        router = make_router(StubProvider('claude'), StubProvider('gemini'))
+        assert router.ranked() == ['claude', 'gemini']
+
+        for _ in range(3):
+            router.stats['claude'].record(2.0)
+            router.stats['gemini'].record(0.5)
+        assert router.ranked() == ['gemini', 'claude']
+        assert router.hedge_delay('gemini') == 0.5
+
+        for _ in range(3):
+            router.stats['gemini'].record(ok=False)
+        assert router.ranked() == ['claude', 'gemini']
+
+    def test_outer_cancellation(self):
+        """Test cancelling the routed call cancels the provider calls without an answer."""
+        primary = StubProvider('claude', delay=2)
+        router = make_router(primary, StubProvider('gemini', delay=2))
+        start = time.monotonic()
+
+        events = list(router.stream_text("some text", cancelled=lambda: time.monotonic() - start > 0.2))
+
+        assert events == []
+        assert primary.cancelled
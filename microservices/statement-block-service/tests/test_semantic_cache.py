@@ -0,0 +1,97 @@
+import pytest
+import json
+from unittest.mock import patch
+from app import app
+from result_cache import cache_key
+from semantic_cache import SemanticCache, reconcile
+from tests.streams import streamed
+
+OLD_TEXT = "um so the menu is really hard to find and the colors are too bright"
+OLD_BLOCKS = ["The menu is really hard to find.", "The colors are too bright."]
+CONTEXT = cache_key('', [], '', {'provider': 'test'})
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_text_processor():
+    """Mock the text processor."""
+    with patch('app.text_processor') as mock:
+        mock.cache_identity.return_value = {'provider': 'test'}
+        yield mock
+
+class TestReconcile:
+
+    def test_word_correction_is_patched(self):
+        """Test a corrected word replaces its counterpart in the blocks."""
+        new_text = "so the menu is really hard to find and the colours are too bright"
+        assert reconcile(OLD_TEXT, new_text, OLD_BLOCKS) == \
+            ["The menu is really hard to find.", "The colours are too bright."]
+
+    def test_inserted_words_are_placed(self):
+        """Test an added word is inserted next to its neighbours."""
+        new_text = "so the settings menu is really hard to find and the colors are too bright"
+        assert reconcile(OLD_TEXT, new_text, OLD_BLOCKS)[0] == "The settings menu is really hard to find."
+
+    def test_filler_only_changes_keep_blocks(self):
+        """Test speech artifacts do not change the blocks."""
+        new_text = "so the menu is uh really hard to find and the colors are too bright"
+        assert reconcile(OLD_TEXT, new_text, OLD_BLOCKS) == OLD_BLOCKS
+
+    def test_unplaceable_or_large_changes_fail(self):
+        """Test ambiguous or large edits are left to the model."""
+        assert reconcile(OLD_TEXT, "so menu is really hard to find and the colors are too bright", OLD_BLOCKS) is None
+        assert reconcile(OLD_TEXT, "I would like a pizza with extra cheese please", OLD_BLOCKS) is None
+
+class TestSemanticCache:
+
+    def test_lookup_finds_near_duplicate(self):
+        """Test a near-identical text in the same context is reconciled."""
+        cache = SemanticCache(threshold=0.8)
+        cache.add(OLD_TEXT, CONTEXT, OLD_BLOCKS)
+        cache.add("the weather today is lovely and warm", CONTEXT, ["The weather is lovely."])
+
+        blocks, similarity = cache.lookup("so the menu is really hard to find and the colours are too bright", CONTEXT)
+
+        assert similarity >= 0.8
+        assert blocks == ["The menu is really hard to find.", "The colours are too bright."]
+
+    def test_lookup_respects_context_and_threshold(self):
+        """Test other contexts and dissimilar texts miss."""
+        cache = SemanticCache(threshold=0.8)
+        cache.add(OLD_TEXT, CONTEXT, OLD_BLOCKS)
+
+        assert cache.lookup(OLD_TEXT, cache_key('', ['A block'], '', {'provider': 'test'}))[0] is None
+        blocks, similarity = cache.lookup("a completely different sentence about pizza", CONTEXT)
+        assert blocks is None and similarity < 0.8
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the index stays within its capacity."""
+        cache = SemanticCache(threshold=0.8, max_entries=2)
+        cache.add(OLD_TEXT, CONTEXT, OLD_BLOCKS)
+        cache.add("the weather today is lovely and warm", CONTEXT, ["The weather is lovely."])
+        cache.lookup(OLD_TEXT, CONTEXT)
+        cache.add("a third sentence about something else", CONTEXT, ["Something else."])
+
+        assert len(cache) == 2
+        assert cache.lookup(OLD_TEXT, CONTEXT)[0] == OLD_BLOCKS
+        assert cache.lookup("the weather today is lovely and warm", CONTEXT)[0] is None
+
+class TestNearDuplicateEndpoint:
+
+    def test_near_duplicate_skips_processor(self, client, mock_text_processor):
+        """Test a retried capture is answered without calling the model."""
+        mock_text_processor.stream_text.side_effect = streamed(OLD_BLOCKS)
+        with patch('app.semantic_cache', SemanticCache(threshold=0.8)):
+            first = client.post('/process-text', json={'text': OLD_TEXT})
+            second = client.post('/process-text',
+                json={'text': "so the menu is really hard to find and the colours are too bright"})
+
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'NEAR'
+        assert json.loads(second.data)['blocks'][1] == "The colours are too bright."
+        assert mock_text_processor.stream_text.call_count == 1
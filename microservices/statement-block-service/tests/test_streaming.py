@@ -0,0 +1,94 @@
+import pytest
+import json
+from unittest.mock import Mock, patch
+from app import app
+from utils import IncrementalBlockParser
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def feed_in_chunks(text, size):
+    parser = IncrementalBlockParser()
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.append(parser.feed(text[i:i + size]))
+    return parser, emitted
+
+class TestIncrementalBlockParser:
+
+    def test_blocks_emitted_when_literal_closes(self):
+        """Test each block is returned by the chunk that closes it."""
+        parser, emitted = feed_in_chunks('["First block.", "Second block."]', 5)
+
+        assert [blocks for blocks in emitted if blocks] == [["First block."], ["Second block."]]
+        assert parser.complete
+
+    def test_preamble_escapes_and_nested_values(self):
+        """Test code fences, escapes and non-string items are handled."""
+        text = 'Here you go:\n```json\n["Say \\"hi\\" [now].", {"x": "skip"}, 3, "Caf\\u00e9."]\n```'
+        parser, _ = feed_in_chunks(text, 3)
+
+        assert parser.blocks == ['Say "hi" [now].', 'Café.']
+        assert parser.complete
+
+    def test_truncated_array_keeps_closed_blocks(self):
+        """Test an unfinished response keeps the blocks completed so far."""
+        parser, _ = feed_in_chunks('["Complete.", "Cut of', 4)
+
+        assert parser.blocks == ["Complete."]
+        assert not parser.complete
+
+class TestStreamEndpoint:
+
+    def test_stream_sends_blocks_then_done(self, client):
+        """Test the NDJSON stream sends each block and the final list."""
+        with patch('app.text_processor') as mock_processor:
+            mock_processor.stream_text.return_value = iter([
+                ('block', 'One.'), ('block', 'Two.'), ('done', ['One.', 'Two.'])
+            ])
+            response = client.post('/process-text/stream', json={'text': 'one two'})
+            messages = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert messages[0] == {'type': 'block', 'index': 0, 'text': 'One.'}
+        assert messages[1]['index'] == 1
+        assert messages[2]['type'] == 'done'
+        assert messages[2]['blocks'] == ['One.', 'Two.']
+
+    def test_stream_validation_error(self, client):
+        """Test invalid requests fail before the stream starts."""
+        response = client.post('/process-text/stream', json={'existing_blocks': []})
+
+        assert response.status_code == 400
+
+    def test_claude_stream_text(self):
+        """Test the Claude processor streams blocks from the tool input."""
+        from claude_processor import ClaudeProcessor
+        with patch('claude_processor.Anthropic'):
+            processor = ClaudeProcessor()
+        chunks = ['{"blocks": ["Fir', 'st.", "Sec', 'ond."]}']
+        stream = iter([Mock(type='message_start')] + [Mock(type='input_json', partial_json=chunk) for chunk in chunks])
+        processor.client.messages.stream.return_value.__enter__ = Mock(return_value=stream)
+        processor.client.messages.stream.return_value.__exit__ = Mock(return_value=False)
+
+        events = list(processor.stream_text("first and second"))
+
+        assert events == [('block', 'First.'), ('block', 'Second.'), ('done', ['First.', 'Second.'])]
+
+    def test_claude_stream_failure_uses_fallback(self):
+        """Test a failed stream ends with fallback blocks."""
+        from claude_processor import ClaudeProcessor
+        with patch('claude_processor.Anthropic'):
+            processor = ClaudeProcessor()
+        processor.client.messages.stream.side_effect = Exception("API Error")
+
+        events = list(processor.stream_text("Hello world. This is a test."))
+
+        assert events[-2] == ('fallback', 'error')
+        assert events[-1][0] == 'done'
+        assert events[-1][1]
@@ -0,0 +1,113 @@
+import pytest
+import json
+from unittest.mock import Mock, patch
+import tracing
+from app import app
+from config import Config
+from tests.streams import streamed
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+@pytest.fixture
+def span_log(tmp_path):
+    """Export spans to a JSON-lines file for the duration of a test."""
+    path = tmp_path / 'spans.jsonl'
+    tracing.configure('test-service', log_path=str(path))
+    yield path
+    tracing.configure('test-service')
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+class TestTraceparent:
+
+    def test_parse_valid_header(self):
+        """Test a valid traceparent is parsed into its parts."""
+        assert tracing.parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-01') == (TRACE_ID, PARENT_ID, True)
+        assert tracing.parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-00') == (TRACE_ID, PARENT_ID, False)
+
+    def test_parse_invalid_headers(self):
+        """Test malformed or all-zero headers are ignored."""
+        assert tracing.parse_traceparent(None) is None
+        assert tracing.parse_traceparent('garbage') is None
+        assert tracing.parse_traceparent(f'00-{"0" * 32}-{PARENT_ID}-01') is None
+        assert tracing.parse_traceparent(f'00-{TRACE_ID}-{"0" * 16}-01') is None
+
+    def test_child_spans_join_parent_trace(self, span_log):
+        """Test nested spans share the incoming trace id and link to their parents."""
+        with tracing.start_span('root', f'00-{TRACE_ID}-{PARENT_ID}-01') as root:
+            with tracing.start_span('child') as child:
+                assert tracing.current_traceparent() == f'00-{TRACE_ID}-{child.span_id}-01'
+
+        spans = {span['name']: span for span in read_spans(span_log)}
+        assert spans['root']['trace_id'] == TRACE_ID
+        assert spans['root']['parent_id'] == PARENT_ID
+        assert spans['child']['parent_id'] == root.span_id
+        assert tracing.current_span() is None
+
+    def test_unsampled_parent_is_not_exported(self, span_log):
+        """Test the sampled flag of the caller is respected."""
+        with tracing.start_span('root', f'00-{TRACE_ID}-{PARENT_ID}-00'):
+            pass
+        assert not span_log.exists()
+
+    def test_new_trace_sampled_without_exporter(self):
+        """Test a service that does not export still starts sampled traces for the services it calls."""
+        tracing.configure('test-service', sample_ratio=1.0)
+        with tracing.start_span('root') as span:
+            assert span.traceparent.endswith('-01')
+
+        tracing.configure('test-service', sample_ratio=0.0)
+        with tracing.start_span('root') as span:
+            assert span.traceparent.endswith('-00')
+        tracing.configure('test-service')
+
+    def test_exception_marks_span_as_error(self, span_log):
+        """Test exceptions are recorded on the span and re-raised."""
+        with pytest.raises(ValueError):
+            with tracing.start_span('failing'):
+                raise ValueError('boom')
+
+        span = read_spans(span_log)[0]
+        assert span['status'] == tracing.STATUS_ERROR
+        assert span['attributes']['exception.type'] == 'ValueError'
+
+class TestRequestTracing:
+
+    def test_process_text_spans(self, span_log):
+        """Test a request joins the caller's trace and records its hops."""
+        app.config['TESTING'] = True
+        with patch('app.text_processor') as mock_processor:
+            mock_processor.stream_text.side_effect = streamed(["A statement."])
+            with app.test_client() as client:
+                response = client.post('/process-text',
+                    json={'text': 'a statement'},
+                    headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'}
+                )
+
+        assert response.status_code == 200
+        assert response.headers['X-Trace-Id'] == TRACE_ID
+        spans = {span['name']: span for span in read_spans(span_log)}
+        server = spans['POST /process-text']
+        assert server['parent_id'] == PARENT_ID
+        assert server['attributes']['http.status_code'] == 200
+        assert spans['validate']['parent_id'] == server['span_id']
+
+    def test_provider_call_span(self, span_log):
+        """Test the Claude processor records prompt, provider and parse spans."""
+        from claude_processor import ClaudeProcessor
+        with patch('claude_processor.Anthropic'):
+            processor = ClaudeProcessor()
+        mock_response = Mock()
+        mock_response.content = [Mock(text='["One.", "Two."]')]
+        processor.client.messages.create.return_value = mock_response
+
+        with tracing.start_span('request', f'00-{TRACE_ID}-{PARENT_ID}-01'):
+            processor.process_text("one and two")
+
+        spans = {span['name']: span for span in read_spans(span_log)}
+        assert spans['provider_call']['attributes']['llm.provider'] == 'claude'
+        assert spans['provider_call']['attributes']['response.chars'] > 0
+        assert spans['parse']['attributes']['blocks'] == 2
+        assert spans['build_prompt']['trace_id'] == TRACE_ID
@@ -0,0 +1,260 @@
+"""
+Minimal W3C Trace Context tracing.
+
+Requests carry a `traceparent` header (00-<trace id>-<parent span id>-<flags>)
+from the browser or the file server's /api/process-text proxy. Every span
+started while handling the request joins that trace, so one slow
+statement-block response can be broken down hop by hop.
+
+Finished spans go to a JSON-lines log (TRACE_LOG_FILE) and/or an
+OpenTelemetry collector over OTLP/HTTP JSON (TRACE_OTLP_ENDPOINT, e.g.
+http://localhost:4318/v1/traces). Without either, spans are not recorded
+but trace context is still propagated.
+
+Sampling is decided once, where a trace starts: at TRACE_SAMPLE_RATIO,
+whether or not this service exports spans itself, so services further down
+record the trace if they export. Joined traces keep their caller's flag.
+
+file-server/tracing.py is a copy of this module (print instead of logging).
+Each service is its own Docker build context, so the two can't import a
+shared file; keep them in sync when changing either.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_exporter = None
+_sample_ratio = 1.0
+
+
+def parse_traceparent(header):
+    """Return (trace_id, parent_span_id, sampled) or None for a missing or malformed header."""
+    match = TRACEPARENT_PATTERN.match((header or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, sampled=True, kind=KIND_INTERNAL, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, message):
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def record_exception(self, error):
+        self.set_attribute('exception.type', type(error).__name__)
+        self.set_attribute('exception.message', str(error))
+        self.set_error(str(error))
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.sampled and _exporter is not None:
+            _exporter.export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'status_message': self.status_message,
+            'attributes': self.attributes,
+        }
+
+
+def begin_span(name, traceparent=None, kind=KIND_INTERNAL, **attributes):
+    """
+    Start a span and make it current. Pair with finish_span(); prefer start_span().
+
+    The parent is the traceparent header if given and valid, else the current
+    span; without either a new trace is started and sampled at TRACE_SAMPLE_RATIO.
+    """
+    parent = parse_traceparent(traceparent) if traceparent else None
+    if parent:
+        trace_id, parent_id, sampled = parent
+    elif _current_span.get() is not None:
+        current = _current_span.get()
+        trace_id, parent_id, sampled = current.trace_id, current.span_id, current.sampled
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        # Not tied to _exporter: downstream services follow this flag
+        sampled = random.random() < _sample_ratio
+
+    span = Span(name, trace_id, parent_id, sampled, kind, attributes)
+    return span, _current_span.set(span)
+
+
+def finish_span(span, token):
+    span.end()
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Started in a different context, e.g. by a framework hook
+        _current_span.set(None)
+
+
+@contextmanager
+def start_span(name, traceparent=None, kind=KIND_INTERNAL, **attributes):
+    """Context manager around begin_span/finish_span that records exceptions."""
+    span, token = begin_span(name, traceparent, kind, **attributes)
+    try:
+        yield span
+    except Exception as e:
+        span.record_exception(e)
+        raise
+    finally:
+        finish_span(span, token)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_traceparent():
+    span = _current_span.get()
+    return span.traceparent if span else None
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans, service_name):
+    """Encode spans as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'banter.tracing'},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': span.kind,
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in span.attributes.items()],
+                    'status': {'code': span.status, 'message': span.status_message or ''},
+                } for span in spans],
+            }],
+        }]
+    }
+
+
+class SpanExporter:
+    """Writes finished spans to a JSON-lines file and/or batches them to an OTLP collector."""
+
+    def __init__(self, service_name, log_path=None, otlp_endpoint=None, batch_size=256, flush_interval=1.0):
+        self.service_name = service_name
+        self.log_path = log_path
+        self.otlp_endpoint = otlp_endpoint
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._log_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=10000)
+        if otlp_endpoint:
+            threading.Thread(target=self._send_loop, name='otlp-exporter', daemon=True).start()
+
+    def export(self, span):
+        if self.log_path:
+            line = json.dumps(dict(span.to_dict(), service=self.service_name))
+            with self._log_lock:
+                with open(self.log_path, 'a') as f:
+                    f.write(line + '\n')
+        if self.otlp_endpoint:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                # Tracing must never slow requests down
+                pass
+
+    def _send_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                request = urllib.request.Request(
+                    self.otlp_endpoint,
+                    data=json.dumps(to_otlp(batch, self.service_name)).encode(),
+                    headers={'Content-Type': 'application/json'},
+                    method='POST'
+                )
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    response.read()
+            except Exception as e:
+                logger.warning(f"Dropped {len(batch)} spans, OTLP export failed: {str(e)}")
+
+
+def configure(service_name, log_path=None, otlp_endpoint=None, sample_ratio=1.0):
+    """Enable span export. Without a log path or endpoint only propagation happens."""
+    global _exporter, _sample_ratio
+    _sample_ratio = sample_ratio
+    _exporter = SpanExporter(service_name, log_path, otlp_endpoint) if (log_path or otlp_endpoint) else None
+    return _exporter
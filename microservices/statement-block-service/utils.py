@@ -3,6 +3,23 @@ import json
 import time
 from functools import wraps
 from flask import jsonify
+from metrics import metrics
+import tracing
+
+metrics.describe('statement_parse_path_total', 'Model responses by how their blocks were read: structured, partial (cut-off stream), legacy parser or failed')
+
+# Structured output: Claude's forced tool call and Gemini's JSON mode both answer with this object
+BLOCKS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'blocks': {
+            'type': 'array',
+            'items': {'type': 'string'},
+            'description': 'The statement blocks, in order'
+        }
+    },
+    'required': ['blocks']
+}
 
 def sanitize_input(text):
     """Sanitize user input to prevent injection attacks."""
@@ -52,6 +69,97 @@ def parse_claude_response(response_text):
     
     return blocks if blocks else None
 
+def structured_blocks(data):
+    """Blocks of a structured-output response ({"blocks": [...]}, or its JSON), None if it does not match."""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+    if isinstance(data, dict):
+        data = data.get('blocks')
+    if not isinstance(data, list) or not all(isinstance(item, str) for item in data):
+        return None
+    return [item.strip() for item in data if item.strip()] or None
+
+def parse_blocks(provider, structured, text=None, partial=None):
+    """
+    Read the blocks of a model response: the structured output if it matches
+    BLOCKS_SCHEMA, else the partial blocks streamed before it was cut off,
+    else whatever parse_claude_response finds in the text (by default the
+    structured output's JSON text). Counts the path taken in
+    statement_parse_path_total. None if all fail.
+    """
+    with tracing.start_span('parse') as span:
+        blocks = structured_blocks(structured)
+        path = 'structured'
+        if blocks is None and partial:
+            blocks, path = list(partial), 'partial'
+        if blocks is None:
+            text = text if text is not None else structured if isinstance(structured, str) else ''
+            blocks = parse_claude_response(text) if text else None
+            path = 'legacy' if blocks else 'failed'
+        metrics.inc('statement_parse_path_total', provider=provider, path=path)
+        span.set_attribute('parse.path', path)
+        span.set_attribute('blocks', len(blocks or []))
+    return blocks
+
+class IncrementalBlockParser:
+    """
+    Incrementally parse a streamed JSON array of strings.
+
+    feed() takes the next chunk of model output and returns the array items
+    whose string literal closed in it, so blocks can be sent to the client
+    before the response is complete. Text before the opening bracket (a
+    code fence or a preamble) is skipped and non-string items are ignored.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.complete = False
+        self.blocks = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._literal = []
+
+    def feed(self, chunk):
+        self.text += chunk
+        emitted = []
+        for char in chunk:
+            if self.complete:
+                break
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        block = self._close_literal()
+                        if block:
+                            self.blocks.append(block)
+                            emitted.append(block)
+                    continue
+                if self._depth == 1:
+                    self._literal.append(char)
+            elif char == '"' and self._depth > 0:
+                self._in_string = True
+                self._literal = []
+            elif char == '[' or (char == '{' and self._depth > 0):
+                self._depth += 1
+            elif char in ']}' and self._depth > 0:
+                self._depth -= 1
+                self.complete = self._depth == 0
+        return emitted
+
+    def _close_literal(self):
+        try:
+            return json.loads('"' + ''.join(self._literal) + '"').strip()
+        except json.JSONDecodeError:
+            return None
+
 def timer_decorator(func):
     """Decorator to measure function execution time."""
     @wraps(func)
@@ -116,6 +224,33 @@ def validate_request_data(data):
                 if not isinstance(block, str):
                     errors.append(f"'existing_blocks[{i}]' must be a string")
     
+    if data.get('session_id') is not None:
+        session_id = data['session_id']
+        if not isinstance(session_id, str) or not re.fullmatch(r'[0-9a-f]{1,64}', session_id):
+            errors.append("'session_id' must be a session id returned by the service")
+    
+    if data.get('base_version') is not None:
+        if not isinstance(data['base_version'], int) or isinstance(data['base_version'], bool):
+            errors.append("'base_version' must be an integer")
+    
+    return errors
+
+def validate_ingest_data(data):
+    """Validate a transcript frame sent to /ingest."""
+    errors = validate_request_data(data)
+    if not data:
+        return errors
+    
+    stream_id = data.get('stream_id')
+    if not isinstance(stream_id, str) or not re.fullmatch(r'[0-9A-Za-z_-]{1,64}', stream_id):
+        errors.append("'stream_id' is required and must be 1-64 letters, digits, '-' or '_'")
+    
+    if not isinstance(data.get('seq'), int) or isinstance(data.get('seq'), bool) or data['seq'] < 0:
+        errors.append("'seq' is required and must be a non-negative integer")
+    
+    if 'final' in data and not isinstance(data['final'], bool):
+        errors.append("'final' must be a boolean")
+    
     return errors
 
 # Import Config after defining functions to avoid circular import
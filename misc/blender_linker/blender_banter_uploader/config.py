@@ -2,6 +2,19 @@ DEFAULT_SERVER_URL = "https://suitable-bulldog-flying.ngrok-free.app"
 MAX_FILE_SIZE_MB = 20
 TEMP_DIR = None  # Use system temp
 
+# Delta uploads: re-uploads of a mesh only send blocks that changed
+DELTA_UPLOAD_ENABLED = True
+DELTA_BLOCK_SIZE = 8192
+DELTA_MAX_RATIO = 0.7  # Send the full file if the delta is bigger than this fraction of it
+
+# Resumable uploads: files at or above the threshold are sent in checksummed chunks
+RESUMABLE_UPLOAD_THRESHOLD_MB = 4
+RESUMABLE_CHUNK_SIZE = 1024 * 1024
+RESUMABLE_CHUNK_RETRIES = 5
+
+# Longest Retry-After from a busy server (503) the addon will wait before retrying
+MAX_RETRY_AFTER = 60
+
 EXPORT_PRESETS = {
     "mobile_vr": {
         'export_format': 'GLB',
@@ -3,6 +3,7 @@ from bpy.types import Operator
 from bpy.props import StringProperty, EnumProperty, BoolProperty
 import traceback
 from ..utils import GLBExporter, BanterUploader, ValidationHelper
+from ..scene_properties import find_previous_upload_hash
 from .. import config
 
 class BANTER_OT_batch_export(Operator):
@@ -146,7 +147,8 @@ class BANTER_OT_batch_export(Operator):
                         username=username,
                         secret=secret,
                         mesh_name=item['name'],  # Use the item name as mesh name
-                        max_retries=2
+                        max_retries=2,
+                        base_hash=find_previous_upload_hash(context.scene, item['name'])
                     )
                     
                     asset_hash = result.get('hash', result.get('id', 'unknown'))
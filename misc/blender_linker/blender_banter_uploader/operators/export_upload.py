@@ -3,6 +3,7 @@ from bpy.types import Operator
 from bpy.props import StringProperty, EnumProperty, BoolProperty
 import traceback
 from ..utils import GLBExporter, BanterUploader, ValidationHelper
+from ..scene_properties import find_previous_upload_hash
 from .. import config
 
 class BANTER_OT_export_upload(Operator):
@@ -123,6 +124,8 @@ class BANTER_OT_export_upload(Operator):
             else:
                 mesh_name = f"Combined_{len(selected_objects)}_objects"
 
+            history_name = selected_objects[0].name if len(selected_objects) == 1 else f"{len(selected_objects)} objects"
+
             # Upload to server
             self.report({'INFO'}, f"Uploading '{mesh_name}' to {server_url}...")
 
@@ -133,7 +136,8 @@ class BANTER_OT_export_upload(Operator):
                     username=username,
                     secret=secret,
                     mesh_name=mesh_name,
-                    max_retries=3
+                    max_retries=3,
+                    base_hash=find_previous_upload_hash(context.scene, history_name)
                 )
             except Exception as e:
                 self.report({'ERROR'}, f"Upload failed: {str(e)}")
@@ -145,7 +149,7 @@ class BANTER_OT_export_upload(Operator):
             # Store in scene for history using proper Blender properties
             history_item = context.scene.banter_upload_history.add()
             history_item.hash = asset_hash
-            history_item.name = selected_objects[0].name if len(selected_objects) == 1 else f"{len(selected_objects)} objects"
+            history_item.name = history_name
             history_item.size = size_mb
             history_item.preset = self.export_preset
             
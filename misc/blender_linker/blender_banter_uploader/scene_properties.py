@@ -40,6 +40,16 @@ class BatchResultItem(PropertyGroup):
         description="File size in MB"
     )
 
+def find_previous_upload_hash(scene, name):
+    """Hash of the most recent upload stored under name, used as a delta base"""
+    for item in reversed(scene.banter_upload_history):
+        if item.name == name and item.hash:
+            return item.hash
+    for item in scene.banter_batch_results:
+        if item.name == name and item.hash:
+            return item.hash
+    return None
+
 def register():
     """Register scene properties"""
     bpy.utils.register_class(UploadHistoryItem)
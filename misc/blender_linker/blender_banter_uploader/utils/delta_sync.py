@@ -0,0 +1,148 @@
+"""
+Client side of the file server's rsync-style delta upload protocol.
+
+Given the block signatures of a previously uploaded GLB, work out which
+blocks of the new export already exist on the server and encode a recipe
+plus the literal bytes that have to be sent. Checksums must match
+microservices/file-server/delta_sync.py exactly.
+"""
+import hashlib
+import json
+import struct
+
+try:
+    import numpy as np  # Bundled with Blender
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SIGNATURE_MAGIC = b'BSIG'
+STRONG_DIGEST_SIZE = 8
+DEFAULT_BLOCK_SIZE = 8192
+
+
+def strong_checksum(block):
+    return hashlib.blake2b(block, digest_size=STRONG_DIGEST_SIZE).digest()
+
+
+def parse_signature(body):
+    """
+    Parse a signature returned by GET /api/glb_signature.
+
+    Returns:
+        dict: block_size, size, and a {weak: [(block_index, strong), ...]} lookup
+    """
+    if len(body) < 20 or body[:4] != SIGNATURE_MAGIC:
+        raise ValueError("Invalid signature response from server")
+    block_size, size, block_count = struct.unpack_from('<IQI', body, 4)
+    entry_size = 4 + STRONG_DIGEST_SIZE
+    if len(body) != 20 + block_count * entry_size:
+        raise ValueError("Truncated signature response from server")
+
+    blocks = {}
+    for i in range(block_count):
+        offset = 20 + i * entry_size
+        (weak,) = struct.unpack_from('<I', body, offset)
+        blocks.setdefault(weak, []).append((i, body[offset + 4:offset + entry_size]))
+    return {'block_size': block_size, 'size': size, 'blocks': blocks}
+
+
+def _rolling_weak_checksums(data, block_size):
+    """Weak checksum of every block_size window in data, indexed by start offset."""
+    window_count = len(data) - block_size + 1
+    if NUMPY_AVAILABLE:
+        x = np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+        s1 = np.concatenate(([0], np.cumsum(x)))
+        s2 = np.concatenate(([0], np.cumsum(x * np.arange(len(x), dtype=np.int64))))
+        starts = np.arange(window_count, dtype=np.int64)
+        a = s1[starts + block_size] - s1[starts]
+        # sum((L - (i - k)) * x_i) over the window starting at k
+        b = (starts + block_size) * a - (s2[starts + block_size] - s2[starts])
+        return (a & 0xFFFF) | ((b & 0xFFFF) << 16)
+
+    weak = []
+    a = sum(data[:block_size]) & 0xFFFF
+    b = sum((block_size - i) * x for i, x in enumerate(data[:block_size])) & 0xFFFF
+    weak.append(a | (b << 16))
+    for k in range(1, window_count):
+        out_byte = data[k - 1]
+        in_byte = data[k + block_size - 1]
+        a = (a - out_byte + in_byte) & 0xFFFF
+        b = (b - block_size * out_byte + a) & 0xFFFF
+        weak.append(a | (b << 16))
+    return weak
+
+
+def compute_delta(data, signature):
+    """
+    Match data against a base file's block signatures.
+
+    Returns:
+        tuple: (ops, literal bytes) where ops is the recipe op list
+    """
+    block_size = signature['block_size']
+    blocks = signature['blocks']
+    ops = []
+    literal = bytearray()
+
+    def add_literal(start, end):
+        if end > start:
+            ops.append(['d', len(literal), end - start])
+            literal.extend(data[start:end])
+
+    def add_copy(block_index):
+        if ops and ops[-1][0] == 'c' and ops[-1][1] + ops[-1][2] == block_index:
+            ops[-1][2] += 1
+        else:
+            ops.append(['c', block_index, 1])
+
+    if len(data) < block_size or not blocks:
+        add_literal(0, len(data))
+        return ops, bytes(literal)
+
+    weak = _rolling_weak_checksums(data, block_size)
+    if NUMPY_AVAILABLE:
+        candidates = np.flatnonzero(np.isin(weak, np.fromiter(blocks.keys(), dtype=np.int64)))
+        weak = weak.tolist()
+    else:
+        candidates = [k for k, value in enumerate(weak) if value in blocks]
+
+    position = 0
+    literal_start = 0
+    last_window = len(data) - block_size
+    cursor = 0
+    while position <= last_window:
+        # Jump straight to the next offset whose weak checksum exists in the base
+        while cursor < len(candidates) and candidates[cursor] < position:
+            cursor += 1
+        if cursor == len(candidates):
+            break
+        position = int(candidates[cursor])
+
+        matched = None
+        strong = strong_checksum(data[position:position + block_size])
+        # Prefer the block that extends the previous copy so repeated content stays one op
+        follow = ops[-1][1] + ops[-1][2] if ops and ops[-1][0] == 'c' and literal_start == position else None
+        for block_index, block_strong in blocks[weak[position]]:
+            if block_strong == strong:
+                if matched is None or block_index == follow:
+                    matched = block_index
+                if block_index == follow:
+                    break
+
+        if matched is None:
+            position += 1
+            continue
+
+        add_literal(literal_start, position)
+        add_copy(matched)
+        position += block_size
+        literal_start = position
+
+    add_literal(literal_start, len(data))
+    return ops, bytes(literal)
+
+
+def encode_delta_body(block_size, ops, literal):
+    recipe = json.dumps({'block_size': block_size, 'ops': ops}, separators=(',', ':')).encode('utf-8')
+    return struct.pack('<I', len(recipe)) + recipe + literal
@@ -1,13 +1,37 @@
 import requests
 import json
 import hashlib
+import time
 from typing import Optional, Callable
 from .. import config
+from . import delta_sync
+
+# Open resumable upload sessions keyed by (server_url, sha256), so a retry
+# after a dropped connection continues where the last attempt stopped
+_resumable_sessions = {}
+
+
+class ServerBusyError(ConnectionError):
+    """Server answered 503; retry after retry_after seconds."""
+
+    def __init__(self, retry_after, message="Server busy"):
+        super().__init__(f"{message}, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _raise_if_busy(response):
+    if response.status_code == 503:
+        try:
+            retry_after = int(response.headers.get('Retry-After', 5))
+        except ValueError:
+            retry_after = 5
+        raise ServerBusyError(min(retry_after, config.MAX_RETRY_AFTER))
+
 
 class BanterUploader:
     
     @staticmethod
-    def upload_glb(glb_data, server_url=None, username=None, secret=None, mesh_name=None, progress_callback=None):
+    def upload_glb(glb_data, server_url=None, username=None, secret=None, mesh_name=None, progress_callback=None, base_hash=None):
         """
         Upload GLB data to Banter microservice.
 
@@ -18,6 +42,8 @@ class BanterUploader:
             secret: Secret key for authentication
             mesh_name: Name of the mesh/object being uploaded
             progress_callback: Optional callback for progress updates
+            base_hash: Hash of the previous upload of this mesh; when set, only
+                the changed blocks are sent if the server still has it
 
         Returns:
             dict: Response from server containing hash and other metadata
@@ -32,6 +58,36 @@ class BanterUploader:
         local_hash = hashlib.sha256(glb_data).hexdigest()
 
         try:
+            # Try a delta against the previous revision first
+            if base_hash and config.DELTA_UPLOAD_ENABLED:
+                try:
+                    result = BanterUploader.upload_glb_delta(
+                        glb_data,
+                        base_hash,
+                        server_url,
+                        username,
+                        secret,
+                        mesh_name,
+                        progress_callback
+                    )
+                    if result is not None:
+                        return result
+                except (ValueError, requests.exceptions.HTTPError) as e:
+                    print(f"Delta upload failed, sending full file: {e}")
+
+            # Large files go up in chunks that survive a dropped connection
+            if len(glb_data) >= config.RESUMABLE_UPLOAD_THRESHOLD_MB * 1024 * 1024:
+                result = BanterUploader.upload_resumable(
+                    glb_data,
+                    server_url,
+                    username,
+                    secret,
+                    mesh_name,
+                    progress_callback
+                )
+                if result is not None:
+                    return result
+
             # Prepare multipart form data
             files = {'file': ('model.glb', glb_data, 'model/gltf-binary')}
 
@@ -55,6 +111,8 @@ class BanterUploader:
                 timeout=60  # 60 second timeout for large files
             )
             
+            _raise_if_busy(response)
+
             if progress_callback:
                 progress_callback(100, "Upload complete!")
             
@@ -69,6 +127,8 @@ class BanterUploader:
             
             return result
             
+        except ServerBusyError:
+            raise
         except requests.exceptions.ConnectionError:
             raise ConnectionError(f"Cannot connect to server at {server_url}")
         except requests.exceptions.Timeout:
@@ -83,6 +143,200 @@ class BanterUploader:
         except Exception as e:
             raise Exception(f"Upload failed: {str(e)}")
     
+    @staticmethod
+    def upload_glb_delta(glb_data, base_hash, server_url=None, username=None, secret=None, mesh_name=None, progress_callback=None):
+        """
+        Upload only the blocks of glb_data that differ from a previous upload.
+
+        Args:
+            glb_data: Bytes data of GLB file
+            base_hash: Hash of a GLB already stored on the server
+            server_url: Optional server URL override
+            username: Username for authentication
+            secret: Secret key for authentication
+            mesh_name: Name of the mesh/object being uploaded
+            progress_callback: Optional callback for progress updates
+
+        Returns:
+            dict: Response from server, or None if the server doesn't have the
+            base file, couldn't verify the result, or the delta isn't worth it
+        """
+        if server_url is None:
+            server_url = config.DEFAULT_SERVER_URL
+
+        local_hash = hashlib.sha256(glb_data).hexdigest()
+
+        if progress_callback:
+            progress_callback(0, "Fetching block signatures...")
+
+        response = requests.get(
+            f"{server_url}/api/glb_signature",
+            params={'file': base_hash, 'block_size': config.DELTA_BLOCK_SIZE},
+            timeout=30
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        signature = delta_sync.parse_signature(response.content)
+
+        if progress_callback:
+            progress_callback(20, "Computing delta...")
+
+        ops, literal = delta_sync.compute_delta(glb_data, signature)
+        body = delta_sync.encode_delta_body(signature['block_size'], ops, literal)
+        if len(body) > len(glb_data) * config.DELTA_MAX_RATIO:
+            return None
+
+        params = {'base': base_hash, 'hash': local_hash}
+        if username:
+            params['username'] = username
+        if secret:
+            params['secret'] = secret
+        if mesh_name:
+            params['mesh_name'] = mesh_name
+
+        if progress_callback:
+            progress_callback(40, f"Uploading delta ({len(body) / 1024:.1f}KB of {len(glb_data) / 1024:.1f}KB)...")
+
+        response = requests.post(
+            f"{server_url}/api/store_glb_delta",
+            params=params,
+            data=body,
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=60
+        )
+        _raise_if_busy(response)
+        # Base evicted in the meantime or reconstruction mismatch: caller sends the full file
+        if response.status_code in (404, 422):
+            return None
+        response.raise_for_status()
+
+        if progress_callback:
+            progress_callback(100, "Upload complete!")
+
+        result = response.json()
+        result['local_hash'] = local_hash
+        return result
+
+    @staticmethod
+    def upload_resumable(glb_data, server_url=None, username=None, secret=None, mesh_name=None, progress_callback=None):
+        """
+        Upload GLB data as numbered, checksummed chunks.
+
+        Failed chunks are retried after asking the server which chunks it
+        already has, and the session is remembered between calls so
+        upload_with_retry resumes instead of starting over.
+
+        Returns:
+            dict: Response from server, or None if the server doesn't
+            support resumable uploads
+        """
+        if server_url is None:
+            server_url = config.DEFAULT_SERVER_URL
+
+        local_hash = hashlib.sha256(glb_data).hexdigest()
+        session_key = (server_url, local_hash)
+
+        # Reuse the session from a previous attempt if the server still has it
+        status = None
+        session_id = _resumable_sessions.get(session_key)
+        if session_id:
+            response = requests.get(f"{server_url}/api/uploads/{session_id}", timeout=30)
+            if response.status_code == 200:
+                status = response.json()
+            else:
+                _resumable_sessions.pop(session_key, None)
+
+        if status is None:
+            if progress_callback:
+                progress_callback(0, "Starting resumable upload...")
+            response = requests.post(
+                f"{server_url}/api/uploads",
+                json={
+                    'size': len(glb_data),
+                    'sha256': local_hash,
+                    'chunk_size': config.RESUMABLE_CHUNK_SIZE,
+                    'username': username or '',
+                    'secret': secret or '',
+                    'mesh_name': mesh_name or ''
+                },
+                timeout=30
+            )
+            # Older servers without session support
+            if response.status_code in (404, 405, 501):
+                return None
+            response.raise_for_status()
+            status = response.json()
+            _resumable_sessions[session_key] = status['id']
+
+        session_id = status['id']
+        chunk_size = status['chunk_size']
+        missing = list(status['missing'])
+        chunk_count = status['chunk_count']
+        failures = 0
+
+        while missing:
+            index = missing[0]
+            chunk = glb_data[index * chunk_size:(index + 1) * chunk_size]
+
+            if progress_callback:
+                done = chunk_count - len(missing)
+                progress_callback(int(100 * done / chunk_count), f"Uploading chunk {done + 1}/{chunk_count}...")
+
+            try:
+                response = requests.put(
+                    f"{server_url}/api/uploads/{session_id}/chunks/{index}",
+                    data=chunk,
+                    headers={
+                        'Content-Type': 'application/octet-stream',
+                        'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest()
+                    },
+                    timeout=60
+                )
+                _raise_if_busy(response)
+                # 422 means the chunk was corrupted in transit; send it again
+                if response.status_code != 422:
+                    response.raise_for_status()
+                    missing = response.json()['missing']
+                    failures = 0
+                    continue
+                delay = None
+            except ServerBusyError as e:
+                delay = e.retry_after
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                delay = None
+
+            failures += 1
+            if failures > config.RESUMABLE_CHUNK_RETRIES:
+                raise requests.exceptions.ConnectionError(f"Chunk {index} failed after {failures} attempts")
+            time.sleep(delay if delay is not None else min(2 ** (failures - 1), 30))
+
+            # The chunk may have arrived even though the response didn't
+            try:
+                response = requests.get(f"{server_url}/api/uploads/{session_id}", timeout=30)
+                if response.status_code == 200:
+                    missing = response.json()['missing']
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                pass
+
+        if progress_callback:
+            progress_callback(95, "Finalizing upload...")
+
+        response = requests.post(f"{server_url}/api/uploads/{session_id}/finalize", timeout=60)
+        _raise_if_busy(response)
+        if response.status_code in (404, 422):
+            # Session expired or the assembled file didn't verify: start fresh next attempt
+            _resumable_sessions.pop(session_key, None)
+        response.raise_for_status()
+        _resumable_sessions.pop(session_key, None)
+
+        if progress_callback:
+            progress_callback(100, "Upload complete!")
+
+        result = response.json()
+        result['local_hash'] = local_hash
+        return result
+
     @staticmethod
     def check_server_status(server_url=None):
         """
@@ -105,7 +359,7 @@ class BanterUploader:
             return False
     
     @staticmethod
-    def upload_with_retry(glb_data, server_url=None, username=None, secret=None, mesh_name=None, max_retries=3, progress_callback=None):
+    def upload_with_retry(glb_data, server_url=None, username=None, secret=None, mesh_name=None, max_retries=3, progress_callback=None, base_hash=None):
         """
         Upload with automatic retry on failure.
 
@@ -117,6 +371,7 @@ class BanterUploader:
             mesh_name: Name of the mesh/object being uploaded
             max_retries: Maximum number of retry attempts
             progress_callback: Optional callback for progress updates
+            base_hash: Hash of the previous upload of this mesh, enables delta uploads
 
         Returns:
             dict: Response from server
@@ -134,15 +389,18 @@ class BanterUploader:
                     username,
                     secret,
                     mesh_name,
-                    progress_callback
+                    progress_callback,
+                    base_hash
                 )
                 
             except (ConnectionError, TimeoutError) as e:
                 last_error = e
                 if attempt < max_retries - 1:
-                    # Wait before retry (exponential backoff)
-                    import time
-                    time.sleep(2 ** attempt)
+                    # Honour the server's Retry-After, otherwise exponential backoff
+                    delay = e.retry_after if isinstance(e, ServerBusyError) else 2 ** attempt
+                    if progress_callback and isinstance(e, ServerBusyError):
+                        progress_callback(0, f"Server busy, retrying in {delay}s...")
+                    time.sleep(delay)
                 continue
             except Exception as e:
                 # Don't retry on other errors